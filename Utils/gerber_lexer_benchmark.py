@@ -0,0 +1,208 @@
+# ##########################################################
+# FlatCAM Evo: 2D Post-processing for Manufacturing        #
+# MIT Licence                                              #
+# ##########################################################
+
+# Benchmark of the Gerber statements lexer (appParsers.ParseGerber.GerberLexer) against the former parser front-end
+# (the file read in memory, split in a list of statements and each statement tried against the cascade of patterns).
+#
+# Usage (from the FlatCAM folder):
+#   python Utils/gerber_lexer_benchmark.py [gerber_file ...] [--lines N] [--full]
+# Without files, a synthetic RS-274X file with about N statements (default 1000000) is made in the temporary folder.
+# With --full the whole Gerber.parse_file() is timed, too (geometry included).
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from defaults import AppDefaults                            # noqa: E402
+from appParsers.ParseGerber import Gerber, GerberLexer      # noqa: E402
+
+
+class HeadlessSignal:
+    def emit(self, *args):
+        pass
+
+
+class HeadlessCanvas:
+    @staticmethod
+    def new_shape_collection(**kwargs):
+        return None
+
+
+class HeadlessApp:
+    """
+    The minimum of the application used by the Gerber parser.
+    """
+
+    def __init__(self):
+        self.options = dict(AppDefaults.factory_defaults)
+        self.decimals = 4
+        self.app_units = 'MM'
+        self.abort_flag = False
+        self.pool = None
+        self.use_3d_engine = True
+        self.plotcanvas = HeadlessCanvas()
+        self.inform = HeadlessSignal()
+        self.log = logging.getLogger('gerber_benchmark')
+
+
+class CascadeLexer(GerberLexer):
+    """
+    Classifies all the statements (except the comments) as OTHER therefore the parser tries the whole cascade of
+    patterns for each statement, like before the lexer.
+    """
+
+    def classify(self, statement):
+        kind = super().classify(statement)
+        return kind if kind == self.COMMENT else self.OTHER
+
+
+def make_gerber_file(statements_nr):
+    """
+    Makes a synthetic RS-274X file with tracks, arcs, pads, regions and comments.
+
+    :param statements_nr:   approximate number of statements
+    :return:                the file path
+    """
+    rnd = random.Random(0)
+
+    def coord(val):
+        return str(int(round(val * 1e6)))
+
+    lines = [
+        "G04 FlatCAM lexer benchmark*", "%FSLAX46Y46*%", "%MOMM*%", "G75*",
+        "%AMRECT*21,1,$1,$2,0,0,$3*%",
+        "%ADD10C,0.25*%", "%ADD11R,1.2X0.6*%", "%ADD12O,1.5X0.8*%", "%ADD13RECT,0.5X0.3X45*%", "%LPD*%"
+    ]
+    while len(lines) < statements_nr:
+        x = rnd.uniform(0, 300)
+        y = rnd.uniform(0, 300)
+        feature = rnd.random()
+        if feature < 0.4:
+            lines += ["D10*", "G01X%sY%sD02*" % (coord(x), coord(y)), "X%sY%sD01*" % (coord(x + 2), coord(y)),
+                      "Y%sD01*" % coord(y + 2)]
+        elif feature < 0.5:
+            lines += ["D10*", "X%sY%sD02*" % (coord(x), coord(y)),
+                      "G02X%sY%sI%sJ0D01*" % (coord(x + 2), coord(y), coord(1)), "G01*"]
+        elif feature < 0.9:
+            lines += ["D%d*" % rnd.choice([11, 12, 13]), "X%sY%sD03*" % (coord(x), coord(y)), "G04 pad*"]
+        else:
+            lines += ["G36*", "X%sY%sD02*" % (coord(x), coord(y)), "X%sY%sD01*" % (coord(x + 1), coord(y)),
+                      "X%sY%sD01*" % (coord(x + 1), coord(y + 1)), "X%sY%sD01*" % (coord(x), coord(y)), "G37*"]
+    lines.append("M02*")
+
+    fd, path = tempfile.mkstemp(suffix='.gbr', prefix='flatcam_bench_')
+    with os.fdopen(fd, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def cascade_front_end(gerber, filename):
+    """
+    The former front-end: read the file, split it in a list of statements and try each statement against the
+    cascade of patterns, in the parse_lines() order, until one matches.
+    """
+    patterns = [
+        gerber.comm_re, gerber.gx2_re, gerber.lpol_re, gerber.fmt_re, gerber.mode_re, gerber.fmt_re_alt,
+        gerber.fmt_re_orcad, gerber.units_re, gerber.absrel_re, gerber.am1_re, gerber.ad_re, gerber.opcode_re,
+        gerber.tool_re, gerber.regionon_re, gerber.regionoff_re, gerber.interp_re, gerber.lin_re, gerber.quad_re,
+        gerber.circ_re, gerber.eof_re
+    ]
+    with open(filename, 'r') as gfile:
+        statements = list(CascadeLexer().statements(gfile.read().splitlines(), skip_attributes=True))
+
+    matched = 0
+    for statement in statements:
+        for pattern in patterns:
+            if pattern.search(statement):
+                matched += 1
+                break
+    return len(statements), matched
+
+
+def lexer_front_end(gerber, filename):
+    """
+    The lexer front-end: stream the statements from the file and try only the patterns for the statement kind.
+    """
+    header = [
+        gerber.gx2_re, gerber.lpol_re, gerber.fmt_re, gerber.mode_re, gerber.fmt_re_alt, gerber.fmt_re_orcad,
+        gerber.units_re, gerber.absrel_re, gerber.am1_re, gerber.ad_re, gerber.opcode_re, gerber.tool_re,
+        gerber.regionon_re, gerber.regionoff_re, gerber.interp_re, gerber.lin_re, gerber.quad_re, gerber.circ_re,
+        gerber.eof_re
+    ]
+    kind_patterns = {
+        GerberLexer.OTHER: header,
+        GerberLexer.COORD: [gerber.lin_re, gerber.circ_re],
+        GerberLexer.DCODE: [gerber.opcode_re, gerber.tool_re],
+    }
+
+    statements_nr = 0
+    matched = 0
+    with open(filename, 'r') as gfile:
+        for kind, statement in gerber.lexer.tokens(gfile, skip_attributes=True):
+            statements_nr += 1
+            if kind == GerberLexer.COMMENT:
+                matched += 1
+                continue
+            for pattern in kind_patterns[kind]:
+                if pattern.search(statement):
+                    matched += 1
+                    break
+    return statements_nr, matched
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    ret = func(*args)
+    return time.perf_counter() - start, ret
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerber lexer benchmark")
+    parser.add_argument('files', nargs='*', help="RS-274X files. A synthetic file is made if none is given.")
+    parser.add_argument('--lines', type=int, default=1000000, help="statements in the synthetic file")
+    parser.add_argument('--full', action='store_true', help="time the whole Gerber.parse_file(), too")
+    args = parser.parse_args()
+
+    Gerber.app = HeadlessApp()
+
+    files = args.files
+    synthetic = None
+    if not files:
+        synthetic = make_gerber_file(args.lines)
+        files = [synthetic]
+
+    try:
+        for filename in files:
+            print("%s (%.1f MB)" % (filename, os.path.getsize(filename) / 1e6))
+            gerber = Gerber()
+
+            t_cascade, (nr, m_cascade) = timed(cascade_front_end, gerber, filename)
+            t_lexer, (nr_lexer, m_lexer) = timed(lexer_front_end, gerber, filename)
+            assert nr == nr_lexer and m_cascade == m_lexer, "the front-ends do not match the same statements"
+
+            print("  front-end  cascade: %8.3f s  %10.0f statements/s" % (t_cascade, nr / t_cascade))
+            print("  front-end  lexer  : %8.3f s  %10.0f statements/s  (x%.2f)" %
+                  (t_lexer, nr / t_lexer, t_cascade / t_lexer))
+
+            if args.full:
+                for name, lexer_class in (('cascade', CascadeLexer), ('lexer  ', GerberLexer)):
+                    gerber = Gerber()
+                    gerber.lexer = lexer_class()
+                    t_parse, ret = timed(gerber.parse_file, filename)
+                    print("  parse_file %s: %8.3f s  %10.0f statements/s  %s" %
+                          (name, t_parse, nr / t_parse, '' if ret is None else ret))
+    finally:
+        if synthetic:
+            os.remove(synthetic)
+
+
+if __name__ == '__main__':
+    main()
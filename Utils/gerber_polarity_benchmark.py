@@ -0,0 +1,133 @@
+# ##########################################################
+# FlatCAM Evo: 2D Post-processing for Manufacturing        #
+# MIT Licence                                              #
+# ##########################################################
+
+# Benchmark of the Gerber polarity accumulation (appParsers.ParseGerber.GerberLayerStack) against the former one,
+# where each dark (LPD) or clear (LPC) run was added to or subtracted from the whole accumulated solid geometry.
+#
+# Usage (from the FlatCAM folder):
+#   python Utils/gerber_polarity_benchmark.py [gerber_file ...] [--pads N] [--skip-sequential]
+# Without files, a synthetic RS-274X file is made in the temporary folder: a copper pour with N pads, each pad made
+# as a clear (LPC) knockout followed by a dark (LPD) pad, so the polarity changes twice for each pad.
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely.ops import unary_union                                 # noqa: E402
+
+from appParsers.ParseGerber import Gerber, GerberLayerStack         # noqa: E402
+from Utils.gerber_lexer_benchmark import HeadlessApp                # noqa: E402
+
+
+class SequentialLayerStack(GerberLayerStack):
+    """
+    The former accumulation: each run is joined to or subtracted from the whole accumulated geometry.
+    """
+
+    def __init__(self, geometry=None, pool=None, callback=None):
+        super().__init__()
+        self.geometry = geometry
+
+    def add(self, polarity, polygons):
+        if not polygons:
+            return
+        if polarity == 'D':
+            self.geometry = self.geometry.union(unary_union(polygons))
+        else:
+            self.geometry = self.geometry.difference(unary_union(polygons))
+
+    def resolve(self):
+        return self.geometry
+
+
+def make_gerber_file(pads_nr, size=200.0):
+    """
+    Makes a synthetic RS-274X file with a copper pour and pads with clearance knockouts.
+
+    :param pads_nr: number of pads
+    :param size:    the copper pour side, in mm
+    :return:        the file path
+    """
+    rnd = random.Random(0)
+
+    def coord(val):
+        return str(int(round(val * 1e6)))
+
+    lines = [
+        "G04 FlatCAM polarity benchmark*", "%FSLAX46Y46*%", "%MOMM*%", "G75*",
+        "%ADD10C,1.2*%", "%ADD11C,0.8*%", "%ADD12R,1.4X1.0*%", "%ADD13R,1.0X0.6*%", "%ADD14C,0.3*%",
+        "%LPD*%", "G36*", "X0Y0D02*", "X%sY0D01*" % coord(size), "X%sY%sD01*" % (coord(size), coord(size)),
+        "X0Y%sD01*" % coord(size), "X0Y0D01*", "G37*"
+    ]
+    for __ in range(pads_nr):
+        x = rnd.uniform(2, size - 2)
+        y = rnd.uniform(2, size - 2)
+        round_pad = rnd.random() < 0.5
+        lines += [
+            "%LPC*%", "D%d*" % (10 if round_pad else 12), "X%sY%sD03*" % (coord(x), coord(y)),
+            "%LPD*%", "D%d*" % (11 if round_pad else 13), "X%sY%sD03*" % (coord(x), coord(y)),
+        ]
+        if rnd.random() < 0.2:
+            # a short track leaving the pad
+            lines += ["D14*", "X%sY%sD02*" % (coord(x), coord(y)), "X%sY%sD01*" % (coord(x + 1.5), coord(y))]
+    lines.append("M02*")
+
+    fd, path = tempfile.mkstemp(suffix='.gbr', prefix='flatcam_polarity_')
+    with os.fdopen(fd, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def parse(filename, stack_class):
+    gerber = Gerber()
+    gerber.layer_stack_class = stack_class
+    start = time.perf_counter()
+    ret = gerber.parse_file(filename)
+    duration = time.perf_counter() - start
+    return duration, ret, unary_union(gerber.solid_geometry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerber polarity accumulation benchmark")
+    parser.add_argument('files', nargs='*', help="RS-274X files. A synthetic file is made if none is given.")
+    parser.add_argument('--pads', type=int, default=2000, help="pads (two polarity changes each) in the synthetic file")
+    parser.add_argument('--skip-sequential', action='store_true', help="do not time the former accumulation")
+    args = parser.parse_args()
+
+    Gerber.app = HeadlessApp()
+
+    files = args.files
+    synthetic = None
+    if not files:
+        synthetic = make_gerber_file(args.pads)
+        files = [synthetic]
+
+    try:
+        for filename in files:
+            with open(filename, 'r') as f:
+                changes = sum(line.count('%LP') for line in f)
+            print("%s (%.1f MB, %d polarity changes)" % (filename, os.path.getsize(filename) / 1e6, changes))
+
+            t_stack, ret, geo_stack = parse(filename, GerberLayerStack)
+            print("  layer stack: %8.3f s  %s" % (t_stack, '' if ret is None else ret))
+
+            if not args.skip_sequential:
+                t_seq, ret, geo_seq = parse(filename, SequentialLayerStack)
+                print("  sequential : %8.3f s  %s (x%.2f)" % (t_seq, '' if ret is None else ret, t_seq / t_stack))
+                diff_area = geo_stack.symmetric_difference(geo_seq).area
+                print("  area: %.6f / %.6f, symmetric difference area: %.3g" %
+                      (geo_stack.area, geo_seq.area, diff_area))
+    finally:
+        if synthetic:
+            os.remove(synthetic)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,479 @@
+# ##########################################################
+# FlatCAM Evo: 2D Post-processing for Manufacturing        #
+# MIT Licence                                              #
+# ##########################################################
+
+# Headless benchmark of the file parsers: Gerber, Excellon, HPGL2, PDF (PdfParser), SVG and DXF import.
+# No Qt event loop is needed. A corpus of synthetic files of scalable size is made in the temporary folder and each
+# parser is run on its file in a new process, so the reported peak RSS (resident memory) belongs to that parser only.
+#
+# Usage (from the FlatCAM folder):
+#   python Utils/parser_benchmark.py [--parsers gerber,excellon,...] [--size N] [--repeat R]
+#                                    [--profile cprofile|pyinstrument] [--profile-dir DIR] [--json FILE]
+#                                    [--in-process]
+#
+#   --size N        the number of features in each synthetic file (default 20000)
+#   --repeat R      run each parser R times and report the fastest run
+#   --profile       write a profile report of each parser in the profile folder: a .prof file (for snakeviz, etc.)
+#                   and a text report for cProfile, a HTML and a text report for pyinstrument (if installed)
+#   --json FILE     save the results, to compare the parsers performance between releases
+#   --in-process    run the parsers in this process (the peak RSS is then the one of all the runs so far)
+#
+# The parsers that can not run because an optional package is missing (e.g. ezdxf, svg.path) are reported as skipped.
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import platform
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PARSERS = ('gerber', 'gerber_polarity', 'excellon', 'hpgl2', 'pdf', 'svg', 'dxf')
+
+
+# ######################################################################################################################
+# The headless application
+# ######################################################################################################################
+class HeadlessSignal:
+    def emit(self, *args):
+        pass
+
+
+class HeadlessCanvas:
+    @staticmethod
+    def new_shape_collection(**kwargs):
+        return None
+
+
+class HeadlessProcContainer:
+    def update_view_text(self, *args):
+        pass
+
+    def new_text(self, *args, **kwargs):
+        pass
+
+
+class HeadlessOptions(dict):
+    """
+    The factory defaults. Some parsers copy option keys that are no longer in the defaults into the tools data (e.g.
+    the HPGL2 default_data); the data is not used while parsing so those keys are None here.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
+class HeadlessApp:
+    """
+    The part of the application used by the parsers.
+    """
+
+    def __init__(self):
+        from defaults import AppDefaults
+
+        self.options = HeadlessOptions(AppDefaults.factory_defaults)
+        self.decimals = 4
+        self.app_units = 'MM'
+        self.abort_flag = False
+        self.pool = None
+        self.use_3d_engine = True
+        self.plotcanvas = HeadlessCanvas()
+        self.proc_container = HeadlessProcContainer()
+        self.inform = HeadlessSignal()
+        self.inform_shell = HeadlessSignal()
+        self.inform_no_echo = HeadlessSignal()
+        self.log = logging.getLogger('parser_benchmark')
+
+
+# ######################################################################################################################
+# The synthetic files
+# ######################################################################################################################
+def temp_file(suffix, content):
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix='flatcam_bench_')
+    with os.fdopen(fd, 'w') as f:
+        f.write(content)
+    return path
+
+
+def make_gerber(features):
+    from Utils.gerber_lexer_benchmark import make_gerber_file
+
+    # about 3 statements for each feature
+    return make_gerber_file(3 * features)
+
+
+def make_gerber_polarity(features):
+    from Utils.gerber_polarity_benchmark import make_gerber_file
+
+    # each pad is a clear knockout and a dark pad; the polarity changes are the expensive part, so fewer features
+    return make_gerber_file(max(features // 20, 1))
+
+
+def make_excellon(features):
+    rnd = random.Random(0)
+    lines = ["M48", "METRIC,LZ", "T1C0.800", "T2C1.000", "T3C3.000", "T4C1.200", "%", "G90", "G05"]
+    for tool in (1, 2, 3):
+        lines.append("T%d" % tool)
+        for __ in range(features // 4):
+            lines.append("X%.3fY%.3f" % (rnd.uniform(0, 300), rnd.uniform(0, 300)))
+    lines.append("T4")
+    for __ in range(features - 3 * (features // 4)):
+        x = rnd.uniform(0, 300)
+        y = rnd.uniform(0, 300)
+        lines.append("X%.3fY%.3fG85X%.3fY%.3f" % (x, y, x + 2.0, y))
+    lines.append("M30")
+    return temp_file('.drl', '\n'.join(lines) + '\n')
+
+
+def make_hpgl2(features):
+    rnd = random.Random(0)
+    lines = ["IN;", "SP1;"]
+    for idx in range(features):
+        # HPGL2 plotter units: 0.025 mm
+        x = rnd.randint(0, 12000)
+        y = rnd.randint(0, 12000)
+        lines += ["PU;", "PA %d,%d;" % (x, y)]
+        if idx % 10 == 0:
+            lines += ["PD;", "CI %d;" % rnd.randint(20, 200)]
+        else:
+            lines += ["PD;", "PA %d,%d;" % (x + 400, y), "PA %d,%d;" % (x + 400, y + 400)]
+    lines += ["PU;", "SP0;"]
+    return temp_file('.plt', '\n'.join(lines) + '\n')
+
+
+def make_pdf_content(features):
+    """
+    Makes the decompressed content stream of a PDF page, as the PDF plugin makes it with pikepdf and sends it to
+    PdfParser.parse_pdf().
+    """
+    rnd = random.Random(0)
+    lines = ["1 0 0 1 0 0 cm", "0 0 0 RG", "0 0 0 rg"]
+    for idx in range(features):
+        x = rnd.uniform(0, 800)
+        y = rnd.uniform(0, 800)
+        if idx % 3 == 0:
+            lines += ["%.3f %.3f 10 6 re" % (x, y), "f"]
+        else:
+            lines += ["%.2f w" % rnd.uniform(0.5, 2), "%.3f %.3f m" % (x, y), "%.3f %.3f l" % (x + 20, y),
+                      "%.3f %.3f l" % (x + 20, y + 20), "S"]
+    return temp_file('.txt', '\n'.join(lines) + '\n')
+
+
+def make_svg(features):
+    rnd = random.Random(0)
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<svg xmlns="http://www.w3.org/2000/svg" width="300mm" height="300mm" viewBox="0 0 300 300">',
+             '<g fill="black" stroke="black" stroke-width="0.2">']
+    for idx in range(features):
+        x = rnd.uniform(0, 290)
+        y = rnd.uniform(0, 290)
+        kind = idx % 3
+        if kind == 0:
+            lines.append('<rect x="%.3f" y="%.3f" width="2" height="1"/>' % (x, y))
+        elif kind == 1:
+            lines.append('<circle cx="%.3f" cy="%.3f" r="0.8"/>' % (x, y))
+        else:
+            lines.append('<path d="M %.3f %.3f L %.3f %.3f L %.3f %.3f" fill="none"/>' %
+                         (x, y, x + 5, y, x + 5, y + 5))
+    lines += ['</g>', '</svg>']
+    return temp_file('.svg', '\n'.join(lines) + '\n')
+
+
+def make_dxf(features):
+    import ezdxf
+
+    rnd = random.Random(0)
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+    for idx in range(features):
+        x = rnd.uniform(0, 300)
+        y = rnd.uniform(0, 300)
+        kind = idx % 3
+        if kind == 0:
+            msp.add_line((x, y), (x + 5, y + 2))
+        elif kind == 1:
+            msp.add_circle((x, y), radius=0.8)
+        else:
+            msp.add_lwpolyline([(x, y), (x + 2, y), (x + 2, y + 1), (x, y + 1)], close=True)
+
+    fd, path = tempfile.mkstemp(suffix='.dxf', prefix='flatcam_bench_')
+    os.close(fd)
+    doc.saveas(path)
+    return path
+
+
+MAKERS = {
+    'gerber':           make_gerber,
+    'gerber_polarity':  make_gerber_polarity,
+    'excellon':         make_excellon,
+    'hpgl2':            make_hpgl2,
+    'pdf':              make_pdf_content,
+    'svg':              make_svg,
+    'dxf':              make_dxf,
+}
+
+
+# ######################################################################################################################
+# The parsers runs. Each one returns the number of parsed features.
+# ######################################################################################################################
+def count_geometry(geometry):
+    from camlib import flatten_shapely_geometry
+
+    return len(flatten_shapely_geometry(geometry))
+
+
+def run_gerber(app, filename):
+    from appParsers.ParseGerber import Gerber
+
+    Gerber.app = app
+    gerber = Gerber()
+    if gerber.parse_file(filename) == 'fail':
+        raise RuntimeError("the Gerber parsing failed")
+    return sum(len(aperture.get('geometry', [])) for aperture in gerber.tools.values())
+
+
+def run_excellon(app, filename):
+    from appParsers.ParseExcellon import Excellon
+
+    Excellon.app = app
+    excellon = Excellon()
+    # the ExcellonObject has no tool data yet when its geometry is created
+    excellon.default_data = {}
+    if excellon.parse_file(filename=filename) == 'fail' or excellon.create_geometry() == 'fail':
+        raise RuntimeError("the Excellon parsing failed")
+    return sum(len(tool.get('drills', [])) + len(tool.get('slots', [])) for tool in excellon.tools.values())
+
+
+def run_hpgl2(app, filename):
+    from appParsers.ParseHPGL2 import HPGL2
+
+    hpgl2 = HPGL2(app)
+    hpgl2.parse_file(filename)
+    return sum(len(tool['solid_geometry']) for tool in hpgl2.tools.values())
+
+
+def run_pdf(app, filename):
+    from appParsers.ParsePDF import PdfParser
+
+    with open(filename, 'r') as f:
+        pdf_content = f.read()
+    parser = PdfParser(units=app.app_units, resolution=int(app.options["gerber_circle_steps"]), abort=False)
+    object_dict = parser.parse_pdf(pdf_content=pdf_content)
+    return sum(
+        len(aperture['geometry']) for layer in object_dict.values() for aperture in layer.values()
+    )
+
+
+def make_geometry_object(app):
+    from camlib import Geometry
+
+    class BenchGeometry(Geometry):
+        def __init__(self):
+            super().__init__(geo_steps_per_circle=int(app.options["geometry_circle_steps"]))
+            # set by the GeometryObject in the application
+            self.obj_options = {'name': 'benchmark'}
+            self.tools = {}
+            self.multigeo = False
+
+    Geometry.app = app
+    return BenchGeometry()
+
+
+def run_svg(app, filename):
+    geo_obj = make_geometry_object(app)
+    geo_obj.import_svg(filename, object_type='geometry', units=app.app_units)
+    return count_geometry(geo_obj.solid_geometry)
+
+
+def run_dxf(app, filename):
+    geo_obj = make_geometry_object(app)
+    geo_obj.import_dxf_as_geo(filename, units=app.app_units)
+    return count_geometry(geo_obj.solid_geometry)
+
+
+RUNNERS = {
+    'gerber':           run_gerber,
+    'gerber_polarity':  run_gerber,
+    'excellon':         run_excellon,
+    'hpgl2':            run_hpgl2,
+    'pdf':              run_pdf,
+    'svg':              run_svg,
+    'dxf':              run_dxf,
+}
+
+
+# ######################################################################################################################
+# Measurements
+# ######################################################################################################################
+def peak_rss_mb():
+    """
+
+    :return:    the peak resident memory of this process in MB, or None if it can not be found
+    """
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / 1024.0 / (1024.0 if platform.system() == 'Darwin' else 1.0)
+    except ImportError:
+        pass
+
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().peak_wset / 1024.0 / 1024.0
+    except (ImportError, AttributeError):
+        return None
+
+
+def count_lines(filename):
+    with open(filename, 'rb') as f:
+        return sum(1 for __ in f)
+
+
+def benchmark_task(kind, filename, profiler, profile_dir):
+    """
+    Runs one parser on one file. Runs in a new process.
+
+    :return:    dictionary with the results
+    """
+    logging.disable(logging.CRITICAL)
+    app = HeadlessApp()
+    runner = RUNNERS[kind]
+
+    prof = None
+    if profiler == 'cprofile':
+        import cProfile
+
+        prof = cProfile.Profile()
+    elif profiler == 'pyinstrument':
+        from pyinstrument import Profiler
+
+        prof = Profiler()
+
+    rss_before = peak_rss_mb()
+    if profiler == 'cprofile':
+        prof.enable()
+    elif profiler == 'pyinstrument':
+        prof.start()
+    try:
+        start = time.perf_counter()
+        features = runner(app, filename)
+        duration = time.perf_counter() - start
+    finally:
+        if profiler == 'cprofile':
+            prof.disable()
+        elif profiler == 'pyinstrument':
+            prof.stop()
+
+    if profiler == 'cprofile':
+        import pstats
+
+        prof.dump_stats(os.path.join(profile_dir, '%s.prof' % kind))
+        with open(os.path.join(profile_dir, '%s.txt' % kind), 'w') as f:
+            pstats.Stats(prof, stream=f).sort_stats('cumulative').print_stats(40)
+    elif profiler == 'pyinstrument':
+        with open(os.path.join(profile_dir, '%s.html' % kind), 'w') as f:
+            f.write(prof.output_html())
+        with open(os.path.join(profile_dir, '%s.txt' % kind), 'w') as f:
+            f.write(prof.output_text())
+
+    return {
+        'duration': duration,
+        'features': features,
+        'rss_start_mb': rss_before,
+        'rss_peak_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(kind, filename, profiler, profile_dir):
+    # a new process for each run, so the peak RSS is the one of this parser
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(benchmark_task, args=(kind, filename, profiler, profile_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FlatCAM parsers benchmark")
+    parser.add_argument('--parsers', default=','.join(PARSERS),
+                        help="comma separated list of parsers, from: %s" % ', '.join(PARSERS))
+    parser.add_argument('--size', type=int, default=20000, help="features in each synthetic file")
+    parser.add_argument('--repeat', type=int, default=1, help="runs of each parser; the fastest is reported")
+    parser.add_argument('--profile', choices=('cprofile', 'pyinstrument'), default=None,
+                        help="write a profile report of each parser")
+    parser.add_argument('--profile-dir', default='parser_profiles', help="folder for the profile reports")
+    parser.add_argument('--json', default=None, help="save the results in this JSON file")
+    parser.add_argument('--in-process', action='store_true', help="do not start a new process for each run")
+    args = parser.parse_args()
+
+    kinds = [kind.strip() for kind in args.parsers.split(',') if kind.strip()]
+    for kind in kinds:
+        if kind not in PARSERS:
+            parser.error("unknown parser: %s" % kind)
+
+    if args.profile:
+        os.makedirs(args.profile_dir, exist_ok=True)
+
+    print("%-16s %10s %10s %10s %12s %12s %10s" %
+          ("parser", "lines", "features", "time [s]", "lines/s", "features/s", "RSS [MB]"))
+
+    results = []
+    for kind in kinds:
+        try:
+            filename = MAKERS[kind](args.size)
+        except ImportError as err:
+            print("%-16s skipped: %s" % (kind, err))
+            results.append({'parser': kind, 'skipped': str(err)})
+            continue
+
+        try:
+            lines = count_lines(filename)
+            runs = []
+            for __ in range(max(args.repeat, 1)):
+                run = benchmark_task if args.in_process else run_isolated
+                runs.append(run(kind, filename, args.profile, args.profile_dir))
+            best = min(runs, key=lambda r: r['duration'])
+        except ImportError as err:
+            print("%-16s skipped: %s" % (kind, err))
+            results.append({'parser': kind, 'skipped': str(err)})
+            continue
+        except Exception as err:
+            print("%-16s failed: %s" % (kind, err))
+            results.append({'parser': kind, 'failed': str(err)})
+            continue
+        finally:
+            os.remove(filename)
+
+        duration = best['duration'] or 1e-9
+        rss = best['rss_peak_mb']
+        print("%-16s %10d %10d %10.3f %12.0f %12.0f %10s" %
+              (kind, lines, best['features'], best['duration'], lines / duration, best['features'] / duration,
+               '-' if rss is None else '%.1f' % rss))
+
+        best.update({
+            'parser': kind,
+            'size': args.size,
+            'lines': lines,
+            'lines_per_s': lines / duration,
+            'features_per_s': best['features'] / duration,
+        })
+        results.append(best)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -3652,7 +3652,7 @@ class ImportEditorGrb(QtCore.QObject, DrawTool):
         """
         added_poly_count = 0
 
-        for obj in self.app.collection.get_list():
+        for obj in self.app.collection.get_list(hydrate=True):
             # only Gerber objects and only those that are active and not the edited object
             if obj.kind == 'gerber' and obj.obj_options['plot'] is True and \
                     obj.obj_options['name'] != self.draw_app.gerber_obj.obj_options['name']:
@@ -3710,7 +3710,7 @@ class ImportEditorGrb(QtCore.QObject, DrawTool):
         color = self.draw_app.get_sel_color() + 'AF'
         face_color = self.draw_app.get_sel_color() + 'AF'
 
-        for obj in self.app.collection.get_list():
+        for obj in self.app.collection.get_list(hydrate=True):
             # only Gerber objects and only those that are active and not the edited object
             if obj.kind == 'gerber' and obj.obj_options['plot'] is True and \
                     obj.obj_options['name'] != self.draw_app.gerber_obj.obj_options['name']:
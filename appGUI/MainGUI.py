@@ -187,6 +187,11 @@ class MainGUI(QtWidgets.QMainWindow):
                                                   '%s...\t%s' % (_('Open Excellon'), _('Ctrl+E')), self)
         self.menufile_open.addAction(self.menufileopenexcellon)
 
+        # Open Folder ...
+        self.menufileopenfolder = QtGui.QAction(QtGui.QIcon(self.app.resource_location + '/folder32.png'),
+                                                '%s...\t%s' % (_('Open Gerber/Excellon Folder'), ''), self)
+        self.menufile_open.addAction(self.menufileopenfolder)
+
         # Open G-Code ...
         self.menufileopengcode = QtGui.QAction(
             QtGui.QIcon(self.app.resource_location + '/code.png'), '%s...\t%s' % (_('Open G-Code'), ''), self)
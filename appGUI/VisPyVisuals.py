@@ -10,7 +10,7 @@ from vispy.visuals import CompoundVisual, LineVisual, MeshVisual, TextVisual, Ma
 from vispy.scene.visuals import VisualNode, generate_docstring, visuals
 from vispy.gloo import set_state
 from vispy.color import Color
-from shapely import Polygon, LineString, LinearRing
+import shapely
 import threading
 import numpy as np
 from appGUI.VisPyTesselators import GLUTess
@@ -28,103 +28,96 @@ from appGUI.VisPyTesselators import GLUTess
 #         self.update()
 
 
-def _update_shape_buffers(data, triangulation='glu'):
+# how many shapes are translated to buffers in one process pool task
+SHAPES_BATCH_SIZE = 2000
+
+
+def _update_shape_buffers(shapes, triangulation='glu'):
     """
-    Translates Shapely geometry to internal buffers for speedup redraws
-    :param data: dict
-        Input shape data
+    Translates a batch of Shapely geometries to internal buffers for speedup redraws.
+    The line segments of all the shapes are made in one pass with numpy; only the polygon faces are triangulated
+    one polygon at a time.
+
+    :param shapes: list
+        List of tuples (geometry, draw_lines, draw_faces, tolerance), one for each shape
     :param triangulation: str
         Triangulation engine
+    :return: list
+        A dict of buffers for each shape: 'line_pts' - float32 array with the end points of the line segments,
+        'mesh_vertices' - float32 array with the mesh vertices, 'mesh_tris' - uint32 array with the vertex indexes
+        of the mesh faces (3 for each triangle)
     """
-    mesh_vertices = []                                              # Vertices for mesh
-    mesh_tris = []                                                  # Faces for mesh
-    mesh_colors = []                                                # Face colors
-    line_pts = []                                                   # Vertices for line
-    line_colors = []                                                # Line color
-
-    geo, color, face_color, tolerance = data['geometry'], data['color'], data['face_color'], data['tolerance']
-
-    if geo is not None and not geo.is_empty:
-        simplified_geo = geo.simplify(tolerance) if tolerance else geo      # Simplified shape
-        pts = []                                                            # Shape line points
-        tri_pts = []                                                        # Mesh vertices
-        tri_tris = []                                                       # Mesh faces
-
-        if type(geo) == LineString:
-            # Prepare lines
-            pts = _linestring_to_segments(simplified_geo.coords)
-
-        elif type(geo) == LinearRing:
-            # Prepare lines
-            pts = _linearring_to_segments(simplified_geo.coords)
-
-        elif type(geo) == Polygon:
-            # Prepare polygon faces
-            if face_color is not None:
-                if triangulation == 'glu':
-                    gt = GLUTess()
-                    tri_tris, tri_pts = gt.triangulate(simplified_geo)
-                else:
-                    print("Triangulation type '%s' isn't implemented. Drawing only edges." % triangulation)
-
-            # Prepare polygon edges
-            if color is not None:
-                pts = _linearring_to_segments(simplified_geo.exterior.coords)
-                for ints in simplified_geo.interiors:
-                    pts += _linearring_to_segments(ints.coords)
-
-        # Appending data for mesh
-        if len(tri_pts) > 0 and len(tri_tris) > 0:
-            mesh_tris += tri_tris
-            mesh_vertices += tri_pts
-            face_color_rgba = Color(face_color).rgba
-            # mesh_colors += [face_color_rgba] * (len(tri_tris) // 3)
-            mesh_colors += [face_color_rgba for __ in range(len(tri_tris) // 3)]
-
-        # Appending data for line
-        if len(pts) > 0:
-            line_pts += pts
-            colo_rgba = Color(color).rgba
-            # line_colors += [colo_rgba] * len(pts)
-            line_colors += [colo_rgba for __ in range(len(pts))]
-
-    # Store buffers
-    data['line_pts'] = line_pts
-    data['line_colors'] = line_colors
-    data['mesh_vertices'] = mesh_vertices
-    data['mesh_tris'] = mesh_tris
-    data['mesh_colors'] = mesh_colors
-
-    # Clear shapely geometry
-    del data['geometry']
-
-    return data
-
-
-def _linearring_to_segments(arr):
-    # Close linear ring
-    """
-    Translates linear ring to line segments
-    :param arr: numpy.array
-        Array of linear ring vertices
-    :return: numpy.array
-        Line segments
-    """
-    if arr[0] != arr[-1]:
-        arr.append(arr[0])
-
-    return _linestring_to_segments(arr)
-
+    shapes_nr = len(shapes)
+    geo_arr = np.empty(shapes_nr, dtype=object)
+    geo_arr[:] = [s[0] for s in shapes]
+    draw_lines = np.array([s[1] for s in shapes], dtype=bool)
+    draw_faces = np.array([s[2] for s in shapes], dtype=bool)
+    tolerance = np.array([s[3] if s[3] else 0.0 for s in shapes], dtype=float)
+
+    # the type is checked on the original geometry and the buffers are made from the simplified geometry
+    type_ids = shapely.get_type_id(geo_arr)
+    valid = (type_ids >= 0) & ~shapely.is_empty(geo_arr)
+
+    simplified_geo = geo_arr.copy()                                         # Simplified shapes
+    to_simplify = valid & (tolerance > 0)
+    simplified_geo[to_simplify] = shapely.simplify(geo_arr[to_simplify], tolerance[to_simplify])
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Lines: the LineStrings, the LinearRings and the edges (rings) of the Polygons
+    # ------------------------------------------------------------------------------------------------------------
+    is_line = valid & draw_lines & ((type_ids == shapely.GeometryType.LINESTRING) |
+                                    (type_ids == shapely.GeometryType.LINEARRING))
+    is_poly_edge = valid & draw_lines & (type_ids == shapely.GeometryType.POLYGON)
+
+    poly_idx = np.flatnonzero(is_poly_edge)
+    rings, ring_owner = shapely.get_rings(simplified_geo[poly_idx], return_index=True)
+    line_idx = np.flatnonzero(is_line)
+
+    paths = np.concatenate([simplified_geo[line_idx], rings])
+    path_owner = np.concatenate([line_idx, poly_idx[ring_owner]])
+    # keep the paths of a shape together (for a Polygon the exterior is followed by the interiors)
+    order = np.argsort(path_owner, kind='stable')
+    paths = paths[order]
+    path_owner = path_owner[order]
+
+    coords, coord_path = shapely.get_coordinates(paths, return_index=True)
+    # each pair of consecutive points of the same path makes a segment
+    starts = np.flatnonzero(coord_path[:-1] == coord_path[1:])
+    segments = np.empty((2 * len(starts), 2), dtype=np.float32)
+    segments[0::2] = coords[starts]
+    segments[1::2] = coords[starts + 1]
+
+    segment_counts = 2 * np.bincount(path_owner[coord_path[starts]], minlength=shapes_nr)
+    line_pts = np.split(segments, np.cumsum(segment_counts)[:-1])
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Polygon faces
+    # ------------------------------------------------------------------------------------------------------------
+    mesh_vertices = [np.empty((0, 2), dtype=np.float32)] * shapes_nr
+    mesh_tris = [np.empty(0, dtype=np.uint32)] * shapes_nr
+
+    face_idx = np.flatnonzero(valid & draw_faces & (type_ids == shapely.GeometryType.POLYGON))
+    if face_idx.size > 0:
+        if triangulation == 'glu':
+            gt = GLUTess()
+            for idx in face_idx:
+                tri_tris, tri_pts = gt.triangulate(simplified_geo[idx])
+                if len(tri_pts) > 0 and len(tri_tris) > 0:
+                    try:
+                        mesh_tris[idx] = np.asarray(tri_tris, dtype=np.uint32)
+                        mesh_vertices[idx] = np.asarray(tri_pts, dtype=np.float32)[:, :2]
+                    except (TypeError, ValueError) as e:
+                        print("VisPyVisuals._update_shape_buffers() --> Triangulation data error. %s" % str(e))
+        else:
+            print("Triangulation type '%s' isn't implemented. Drawing only edges." % triangulation)
 
-def _linestring_to_segments(arr):
-    """
-    Translates line strip to segments
-    :param arr: numpy.array
-        Array of line strip vertices
-    :return: numpy.array
-        Line segments
-    """
-    return [arr[i // 2] for i in range(0, len(arr) * 2)][1:-1]
+    return [
+        {
+            'line_pts': line_pts[idx],
+            'mesh_vertices': mesh_vertices[idx],
+            'mesh_tris': mesh_tris[idx]
+        } for idx in range(shapes_nr)
+    ]
 
 
 class ShapeGroup(object):
@@ -256,7 +249,13 @@ class ShapeCollectionVisual(CompoundVisual):
 
         # Process pool
         self.pool = pool
+        # the shape index -> (pool result, position in the batch)
         self.results = {}
+        # the indexes of the shapes not yet sent to be translated to buffers
+        self.pending = []
+
+        # color -> RGBA color
+        self.rgba_cache = {}
 
         self._meshes = [MeshVisual() for _ in range(0, layers)]
         # self._lines = [LineVisual(antialias=True) for _ in range(0, layers)]
@@ -320,31 +319,76 @@ class ShapeCollectionVisual(CompoundVisual):
             'visible': visible,
             'layer': layer,
             'tolerance': tolerance,
-            # the following keys are updated in the _update_shape_buffers() method
-            'mesh_vertices': [],    # Vertices for mesh
-            'mesh_tris': [],        # Faces for mesh
-            'mesh_colors': [],      # Face colors
-            'line_pts': [],         # Vertices for line
-            'line_colors': []       # Line colors
+            # the following keys are updated with the results of the _update_shape_buffers() function
+            'mesh_vertices': np.empty((0, 2), dtype=np.float32),    # Vertices for mesh
+            'mesh_tris': np.empty(0, dtype=np.uint32),              # Faces for mesh
+            'line_pts': np.empty((0, 2), dtype=np.float32)          # Vertices for line
         }
 
         if linewidth:
             self._line_width = linewidth
 
-        if self.fc_options and self.fc_options["global_graphic_engine_3d_no_mp"] is True:
-            self.data[key] = _update_shape_buffers(self.data[key])
-        else:
-            # Add data to process pool if pool exists
-            try:
-                self.results[key] = self.pool.map_async(_update_shape_buffers, [self.data[key]])
-            except Exception:
-                self.data[key] = _update_shape_buffers(self.data[key])
+        # the shapes are translated to buffers in batches
+        self.results_lock.acquire(True)
+        self.results.pop(key, None)
+        self.pending.append(key)
+        batch_full = len(self.pending) >= SHAPES_BATCH_SIZE
+        self.results_lock.release()
+
+        if batch_full:
+            self.submit_pending()
 
         if update:
             self.redraw()   # redraw() waits for pool process end
 
         return key
 
+    def submit_pending(self):
+        """
+        Sends the shapes added since the last call to be translated to buffers, in one batch. The batch is processed
+        in the process pool if one exists.
+        """
+        self.results_lock.acquire(True)
+
+        keys = [k for k in self.pending if k in self.data]
+        del self.pending[:]
+
+        if keys:
+            batch = [
+                (
+                    self.data[k]['geometry'],
+                    self.data[k]['color'] is not None,
+                    self.data[k]['face_color'] is not None,
+                    self.data[k]['tolerance']
+                ) for k in keys
+            ]
+
+            if self.fc_options and self.fc_options["global_graphic_engine_3d_no_mp"] is True:
+                self.store_buffers(keys, _update_shape_buffers(batch))
+            else:
+                # Add data to process pool if pool exists
+                try:
+                    result = self.pool.apply_async(_update_shape_buffers, args=(batch, ))
+                    for pos, k in enumerate(keys):
+                        self.results[k] = (result, pos)
+                except Exception:
+                    self.store_buffers(keys, _update_shape_buffers(batch))
+
+        self.results_lock.release()
+
+    def store_buffers(self, keys, buffers):
+        """
+        Stores the translated buffers in the shapes data and clears the Shapely geometry
+        :param keys: list
+            Shape indexes
+        :param buffers: list
+            The buffers of each shape, as returned by _update_shape_buffers()
+        """
+        for k, shape_buffers in zip(keys, buffers):
+            if k in self.data:
+                self.data[k].update(shape_buffers)
+                self.data[k].pop('geometry', None)
+
     def remove(self, key, update=False):
         """
         Removes shape from collection
@@ -355,8 +399,7 @@ class ShapeCollectionVisual(CompoundVisual):
         """
         # Remove process result
         self.results_lock.acquire(True)
-        if key in list(self.results.copy().keys()):
-            del self.results[key]
+        self.results.pop(key, None)
         self.results_lock.release()
 
         # Remove data
@@ -372,8 +415,14 @@ class ShapeCollectionVisual(CompoundVisual):
         :param update: bool
             Set True to redraw collection
         """
+        self.results_lock.acquire(True)
         self.last_key = -1
         self.data.clear()
+        # the keys are reused therefore the results not yet collected are dropped
+        self.results.clear()
+        del self.pending[:]
+        self.results_lock.release()
+
         if update:
             self.__update()
 
@@ -390,6 +439,62 @@ class ShapeCollectionVisual(CompoundVisual):
 
         self.update_lock.release()
 
+    def get_rgba(self, color):
+        """
+        Converts a color to RGBA, with a cache since the shapes of a collection use few colors
+        :param color: str, tuple
+            The color
+        :return: tuple
+            RGBA color
+        """
+        try:
+            return self.rgba_cache[color]
+        except KeyError:
+            rgba = Color(color).rgba
+            self.rgba_cache[color] = rgba
+            return rgba
+        except TypeError:
+            # unhashable color, like a list
+            return Color(color).rgba
+
+    def get_layer_buffers(self):
+        """
+        Collects the buffers of the visible shapes, for each layer
+        :return: list
+            A dict for each layer with the lists of buffers: 'line_pts', 'line_rgba' (one color for each shape),
+            'mesh_vertices', 'mesh_tris' and 'mesh_rgba' (one color for each shape)
+        """
+        layers = [
+            {'line_pts': [], 'line_rgba': [], 'mesh_vertices': [], 'mesh_tris': [], 'mesh_rgba': []}
+            for _ in range(0, len(self._meshes))
+        ]
+
+        for data in list(self.data.values()):
+            if data['visible'] and 'line_pts' in data:
+                try:
+                    layer_buffers = layers[data['layer']]
+                    if len(data['line_pts']) > 0:
+                        layer_buffers['line_pts'].append(data['line_pts'])
+                        layer_buffers['line_rgba'].append(self.get_rgba(data['color']))
+                    if len(data['mesh_tris']) > 0:
+                        layer_buffers['mesh_vertices'].append(data['mesh_vertices'])
+                        layer_buffers['mesh_tris'].append(data['mesh_tris'])
+                        layer_buffers['mesh_rgba'].append(self.get_rgba(data['face_color']))
+                except Exception as e:
+                    print("VisPyVisuals.ShapeCollectionVisual.get_layer_buffers() --> Data error. %s" % str(e))
+
+        return layers
+
+    @staticmethod
+    def get_line_colors(layer_buffers):
+        counts = [len(pts) for pts in layer_buffers['line_pts']]
+        return np.repeat(np.asarray(layer_buffers['line_rgba'], dtype=np.float32), counts, axis=0)
+
+    @staticmethod
+    def get_face_colors(layer_buffers):
+        counts = [len(tris) // 3 for tris in layer_buffers['mesh_tris']]
+        return np.repeat(np.asarray(layer_buffers['mesh_rgba'], dtype=np.float32), counts, axis=0)
+
     def update_color(self, new_mesh_color=None, new_line_color=None, indexes=None):
         if new_mesh_color is None and new_line_color is None:
             return
@@ -398,117 +503,41 @@ class ShapeCollectionVisual(CompoundVisual):
             return
 
         # if a new color is empty string then make it None so it will not be updated
-        # if a new color is valid then transform it here in a format palatable
-        mesh_color_rgba = None
-        line_color_rgba = None
-        if new_mesh_color:
-            if new_mesh_color != '':
-                mesh_color_rgba = Color(new_mesh_color).rgba
-            else:
-                new_mesh_color = None
-        if new_line_color:
-            if new_line_color != '':
-                line_color_rgba = Color(new_line_color).rgba
-            else:
-                new_line_color = None
-
-        mesh_colors = [[] for _ in range(0, len(self._meshes))]     # Face colors
-        line_colors = [[] for _ in range(0, len(self._meshes))]     # Line colors
-        line_pts = [[] for _ in range(0, len(self._lines))]         # Vertices for line
+        if new_mesh_color == '':
+            new_mesh_color = None
+        if new_line_color == '':
+            new_line_color = None
 
         # Lock sub-visuals updates
         self.update_lock.acquire(True)
-        # Merge shapes buffers
 
-        if indexes is None:
-            for k, data in list(self.data.items()):
-                if data['visible'] and 'line_pts' in data:
-                    if new_mesh_color and new_mesh_color != '':
-                        dim_mesh_tris = (len(data['mesh_tris']) // 3)
-                        if dim_mesh_tris != 0:
-                            try:
-                                mesh_colors[data['layer']] += [mesh_color_rgba] * dim_mesh_tris
-                                self.data[k]['face_color'] = new_mesh_color
-
-                                data['mesh_colors'] = [mesh_color_rgba for __ in range(len(data['mesh_colors']))]
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create mesh colors --> Data error. %s" % str(e))
-
-                    if new_line_color and new_line_color != '':
-                        dim_line_pts = (len(data['line_pts']))
-                        if dim_line_pts != 0:
-                            try:
-                                line_pts[data['layer']] += data['line_pts']
-                                line_colors[data['layer']] += [line_color_rgba] * dim_line_pts
-                                self.data[k]['color'] = new_line_color
-
-                                data['line_colors'] = [mesh_color_rgba for __ in range(len(data['line_colors']))]
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create line colors --> Data error. %s" % str(e))
-        else:
-            for k, data in list(self.data.items()):
-                if data['visible'] and 'line_pts' in data:
-                    dim_mesh_tris = (len(data['mesh_tris']) // 3)
-                    dim_line_pts = (len(data['line_pts']))
-
-                    if k in indexes:
-                        if new_mesh_color and new_mesh_color != '':
-                            if dim_mesh_tris != 0:
-                                try:
-                                    mesh_colors[data['layer']] += [mesh_color_rgba] * dim_mesh_tris
-                                    self.data[k]['face_color'] = new_mesh_color
-
-                                    data['mesh_colors'] = [mesh_color_rgba for __ in range(len(data['mesh_colors']))]
-                                except Exception as e:
-                                    print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                          "Create mesh colors --> Data error. %s" % str(e))
-                        if new_line_color and new_line_color != '':
-                            if dim_line_pts != 0:
-                                try:
-                                    line_pts[data['layer']] += data['line_pts']
-                                    line_colors[data['layer']] += [line_color_rgba] * dim_line_pts
-                                    self.data[k]['color'] = new_line_color
-
-                                    data['line_colors'] = [mesh_color_rgba for __ in range(len(data['line_colors']))]
-                                except Exception as e:
-                                    print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                          "Create line colors --> Data error. %s" % str(e))
-                    else:
-                        if dim_mesh_tris != 0:
-                            try:
-                                mesh_colors[data['layer']] += [Color(data['face_color']).rgba] * dim_mesh_tris
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create mesh colors --> Data error. %s" % str(e))
-
-                        if dim_line_pts != 0:
-                            try:
-                                line_pts[data['layer']] += data['line_pts']
-                                line_colors[data['layer']] += [Color(data['color']).rgba] * dim_line_pts
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create line colors --> Data error. %s" % str(e))
+        for k, data in list(self.data.items()):
+            if indexes is None or k in indexes:
+                if new_mesh_color:
+                    data['face_color'] = new_mesh_color
+                if new_line_color:
+                    data['color'] = new_line_color
+
+        layers = self.get_layer_buffers()
 
         # Updating meshes
-        if new_mesh_color and new_mesh_color != '':
+        if new_mesh_color:
             for i, mesh in enumerate(self._meshes):
-                if mesh_colors[i]:
+                if layers[i]['mesh_tris']:
                     try:
-                        mesh._meshdata.set_face_colors(colors=np.asarray(mesh_colors[i]))
+                        mesh._meshdata.set_face_colors(colors=self.get_face_colors(layers[i]))
                         mesh.mesh_data_changed()
                     except Exception as e:
                         print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
                               "Apply mesh colors --> Data error. %s" % str(e))
 
         # Updating lines
-        if new_line_color and new_line_color != '':
+        if new_line_color:
             for i, line in enumerate(self._lines):
-                if len(line_pts[i]) > 0:
+                if layers[i]['line_pts']:
                     line.visible = True
                     try:
-                        line._color = np.asarray(line_colors[i])
+                        line._color = self.get_line_colors(layers[i])
                         line._changed['color'] = True
                         line.update()
                     except Exception as e:
@@ -524,37 +553,28 @@ class ShapeCollectionVisual(CompoundVisual):
         """
         Merges internal buffers, sets data to visuals, redraws collection on scene
         """
-        mesh_vertices = [[] for _ in range(0, len(self._meshes))]       # Vertices for mesh
-        mesh_tris = [[] for _ in range(0, len(self._meshes))]           # Faces for mesh
-        mesh_colors = [[] for _ in range(0, len(self._meshes))]         # Face colors
-        line_pts = [[] for _ in range(0, len(self._lines))]             # Vertices for line
-        line_colors = [[] for _ in range(0, len(self._lines))]          # Line color
-
         # Lock sub-visuals updates
         self.update_lock.acquire(True)
 
         # Merge shapes buffers
-        for data in list(self.data.values()):
-            if data['visible'] and 'line_pts' in data:
-                try:
-                    line_pts[data['layer']] += data['line_pts']
-                    line_colors[data['layer']] += data['line_colors']
-
-                    mesh_tris[data['layer']] += [x + len(mesh_vertices[data['layer']]) for x in data['mesh_tris']]
-                    mesh_vertices[data['layer']] += data['mesh_vertices']
-                    mesh_colors[data['layer']] += data['mesh_colors']
-                except Exception as e:
-                    print("VisPyVisuals.ShapeCollectionVisual._update() --> Data error. %s" % str(e))
+        layers = self.get_layer_buffers()
 
         # Updating meshes
         for i, mesh in enumerate(self._meshes):
-            if len(mesh_vertices[i]) > 0:
+            layer_buffers = layers[i]
+            if layer_buffers['mesh_vertices']:
                 set_state(polygon_offset_fill=False)
-                faces_array = np.asarray(mesh_tris[i], dtype=np.uint32)
+
+                # the vertex indexes of each shape are shifted by the number of vertices of the shapes before it
+                vertices_counts = np.array([len(v) for v in layer_buffers['mesh_vertices']], dtype=np.uint32)
+                tris_counts = [len(t) for t in layer_buffers['mesh_tris']]
+                vertices_offsets = np.cumsum(vertices_counts) - vertices_counts
+                faces_array = np.concatenate(layer_buffers['mesh_tris']) + np.repeat(vertices_offsets, tris_counts)
+
                 mesh.set_data(
-                    vertices=np.asarray(mesh_vertices[i]),
+                    vertices=np.concatenate(layer_buffers['mesh_vertices']),
                     faces=faces_array.reshape((-1, 3)),
-                    face_colors=np.asarray(mesh_colors[i])
+                    face_colors=self.get_face_colors(layer_buffers)
                 )
             else:
                 mesh.set_data()
@@ -563,11 +583,12 @@ class ShapeCollectionVisual(CompoundVisual):
 
         # Updating lines
         for i, line in enumerate(self._lines):
-            if len(line_pts[i]) > 0:
+            layer_buffers = layers[i]
+            if layer_buffers['line_pts']:
                 line.visible = True
                 line.set_data(
-                    pos=np.asarray(line_pts[i]),
-                    color=np.asarray(line_colors[i]),
+                    pos=np.concatenate(layer_buffers['line_pts']),
+                    color=self.get_line_colors(layer_buffers),
                     width=self._line_width,
                     connect='segments')
             else:
@@ -586,16 +607,22 @@ class ShapeCollectionVisual(CompoundVisual):
             Shape indexes to get from process pool
         :param update_colors:
         """
+        # the shapes added after the last batch are translated now
+        self.submit_pending()
+
         # Only one thread can update data
         self.results_lock.acquire(True)
 
+        # the results of a batch are retrieved once and stored for all the shapes of the batch
+        batch_results = {}
         for i in list(self.data.keys()) if not indexes else indexes:
-            if i in list(self.results.keys()):
+            if i in self.results:
+                result, pos = self.results.pop(i)
                 try:
-                    self.results[i].wait()                                  # Wait for process results
-                    if i in self.data:
-                        self.data[i] = self.results[i].get()[0]             # Store translated data
-                        del self.results[i]
+                    if id(result) not in batch_results:
+                        result.wait()                                       # Wait for process results
+                        batch_results[id(result)] = result.get()
+                    self.store_buffers([i], [batch_results[id(result)][pos]])   # Store translated data
                 except Exception as e:
                     print("VisPyVisuals.ShapeCollectionVisual.redraw() --> Data error = %s. Indexes = %s" %
                           (str(e), str(indexes)))
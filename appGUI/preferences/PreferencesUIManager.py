@@ -74,6 +74,8 @@ class PreferencesUIManager(QtCore.QObject):
             "global_process_number": self.ui.general_pref_form.general_app_group.process_number_sb,
             "global_tolerance": self.ui.general_pref_form.general_app_group.tol_entry,
 
+            "global_project_format": self.ui.general_pref_form.general_app_group.project_format_radio,
+            "global_project_lazy_load": self.ui.general_pref_form.general_app_group.lazy_load_cb,
             "global_compression_level": self.ui.general_pref_form.general_app_group.compress_spinner,
             "global_save_compressed": self.ui.general_pref_form.general_app_group.save_type_cb,
             "global_autosave": self.ui.general_pref_form.general_app_group.autosave_cb,
@@ -163,6 +165,8 @@ class PreferencesUIManager(QtCore.QObject):
             "gerber_delayed_buffering": self.ui.gerber_pref_form.gerber_adv_opt_group.delayed_buffer_cb,
             "gerber_simplification": self.ui.gerber_pref_form.gerber_adv_opt_group.simplify_cb,
             "gerber_simp_tolerance": self.ui.gerber_pref_form.gerber_adv_opt_group.simplification_tol_spinner,
+            "gerber_bulk_flashes": self.ui.gerber_pref_form.gerber_adv_opt_group.bulk_flashes_cb,
+            "gerber_parallel_union": self.ui.gerber_pref_form.gerber_adv_opt_group.parallel_union_cb,
 
             # Gerber Export
             "gerber_exp_units": self.ui.gerber_pref_form.gerber_exp_group.gerber_units_radio,
@@ -479,6 +483,7 @@ class PreferencesUIManager(QtCore.QObject):
             "tools_ncc_newdia":          self.ui.plugin_eng_pref_form.tools_ncc_group.newdia_entry,
             "tools_ncc_plotting":       self.ui.plugin_eng_pref_form.tools_ncc_group.plotting_radio,
             "tools_ncc_check_valid":    self.ui.plugin_eng_pref_form.tools_ncc_group.valid_cb,
+            "tools_ncc_parallel":       self.ui.plugin_eng_pref_form.tools_ncc_group.parallel_cb,
 
             # CutOut Tool
             "tools_cutout_tooldia":          self.ui.plugin_pref_form.tools_cutout_group.cutout_tooldia_entry,
@@ -512,6 +517,7 @@ class PreferencesUIManager(QtCore.QObject):
             "tools_paint_connect":        self.ui.plugin_eng_pref_form.tools_paint_group.pathconnect_cb,
             "tools_paint_contour":       self.ui.plugin_eng_pref_form.tools_paint_group.contour_cb,
             "tools_paint_plotting":     self.ui.plugin_eng_pref_form.tools_paint_group.paint_plotting_radio,
+            "tools_paint_parallel":     self.ui.plugin_eng_pref_form.tools_paint_group.parallel_cb,
 
             "tools_paint_rest":          self.ui.plugin_eng_pref_form.tools_paint_group.rest_cb,
             "tools_paint_cutz":          self.ui.plugin_eng_pref_form.tools_paint_group.cutz_entry,
@@ -315,6 +315,29 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
 
         self.proj_ois = OptionalInputSection(self.save_type_cb, [self.compress_label, self.compress_spinner], True)
 
+        # Project File Format
+        self.project_format_label = FCLabel('%s:' % _('Format'))
+        self.project_format_label.setToolTip(
+            _("The format used when saving a FlatCAM project.\n"
+              "- JSON -> text format, readable by older versions\n"
+              "- Binary -> the geometry is stored in binary form,\n"
+              "much faster to save and load for large projects")
+        )
+        self.project_format_radio = RadioSet([{'label': _('JSON'), 'value': 'json'},
+                                              {'label': _('Binary'), 'value': 'binary'}], compact=True)
+
+        grid6.addWidget(self.project_format_label, 3, 0)
+        grid6.addWidget(self.project_format_radio, 3, 1)
+
+        # Lazy project loading CB
+        self.lazy_load_cb = FCCheckBox(_('Lazy Project Loading'))
+        self.lazy_load_cb.setToolTip(
+            _("When checked, the objects of an opened project are shown immediately\n"
+              "and their geometry is loaded in background or when the object is used.")
+        )
+
+        grid6.addWidget(self.lazy_load_cb, 5, 0, 1, 2)
+
         # Auto save CB
         self.autosave_cb = FCCheckBox(_('Enable Auto Save'))
         self.autosave_cb.setToolTip(
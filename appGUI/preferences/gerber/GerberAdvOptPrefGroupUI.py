@@ -101,6 +101,24 @@ class GerberAdvOptPrefGroupUI(OptionsGroupUI):
             ],
             logic=True)
 
+        # Bulk Flashes
+        self.bulk_flashes_cb = FCCheckBox(label=_('Bulk Flashes'))
+        self.bulk_flashes_cb.setToolTip(
+            _("When checked, the flash geometry is made in bulk\n"
+              "for all the flashes of an aperture, instead of\n"
+              "one flash at a time. Faster for files with many pads.")
+        )
+        adv_grid.addWidget(self.bulk_flashes_cb, 14, 0, 1, 2)
+
+        # Parallel Union
+        self.parallel_union_cb = FCCheckBox(label=_('Parallel Union'))
+        self.parallel_union_cb.setToolTip(
+            _("When checked, the geometry of a large Gerber file\n"
+              "is joined on tiles, in parallel, using all the\n"
+              "processes set in Preferences -> General.")
+        )
+        adv_grid.addWidget(self.parallel_union_cb, 15, 0, 1, 2)
+
         # self.layout.addStretch()
 
         # signals
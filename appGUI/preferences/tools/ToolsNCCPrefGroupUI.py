@@ -353,6 +353,16 @@ class ToolsNCCPrefGroupUI(OptionsGroupUI):
 
         gen_grid.addWidget(self.valid_cb, 10, 0, 1, 2)
 
+        # Parallel clearing
+        self.parallel_cb = FCCheckBox(label=_('Parallel clearing'))
+        self.parallel_cb.setToolTip(
+            _("If checked then the polygons are cleared in parallel,\n"
+              "using the processes of the application.\n"
+              "Not used when the plotting is 'Progressive'.")
+        )
+
+        gen_grid.addWidget(self.parallel_cb, 12, 0, 1, 2)
+
         GLay.set_common_column_size([par_grid, tool_grid, gen_grid], 0)
 
         self.layout.addStretch(1)
@@ -308,6 +308,16 @@ class ToolsPaintPrefGroupUI(OptionsGroupUI):
         gen_grid.addWidget(plotting_label, 8, 0)
         gen_grid.addWidget(self.paint_plotting_radio, 8, 1)
 
+        # Parallel painting
+        self.parallel_cb = FCCheckBox(label=_('Parallel painting'))
+        self.parallel_cb.setToolTip(
+            _("If checked then the polygons are painted in parallel,\n"
+              "using the processes of the application.\n"
+              "Not used when the plotting is 'Progressive' or for the 'Laser_lines' method.")
+        )
+
+        gen_grid.addWidget(self.parallel_cb, 10, 0, 1, 2)
+
         GLay.set_common_column_size([tool_grid, param_grid, gen_grid], 0)
 
         self.layout.addStretch(1)
@@ -7,8 +7,12 @@ from appEditors.AppGeoEditor import AppGeoEditor
 from appEditors.AppGerberEditor import AppGerberEditor
 
 from appGUI.GUIElements import FCFileSaveDialog, FCMessageBox
-from camlib import to_dict, dict2obj, ET, ParseError
+from camlib import ET, ParseError
+from appHandlers.AppProjectFile import is_binary_project, save_binary_project, load_binary_project, \
+    verify_binary_project, save_json_project, file_checksum, best_compressor, COMPRESSOR_NONE, BinaryObjectData, \
+    JsonObjectData, restore_json_object, decode_object, decode_objects
 from appParsers.ParseHPGL2 import HPGL2
+from appParsers.ParseBatch import parse_file_task, unpack_attributes, list_fab_files
 
 from appObjects.ObjectCollection import GerberObject, ExcellonObject, GeometryObject, ScriptObject, CNCJobObject
 
@@ -115,12 +119,15 @@ class AppIO(QtCore.QObject):
                                     alignment=Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignLeft,
                                     color=QtGui.QColor("lightgray"))
 
+        filenames = [filename for filename in filenames if filename != '']
         if len(filenames) == 0:
             self.inform.emit('[WARNING_NOTCL] %s' % _("Cancelled."))
+        elif len(filenames) > 1:
+            # parse all the files in parallel, in the processes of the App.pool
+            self.worker_task.emit({'fcn': self.open_files_batch,
+                                   'params': [[('gerber', filename) for filename in filenames]]})
         else:
-            for filename in filenames:
-                if filename != '':
-                    self.worker_task.emit({'fcn': self.open_gerber, 'params': [filename]})
+            self.worker_task.emit({'fcn': self.open_gerber, 'params': [filenames[0]]})
 
     def on_file_open_excellon(self, name=None):
         """
@@ -153,12 +160,38 @@ class AppIO(QtCore.QObject):
                                     alignment=Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignLeft,
                                     color=QtGui.QColor("lightgray"))
 
+        filenames = [filename for filename in filenames if filename != '']
         if len(filenames) == 0:
             self.inform.emit('[WARNING_NOTCL] %s' % _("Cancelled."))
+        elif len(filenames) > 1:
+            # parse all the files in parallel, in the processes of the App.pool
+            self.worker_task.emit({'fcn': self.open_files_batch,
+                                   'params': [[('excellon', filename) for filename in filenames]]})
         else:
-            for filename in filenames:
-                if filename != '':
-                    self.worker_task.emit({'fcn': self.open_excellon, 'params': [filename]})
+            self.worker_task.emit({'fcn': self.open_excellon, 'params': [filenames[0]]})
+
+    def on_file_open_folder(self):
+        """
+        File menu callback for opening all the Gerber and Excellon files of a folder (e.g. the fabrication output of
+        a PCB design).
+
+        :return: None
+        """
+
+        self.log.debug("on_file_open_folder()")
+
+        try:
+            folder = QtWidgets.QFileDialog.getExistingDirectory(caption=_("Open Folder"),
+                                                                directory=self.app.get_last_folder())
+        except TypeError:
+            folder = QtWidgets.QFileDialog.getExistingDirectory(caption=_("Open Folder"))
+
+        folder = str(folder)
+        if folder == '':
+            self.inform.emit('[WARNING_NOTCL] %s' % _("Cancelled."))
+            return
+
+        self.worker_task.emit({'fcn': self.open_folder, 'params': [folder]})
 
     def on_file_open_gcode(self, name=None):
         """
@@ -1184,7 +1217,7 @@ class AppIO(QtCore.QObject):
         if not obj_selection:
             self.inform.emit(
                 '[WARNING_NOTCL] %s %s' % (_("No object is selected."), _("Print everything in the workspace.")))
-            obj_selection = self.app.collection.get_list()
+            obj_selection = self.app.collection.get_list(hydrate=True)
 
         filter_ = "PDF File .pdf (*.PDF);; All Files (*.*)"
         try:
@@ -2013,7 +2046,7 @@ class AppIO(QtCore.QObject):
         self.app.pdf_tool.periodic_check(1000)
         self.worker_task.emit({'fcn': self.app.pdf_tool.open_pdf, 'params': [filename]})
 
-    def open_gerber(self, filename, outname=None, plot=True, from_tcl=False):
+    def open_gerber(self, filename, outname=None, plot=True, from_tcl=False, streaming=False):
         """
         Opens a Gerber file, parses it and creates a new object for
         it in the program. Thread-safe.
@@ -2024,6 +2057,8 @@ class AppIO(QtCore.QObject):
         :type filename:     str
         :param plot:        boolean, to plot or not the resulting object
         :param from_tcl:    True if run from Tcl Shell
+        :param streaming:   If True the file is parsed as a memory mapped stream and its source is not kept in the
+                            object. For very large files.
         :return: None
         """
 
@@ -2035,7 +2070,7 @@ class AppIO(QtCore.QObject):
 
             # Opening the file happens here
             try:
-                parse_ret_val = gerber_obj.parse_file(filename)
+                parse_ret_val = gerber_obj.parse_file(filename, streaming=streaming)
             except IOError:
                 app_obj.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open file"), filename))
                 return "fail"
@@ -2160,6 +2195,95 @@ class AppIO(QtCore.QObject):
             # appGUI feedback
             self.inform.emit('[success] %s: %s' % (_("Opened"), filename))
 
+    def open_folder(self, folder, plot=True):
+        """
+        Opens all the Gerber and Excellon files of a folder. The file kind is found from the file extension.
+
+        :param folder:  path to the folder
+        :param plot:    boolean, to plot or not the resulting objects
+        :return:        None or 'fail'
+        """
+        self.log.debug("open_folder()")
+
+        try:
+            files = list_fab_files(folder)
+        except OSError:
+            self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open"), folder))
+            return 'fail'
+
+        if not files:
+            self.inform.emit('[WARNING_NOTCL] %s: %s' % (_("No Gerber or Excellon files found in"), folder))
+            return 'fail'
+
+        return self.open_files_batch(files, plot=plot)
+
+    def open_files_batch(self, files, plot=True):
+        """
+        Opens a set of Gerber and Excellon files. The files are parsed in parallel, in the processes of the
+        App.pool, and then the objects are created here, in the order of the files. Thread-safe.
+
+        :param files:   list of tuples (kind, filename) where kind is 'gerber' or 'excellon'
+        :param plot:    boolean, to plot or not the resulting objects
+        :return:        None or 'fail' if no file could be opened
+        """
+        self.log.debug("open_files_batch()")
+
+        def make_obj_init(attributes):
+            def obj_init(new_obj, app_obj):
+                for attr, value in attributes.items():
+                    setattr(new_obj, attr, value)
+            return obj_init
+
+        with self.app.proc_container.new('%s...' % _("Opening")):
+            # the parser options are the same for all the files
+            options = dict(self.options)
+
+            pending = []
+            for kind, filename in files:
+                if not os.path.exists(filename):
+                    self.inform.emit('[ERROR_NOTCL] %s. %s' % (filename, _("File no longer available.")))
+                    continue
+                res = self.app.pool.apply_async(parse_file_task,
+                                                args=(kind, filename, options, self.app.app_units,
+                                                      self.app.decimals))
+                pending.append((kind, filename, res))
+
+            opened = 0
+            for kind, filename, res in pending:
+                while not res.ready():
+                    if self.app.abort_flag:
+                        self.inform.emit('[WARNING_NOTCL] %s' % _("Cancelled."))
+                        return 'fail'
+                    res.wait(0.1)
+
+                status, packed, geo_data, messages = res.get()
+                for msg in messages:
+                    if msg.startswith('[ERROR') or msg.startswith('[WARNING'):
+                        self.inform.emit(msg)
+                if status == 'fail':
+                    continue
+
+                name = filename.split('/')[-1].split('\\')[-1]
+                attributes = unpack_attributes(packed, geo_data)
+                ret_val = self.app.app_obj.new_object(kind, name, make_obj_init(attributes), autoselected=False,
+                                                      plot=plot)
+                if ret_val == 'fail':
+                    continue
+                if status == 'defective':
+                    self.inform.emit('[ERROR] %s: %s' % (_("The file parsing PARTIALLY FAILED. Check the file"),
+                                                         filename))
+
+                # Register recent file
+                self.app.file_opened.emit(kind, filename)
+                opened += 1
+
+            if opened == 0:
+                self.inform.emit('[ERROR_NOTCL] %s' % _("Failed to open the files."))
+                return 'fail'
+
+            # appGUI feedback
+            self.inform.emit('[success] %s: %d/%d' % (_("Opened"), opened, len(files)))
+
     def open_gcode(self, filename, outname=None, force_parsing=None, plot=True, from_tcl=False):
         """
         Opens a G-gcode file, parses it and creates a new object for
@@ -2522,7 +2646,20 @@ class AppIO(QtCore.QObject):
                         return
 
                 try:
-                    d = json.load(f, object_hook=dict2obj)
+                    if is_binary_project(prj_filename):
+                        # Open and parse a binary Project file
+                        f.close()
+                        try:
+                            # the objects are decoded later, in parallel, by restore_project_objects()
+                            d = load_binary_project(prj_filename, decode=False)
+                        except Exception as e:
+                            self.log.error("Failed to open project file: %s with error: %s" % (prj_filename, str(e)))
+                            self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open project file"),
+                                                                       prj_filename))
+                            return
+                    else:
+                        # the WKT strings are converted later, in parallel, by restore_project_objects()
+                        d = json.load(f)
                 except Exception as e:
                     self.log.debug(
                         "Failed to parse project file, trying to see if it loads as an LZMA archive: %s because %s" %
@@ -2533,15 +2670,18 @@ class AppIO(QtCore.QObject):
                     try:
                         with lzma.open(prj_filename) as f:
                             file_content = f.read().decode('utf-8')
-                            d = json.loads(file_content, object_hook=dict2obj)
+                            d = json.loads(file_content)
                     except Exception as e:
                         self.log.error("Failed to open project file: %s with error: %s" % (prj_filename, str(e)))
                         self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open project file"), prj_filename))
                         return
 
+                # the binary project files do not need to be checked for older projects
+                is_json_project = not is_binary_project(prj_filename)
+
                 # Check for older projects
                 found_older_project = False
-                for obj in d['objs']:
+                for obj in (d['objs'] if is_json_project else []):
                     if 'cnc_tools' in obj or 'exc_cnc_tools' in obj or 'apertures' in obj:
                         self.app.log.error(
                             'AppIO.open_project() --> %s %s. %s' %
@@ -2575,6 +2715,10 @@ class AppIO(QtCore.QObject):
                         self.app.log.error("Legacy Project. Loading not supported.")
                         return
 
+                if is_json_project:
+                    d['options'] = restore_json_object(d['options'])
+                    d['objs'] = [JsonObjectData(obj) for obj in d['objs']]
+
                 self.app.restore_project.emit(d, prj_filename, run_from_arg, from_tcl, cli, plot)
 
         self.app.worker_task.emit({'fcn': parse_worker, 'params': [project_filename]})
@@ -2627,12 +2771,25 @@ class AppIO(QtCore.QObject):
         self.app.restore_project_objects_sig.emit(proj_dict, filename, cli, plot)
 
     def restore_project_objects(self, proj_dict, filename, cli, plot):
+        # in lazy mode the objects are created only from their options and their geometry is decoded on demand
+        lazy_load = self.options["global_project_lazy_load"] is True
 
         def worker_task():
             with self.app.proc_container.new('%s' % _("Loading...")):
                 # Re-create objects
                 self.log.debug(" **************** Started PROEJCT loading... **************** ")
-                for obj in proj_dict['objs']:
+                lazy_objs = []
+
+                # the objects are decoded in a pool of threads and each one is added to the collection as soon as
+                # it is ready, in the project order
+                objs_source = proj_dict['objs'] if lazy_load else decode_objects(proj_dict['objs'])
+                for obj_data in objs_source:
+                    if lazy_load and isinstance(obj_data, (BinaryObjectData, JsonObjectData)):
+                        obj = obj_data.decode_metadata()
+                    else:
+                        obj = obj_data
+                        obj_data = None
+
                     try:
                         obj_name = obj['obj_options']['name']
                     except KeyError:
@@ -2642,72 +2799,12 @@ class AppIO(QtCore.QObject):
                         f"Recreating from opened project an {obj['kind'].capitalize()} object: {obj_name}")
 
                     def obj_init(new_obj, app_inst):
-                        try:
-                            new_obj.from_dict(obj)
-                        except Exception as except_error:
-                            app_inst.log.error('AppIO.open_project() --> ' + str(except_error))
-                            return 'fail'
+                        if obj_data is not None:
+                            # only the options are restored now, the rest when the object is hydrated
+                            return self.restore_object_options(new_obj, obj, lazy_data=obj_data)
+                        return self.restore_object_attributes(new_obj, obj)
 
-                        # make the 'obj_options' dict a LoudDict
-                        new_obj_options = LoudDict()
-                        try:
-                            new_obj_options.update(new_obj.obj_options)
-                        except AttributeError:
-                            new_obj_options.update(new_obj.options)
-                        except Exception as except_error:
-                            app_inst.log.error('AppIO.open_project() make a LoudDict--> ' + str(except_error))
-                            return 'fail'
-
-                        new_obj.obj_options = new_obj_options
-
-                        # #############################################################################################
-                        # for older projects loading try to convert the 'apertures' or 'cnc_tools' or 'exc_cnc_tools'
-                        # attributes, if found, to 'tools'
-                        # #############################################################################################
-                        # for older loaded projects
-                        if 'apertures' in obj:
-                            new_obj.tools = obj['apertures']
-                        if 'cnc_tools' in obj and obj['cnc_tools']:
-                            new_obj.tools = obj['cnc_tools']
-                        if 'exc_cnc_tools' in obj and obj['exc_cnc_tools']:
-                            new_obj.tools = obj['exc_cnc_tools']
-                            # add the used_tools (all of them will be used)
-                            new_obj.used_tools = [float(k) for k in new_obj.tools.keys()]
-                            # add a missing key, 'tooldia' used for plotting CNCJob objects
-                            for td in new_obj.tools:
-                                new_obj.tools[td]['tooldia'] = float(td)
-                        # #############################################################################################
-                        # #############################################################################################
-
-                        # try to make the keys in the tools dictionary to be integers
-                        # JSON serialization makes them strings
-                        # not all FlatCAM objects have the 'tools' dictionary attribute
-                        try:
-                            new_obj.tools = {
-                                int(tool): tool_dict for tool, tool_dict in list(new_obj.tools.items())
-                            }
-                        except ValueError:
-                            # for older loaded projects
-                            new_obj.tools = {
-                                float(tool): tool_dict for tool, tool_dict in list(new_obj.tools.items())
-                            }
-                        except Exception as other_error_msg:
-                            app_inst.log.error('AppIO.open_project() keys to int--> ' + str(other_error_msg))
-                            return 'fail'
-
-                        # #############################################################################################
-                        # for older loaded projects
-                        # ony older CNCJob objects hold those
-                        if 'cnc_tools' in obj:
-                            new_obj.obj_options['type'] = 'Geometry'
-                        if 'exc_cnc_tools' in obj:
-                            new_obj.obj_options['type'] = 'Excellon'
-                        # #############################################################################################
-
-                        if new_obj.kind == 'cncjob':
-                            # some attributes are serialized, so we need to take this into consideration in
-                            # CNCJob.set_ui()
-                            new_obj.is_loaded_from_project = True
+                    obj_plot = plot and obj_data is None
 
                     # for some reason, setting ui_title does not work when this method is called from Tcl Shell
                     # it's because the TclCommand is run in another thread (it inherits TclCommandSignaled)
@@ -2716,19 +2813,23 @@ class AppIO(QtCore.QObject):
                             self.app.ui.set_ui_title(name="{} {}: {}".format(
                                 _("Loading Project ... restoring"), obj['kind'].upper(), obj_name))
 
-                        ret = self.app.app_obj.new_object(obj['kind'], obj['obj_options']['name'], obj_init, plot=plot)
+                        ret = self.app.app_obj.new_object(obj['kind'], obj['obj_options']['name'], obj_init,
+                                                          plot=obj_plot)
                     except KeyError:
                         # allowance for older projects
                         if cli is None:
                             self.app.ui.set_ui_title(name="{} {}: {}".format(
                                 _("Loading Project ... restoring"), obj['kind'].upper(), obj_name))
                         try:
-                            ret = self.app.app_obj.new_object(obj['kind'], obj_name, obj_init, plot=plot)
+                            ret = self.app.app_obj.new_object(obj['kind'], obj_name, obj_init, plot=obj_plot)
                         except Exception:
                             continue
                     if ret == 'fail':
                         continue
 
+                    if obj_data is not None:
+                        lazy_objs.append(ret)
+
                 self.inform.emit('[success] %s: %s' % (_("Project loaded from"), filename))
 
                 self.app.should_we_save = False
@@ -2744,8 +2845,173 @@ class AppIO(QtCore.QObject):
 
                 self.log.debug(" **************** Finished PROJECT loading... **************** ")
 
+            if lazy_objs:
+                # decode the geometry of the objects in background
+                self.app.worker_task.emit({'fcn': self.prefetch_project_objects, 'params': [lazy_objs, plot]})
+
         self.app.worker_task.emit({'fcn': worker_task, 'params': []})
 
+    def restore_object_attributes(self, new_obj, obj):
+        """
+        Set the attributes of an object created from a project.
+
+        :param new_obj:     the FlatCAM object to be restored
+        :param obj:         the decoded dictionary from the project
+        :return:            'fail' in case of error
+        """
+        try:
+            new_obj.from_dict(obj)
+        except Exception as except_error:
+            self.log.error('AppIO.open_project() --> ' + str(except_error))
+            return 'fail'
+
+        # make the 'obj_options' dict a LoudDict
+        new_obj_options = LoudDict()
+        try:
+            new_obj_options.update(new_obj.obj_options)
+        except AttributeError:
+            new_obj_options.update(new_obj.options)
+        except Exception as except_error:
+            self.log.error('AppIO.open_project() make a LoudDict--> ' + str(except_error))
+            return 'fail'
+
+        new_obj.obj_options = new_obj_options
+
+        # #############################################################################################
+        # for older projects loading try to convert the 'apertures' or 'cnc_tools' or 'exc_cnc_tools'
+        # attributes, if found, to 'tools'
+        # #############################################################################################
+        # for older loaded projects
+        if 'apertures' in obj:
+            new_obj.tools = obj['apertures']
+        if 'cnc_tools' in obj and obj['cnc_tools']:
+            new_obj.tools = obj['cnc_tools']
+        if 'exc_cnc_tools' in obj and obj['exc_cnc_tools']:
+            new_obj.tools = obj['exc_cnc_tools']
+            # add the used_tools (all of them will be used)
+            new_obj.used_tools = [float(k) for k in new_obj.tools.keys()]
+            # add a missing key, 'tooldia' used for plotting CNCJob objects
+            for td in new_obj.tools:
+                new_obj.tools[td]['tooldia'] = float(td)
+        # #############################################################################################
+        # #############################################################################################
+
+        # try to make the keys in the tools dictionary to be integers
+        # JSON serialization makes them strings
+        # not all FlatCAM objects have the 'tools' dictionary attribute
+        try:
+            new_obj.tools = {
+                int(tool): tool_dict for tool, tool_dict in list(new_obj.tools.items())
+            }
+        except ValueError:
+            # for older loaded projects
+            new_obj.tools = {
+                float(tool): tool_dict for tool, tool_dict in list(new_obj.tools.items())
+            }
+        except Exception as other_error_msg:
+            self.log.error('AppIO.open_project() keys to int--> ' + str(other_error_msg))
+            return 'fail'
+
+        # #############################################################################################
+        # for older loaded projects
+        # ony older CNCJob objects hold those
+        if 'cnc_tools' in obj:
+            new_obj.obj_options['type'] = 'Geometry'
+        if 'exc_cnc_tools' in obj:
+            new_obj.obj_options['type'] = 'Excellon'
+        # #############################################################################################
+
+        if new_obj.kind == 'cncjob':
+            # some attributes are serialized, so we need to take this into consideration in
+            # CNCJob.set_ui()
+            new_obj.is_loaded_from_project = True
+
+    def restore_object_options(self, new_obj, obj, lazy_data):
+        """
+        Set only the options of an object created from a project in lazy mode. The rest of the attributes are set
+        by hydrate_object() when the object is first used.
+
+        :param new_obj:     the FlatCAM object to be restored
+        :param obj:         the object metadata from the project
+        :param lazy_data:   the not yet decoded project data of the object
+        :return:            'fail' in case of error
+        """
+        new_obj_options = LoudDict()
+        try:
+            new_obj_options.update(new_obj.obj_options)
+            new_obj_options.update(obj['obj_options'] if 'obj_options' in obj else obj['options'])
+        except Exception as except_error:
+            self.log.error('AppIO.restore_object_options() --> ' + str(except_error))
+            return 'fail'
+
+        new_obj.obj_options = new_obj_options
+        new_obj.lazy_data = lazy_data
+
+        if new_obj.kind == 'cncjob':
+            new_obj.is_loaded_from_project = True
+
+    def hydrate_object(self, new_obj, obj=None):
+        """
+        Decode and set the attributes of an object that was created from a project in lazy mode.
+        The options and the colors set since the object was created are kept.
+
+        :param new_obj:     the FlatCAM object to be hydrated
+        :param obj:         the decoded dictionary from the project; if None it is decoded from new_obj.lazy_data
+        :return:            'fail' in case of error
+        """
+        if obj is None:
+            obj = decode_object(new_obj.lazy_data)
+
+        obj.pop('options', None)
+        obj['obj_options'] = new_obj.obj_options
+        colors = {
+            attr: getattr(new_obj, attr) for attr in ['fill_color', 'outline_color', 'alpha_level']
+            if hasattr(new_obj, attr)
+        }
+
+        ret = self.restore_object_attributes(new_obj, obj)
+        if ret == 'fail':
+            return 'fail'
+
+        for attr, value in colors.items():
+            setattr(new_obj, attr, value)
+
+        if new_obj.kind in ['document', 'script']:
+            return
+
+        if self.options["units"].upper() != new_obj.units.upper():
+            new_obj.convert_units(self.options["units"])
+
+        try:
+            xmin, ymin, xmax, ymax = new_obj.bounds()
+            new_obj.obj_options['xmin'] = xmin
+            new_obj.obj_options['ymin'] = ymin
+            new_obj.obj_options['xmax'] = xmax
+            new_obj.obj_options['ymax'] = ymax
+        except Exception as e:
+            self.log.error("AppIO.hydrate_object() -> The object has no bounds properties. %s" % str(e))
+
+    def prefetch_project_objects(self, lazy_objs, plot):
+        """
+        Hydrate in background the objects loaded from a project in lazy mode.
+
+        :param lazy_objs:   list of FlatCAM objects created in lazy mode
+        :param plot:        if True, plot each object after it is hydrated
+        :return:            None
+        """
+        # objects already hydrated on demand are skipped
+        lazy_objs = [obj for obj in lazy_objs if obj.lazy_data is not None]
+
+        with self.app.proc_container.new('%s' % _("Loading...")):
+            # the decoding does not change the lazy data, so it is safe while an object is hydrated on demand
+            for obj, obj_dict in zip(lazy_objs, decode_objects([obj.lazy_data for obj in lazy_objs])):
+                # skip the deleted objects and those hydrated on demand (done or in progress) meanwhile
+                if obj.deleted or obj.lazy_data is None or obj.lazy_lock.locked():
+                    continue
+                obj.hydrate(obj_dict)
+                if plot:
+                    obj.plot_single_object.emit()
+
     def save_project(self, filename, quit_action=False, silent=False, from_tcl=False):
         """
         Saves the current project to the specified file.
@@ -2774,109 +3040,67 @@ class AppIO(QtCore.QObject):
                 self.log.error("save_project() --> There was no active object. Skipping read_form. %s" % str(e))
 
             app_options = {k: v for k, v in self.app.options.items()}
-            d = {
-                "objs":             [obj.to_dict() for obj in self.app.collection.get_list()],
-                "options":          app_options,
-                "version":          self.app.version
-            }
 
-            if self.options["global_save_compressed"] is True:
-                try:
-                    project_as_json = json.dumps(d, default=to_dict, indent=2, sort_keys=True).encode('utf-8')
-                except Exception as e:
-                    self.log.error(
-                        "Failed to serialize file before compression: %s because: %s" % (str(filename), str(e)))
-                    self.inform.emit('[ERROR_NOTCL] %s' % _("Failed."))
-                    self.app.save_in_progress = False
-                    return
+            def objs_dicts_gen():
+                # the objects are hydrated, serialized and written one at a time
+                for obj in self.app.collection.get_list():
+                    obj.hydrate()
+                    yield obj.to_dict()
 
-                try:
-                    # with lzma.open(filename, "w", preset=int(self.options['global_compression_level'])) as f:
-                    #     # # Write
-                    #     f.write(project_as_json)
-
-                    compressor_obj = lzma.LZMACompressor(preset=int(self.options['global_compression_level']))
-                    out1 = compressor_obj.compress(project_as_json)
-                    out2 = compressor_obj.flush()
-                    project_zipped = b"".join([out1, out2])
-                except Exception as error_msg:
-                    self.log.error("Failed to save compressed file: %s because: %s" % (str(filename), str(error_msg)))
-                    self.inform.emit('[ERROR_NOTCL] %s' % _("Failed."))
-                    self.app.save_in_progress = False
-                    return
-
-                if project_zipped != b'':
-                    with open(filename, "wb") as f_to_write:
-                        f_to_write.write(project_zipped)
+            objs_dicts = objs_dicts_gen()
 
-                    self.inform.emit('[success] %s: %s' % (_("Project saved to"), str(filename)))
+            if self.options["global_project_format"] == 'binary':
+                # geometry is stored as WKB in separately compressed binary chunks
+                if self.options["global_save_compressed"] is True:
+                    compressor = best_compressor()
                 else:
-                    self.log.error("Failed to save file: %s. Empty binary file.", str(filename))
+                    compressor = COMPRESSOR_NONE
+
+                try:
+                    save_binary_project(filename, objs_dicts, app_options, self.app.version, compressor=compressor,
+                                        level=int(self.options['global_compression_level']))
+                except Exception as e:
+                    self.log.error("Failed to save binary project file: %s because: %s" % (str(filename), str(e)))
                     self.inform.emit('[ERROR_NOTCL] %s' % _("Failed."))
                     self.app.save_in_progress = False
                     return
+
+                # verification of the saved project using the file trailer
+                saved_ok = verify_binary_project(filename)
             else:
-                # Open file
                 try:
-                    f = open(filename, 'w')
+                    saved_size, saved_crc = save_json_project(
+                        filename, objs_dicts, app_options, self.app.version,
+                        compressed=self.options["global_save_compressed"] is True,
+                        level=int(self.options['global_compression_level']))
                 except IOError:
                     self.log.error("Failed to open file for saving: %s", str(filename))
                     self.inform.emit('[ERROR_NOTCL] %s' % _("The object is used by another application."))
                     self.app.save_in_progress = False
                     return
-
-                # Write
-                try:
-                    json.dump(d, f, default=to_dict, indent=2, sort_keys=True)
                 except Exception as e:
                     self.log.error(
                         "Failed to serialize file: %s because: %s" % (str(filename), str(e)))
                     self.inform.emit('[ERROR_NOTCL] %s' % _("Failed."))
                     self.app.save_in_progress = False
                     return
-                f.close()
 
-                # verification of the saved project
-                # Open and parse
+                # verification of the saved project: what is on disk has to match what was written
                 try:
-                    saved_f = open(filename, 'r')
+                    saved_ok = file_checksum(filename) == (saved_size, saved_crc)
                 except IOError:
-                    if silent is False:
-                        self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
-                                         (_("Failed to verify project file"), str(filename), _("Retry to save it.")))
-                        self.app.save_in_progress = False
-                    return
-
-                try:
-                    saved_d = json.load(saved_f, object_hook=dict2obj)
-                    if not saved_d:
-                        self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
-                                         (_("Failed to parse saved project file"),
-                                          str(filename),
-                                          _("Retry to save it.")))  # noqa
-                        f.close()
-                        self.app.save_in_progress = False
-                        return
-                except Exception:
-                    if silent is False:
-                        self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
-                                         (_("Failed to parse saved project file"),
-                                          str(filename),
-                                          _("Retry to save it.")))  # noqa
-                    f.close()
-                    self.app.save_in_progress = False
-                    return
-
-                saved_f.close()
+                    saved_ok = False
 
+            if saved_ok is False:
+                self.log.error("Failed to verify project file: %s", str(filename))
                 if silent is False:
-                    if 'version' in saved_d:
-                        self.inform.emit('[success] %s: %s' % (_("Project saved to"), str(filename)))
-                    else:
-                        self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
-                                         (_("Failed to parse saved project file"),
-                                          str(filename),
-                                          _("Retry to save it.")))  # noqa
+                    self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
+                                     (_("Failed to verify project file"), str(filename), _("Retry to save it.")))
+                self.app.save_in_progress = False
+                return
+
+            if silent is False:
+                self.inform.emit('[success] %s: %s' % (_("Project saved to"), str(filename)))
 
             # if quit:
             # t = threading.Thread(target=lambda: self.check_project_file_size(1, filename=filename))
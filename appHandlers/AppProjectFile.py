@@ -0,0 +1,727 @@
+# ##########################################################
+# FlatCAM Evo: 2D Post-processing for Manufacturing        #
+# MIT Licence                                              #
+# ##########################################################
+
+# ##########################################################
+# Binary project file format.
+#
+# The file starts with a small header followed by a sequence of chunks:
+#
+#   header:  MAGIC (8 bytes) | format version (uint16) | compressor id (uint8)
+#   chunk:   tag (4 bytes) | compressed size (uint64) | raw size (uint64) | CRC32 of the raw data (uint32) | payload
+#
+# Chunks:
+#   HEAD    JSON with the project options and the application version
+#   OBJD    JSON with the serialized object attributes. Every Shapely geometry is replaced by a reference to its
+#           index in the following GEOM chunk
+#   GEOM    geometry of the previous OBJD chunk: count (uint64) | offsets (count + 1 x int64) | WKB blobs
+#   END     end of the project; not compressed. It holds the number of objects and the size and CRC32 of all the
+#           bytes written before it, so the file can be verified without decompressing and parsing it
+#
+# Each chunk is compressed on its own, so the geometry is never converted to text and the objects can be decoded
+# one by one.
+# ##########################################################
+
+from camlib import to_dict, dict2obj
+
+from shapely import LinearRing
+from shapely.geometry.base import BaseGeometry
+import shapely
+
+import numpy as np
+import simplejson as json
+
+from concurrent.futures import ThreadPoolExecutor, Future
+import os
+import shutil
+import uuid
+import struct
+import zlib
+import lzma
+
+HAS_ZSTD = True
+try:
+    import zstandard
+except ModuleNotFoundError:
+    HAS_ZSTD = False
+
+HAS_LZ4 = True
+try:
+    import lz4.frame
+except ModuleNotFoundError:
+    HAS_LZ4 = False
+
+MAGIC = b'FCPRJBIN'
+FORMAT_VERSION = 1
+
+HEADER_STRUCT = struct.Struct('<8sHB')
+CHUNK_STRUCT = struct.Struct('<4sQQI')
+TRAILER_STRUCT = struct.Struct('<QQI')
+
+# size of the blocks read when verifying a saved file
+READ_BLOCK_SIZE = 1024 * 1024
+
+TAG_HEAD = b'HEAD'
+TAG_OBJECT = b'OBJD'
+TAG_GEOMETRY = b'GEOM'
+TAG_END = b'END '
+
+COMPRESSOR_NONE = 0
+COMPRESSOR_ZLIB = 1
+COMPRESSOR_LZMA = 2
+COMPRESSOR_ZSTD = 3
+COMPRESSOR_LZ4 = 4
+
+
+class ProjectFileError(Exception):
+    pass
+
+
+class ChecksumFile:
+    """
+    Wraps a file opened for binary writing and keeps the size and the CRC32 of everything written through it.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.size = 0
+        self.crc = 0
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def file_checksum(filename, size=None):
+    """
+    Calculate the CRC32 of a file, reading it in blocks.
+
+    :param filename:    path to the file
+    :param size:        if given, only the first size bytes are used
+    :return:            tuple (number of bytes read, CRC32)
+    """
+    crc = 0
+    read_size = 0
+    with open(filename, 'rb') as f:
+        while size is None or read_size < size:
+            block_size = READ_BLOCK_SIZE if size is None else min(READ_BLOCK_SIZE, size - read_size)
+            block = f.read(block_size)
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+            read_size += len(block)
+    return read_size, crc
+
+
+def open_temp_file(filename):
+    """
+    Create a new temporary file in the same folder as the file, so it can replace it with an atomic rename.
+
+    :param filename:    path of the file that will be replaced by the temporary file
+    :return:            tuple (file object opened for binary writing, path of the temporary file)
+    """
+    tmp_filename = '%s.%s.tmp' % (filename, uuid.uuid4().hex[:8])
+    return open(tmp_filename, 'xb'), tmp_filename
+
+
+def replace_file(tmp_filename, filename):
+    """
+    Replace the file with the temporary file. The permissions of the replaced file are kept.
+
+    :param tmp_filename:    path of the temporary file
+    :param filename:        path of the file to be replaced
+    :return:                None
+    """
+    if os.path.exists(filename):
+        try:
+            shutil.copymode(filename, tmp_filename)
+        except OSError:
+            pass
+    os.replace(tmp_filename, filename)
+
+
+def remove_temp_file(tmp_filename):
+    """
+    Delete the temporary file if it still exists (it was not moved over the target file).
+
+    :param tmp_filename:    path of the temporary file
+    :return:                None
+    """
+    try:
+        os.remove(tmp_filename)
+    except OSError:
+        pass
+
+
+def best_compressor():
+    """
+    The fastest compressor available. The zstd and lz4 compressors are used if their Python packages are installed,
+    otherwise the zlib compressor from the standard library is used.
+
+    :return:    compressor id
+    :rtype:     int
+    """
+    if HAS_ZSTD:
+        return COMPRESSOR_ZSTD
+    if HAS_LZ4:
+        return COMPRESSOR_LZ4
+    return COMPRESSOR_ZLIB
+
+
+def compress_data(data, compressor, level=3):
+    """
+
+    :param data:        bytes to compress
+    :param compressor:  compressor id
+    :param level:       compression level, in the range 0 ... 9
+    :return:            compressed bytes
+    """
+    if compressor == COMPRESSOR_NONE:
+        return data
+    if compressor == COMPRESSOR_ZLIB:
+        return zlib.compress(data, level)
+    if compressor == COMPRESSOR_LZMA:
+        return lzma.compress(data, preset=level)
+    if compressor == COMPRESSOR_ZSTD:
+        return zstandard.ZstdCompressor(level=level + 1).compress(data)
+    if compressor == COMPRESSOR_LZ4:
+        return lz4.frame.compress(data, compression_level=level)
+    raise ProjectFileError("Unknown compressor: %s" % str(compressor))
+
+
+def decompress_data(data, compressor):
+    """
+
+    :param data:        compressed bytes
+    :param compressor:  compressor id
+    :return:            decompressed bytes
+    """
+    if compressor == COMPRESSOR_NONE:
+        return bytes(data)
+    if compressor == COMPRESSOR_ZLIB:
+        return zlib.decompress(data)
+    if compressor == COMPRESSOR_LZMA:
+        return lzma.decompress(data)
+    if compressor == COMPRESSOR_ZSTD:
+        if not HAS_ZSTD:
+            raise ProjectFileError("The project is compressed with zstd but the 'zstandard' package is missing.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compressor == COMPRESSOR_LZ4:
+        if not HAS_LZ4:
+            raise ProjectFileError("The project is compressed with lz4 but the 'lz4' package is missing.")
+        return lz4.frame.decompress(data)
+    raise ProjectFileError("Unknown compressor: %s" % str(compressor))
+
+
+def is_binary_project(filename):
+    """
+    Check if the file is a project saved in the binary format.
+
+    :param filename:    path to the project file
+    :return:            True if the file starts with the binary project signature
+    """
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+
+def encode_geometry(geo_list):
+    """
+    Pack a list of Shapely geometries as WKB blobs preceded by their offsets.
+
+    :param geo_list:    list of Shapely geometries
+    :return:            bytes
+    """
+    wkb_arr = shapely.to_wkb(np.asarray(geo_list, dtype=object))
+    offsets = np.zeros(len(wkb_arr) + 1, dtype='<i8')
+    np.cumsum([len(w) for w in wkb_arr], out=offsets[1:])
+    return b''.join([struct.pack('<Q', len(wkb_arr)), offsets.tobytes()] + list(wkb_arr))
+
+
+def decode_geometry(data):
+    """
+    Reverse of encode_geometry().
+
+    :param data:    bytes as created by encode_geometry()
+    :return:        numpy array of Shapely geometries
+    """
+    count = struct.unpack_from('<Q', data, 0)[0]
+    offsets = np.frombuffer(data, dtype='<i8', count=count + 1, offset=8)
+    start = 8 + 8 * (count + 1)
+    view = memoryview(data)
+    wkb_arr = np.empty(count, dtype=object)
+    for idx in range(count):
+        wkb_arr[idx] = bytes(view[start + offsets[idx]:start + offsets[idx + 1]])
+    return shapely.from_wkb(wkb_arr)
+
+
+def serialize_object(obj_dict):
+    """
+    Serialize the dictionary of an object (as returned by FlatCAMObj.to_dict()) into a JSON document where every
+    Shapely geometry is replaced by a reference and the geometry block holding the referenced geometries.
+
+    :param obj_dict:    dictionary with the object attributes
+    :return:            tuple (JSON bytes, geometry bytes)
+    """
+    geo_list = []
+
+    def default(obj):
+        if isinstance(obj, BaseGeometry):
+            ref = {
+                "__class__": "ShplyRef",
+                "__inst__": len(geo_list)
+            }
+            if isinstance(obj, LinearRing):
+                # WKB has no LinearRing type, so it would be read back as a LineString
+                ref["__ring__"] = True
+            geo_list.append(obj)
+            return ref
+        return to_dict(obj)
+
+    obj_json = json.dumps(obj_dict, default=default).encode('utf-8')
+    return obj_json, encode_geometry(geo_list)
+
+
+def deserialize_object(obj_json, geo_data):
+    """
+    Reverse of serialize_object().
+
+    :param obj_json:    JSON bytes
+    :param geo_data:    geometry bytes
+    :return:            dictionary with the object attributes
+    """
+    geo_arr = decode_geometry(geo_data)
+
+    def object_hook(d):
+        if d.get('__class__') == "ShplyRef":
+            geo = geo_arr[d['__inst__']]
+            if d.get('__ring__'):
+                geo = LinearRing(geo.coords)
+            return geo
+        return dict2obj(d)
+
+    return json.loads(obj_json.decode('utf-8'), object_hook=object_hook)
+
+
+class ProjectWriter:
+    """
+    Writes a project in the binary format. The chunks are written to the file as soon as they are created, so only
+    the object currently serialized is held in memory.
+    """
+
+    def __init__(self, filename, compressor=None, level=3):
+        self.filename = filename
+        self.compressor = best_compressor() if compressor is None else compressor
+        self.level = int(level)
+        self.f = None
+        self.raw_f = None
+        self.tmp_filename = None
+        self.obj_count = 0
+
+    def __enter__(self):
+        # the project is written to a temporary file that replaces the target file only after it is verified
+        self.raw_f, self.tmp_filename = open_temp_file(self.filename)
+        try:
+            self.f = ChecksumFile(self.raw_f)
+            self.f.write(HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, self.compressor))
+        except Exception:
+            self.raw_f.close()
+            remove_temp_file(self.tmp_filename)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            try:
+                if exc_type is None:
+                    self.write_trailer()
+            finally:
+                self.raw_f.close()
+
+            if exc_type is None:
+                if not verify_binary_project(self.tmp_filename):
+                    raise ProjectFileError("The written project file failed the verification.")
+                replace_file(self.tmp_filename, self.filename)
+        finally:
+            remove_temp_file(self.tmp_filename)
+        return False
+
+    def write_chunk(self, tag, data):
+        payload = compress_data(data, self.compressor, self.level)
+        self.f.write(CHUNK_STRUCT.pack(tag, len(payload), len(data), zlib.crc32(data)))
+        self.f.write(payload)
+
+    def write_trailer(self):
+        trailer = TRAILER_STRUCT.pack(self.obj_count, self.f.size, self.f.crc)
+        self.f.write(CHUNK_STRUCT.pack(TAG_END, len(trailer), len(trailer), zlib.crc32(trailer)))
+        self.f.write(trailer)
+
+    def write_header(self, options, version):
+        head = {
+            "options": options,
+            "version": version
+        }
+        self.write_chunk(TAG_HEAD, json.dumps(head, default=to_dict).encode('utf-8'))
+
+    def write_object(self, obj_dict):
+        obj_json, geo_data = serialize_object(obj_dict)
+        self.write_chunk(TAG_OBJECT, obj_json)
+        self.write_chunk(TAG_GEOMETRY, geo_data)
+        self.obj_count += 1
+
+
+class ProjectReader:
+    """
+    Reads a project saved in the binary format.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.compressor = COMPRESSOR_NONE
+        self.format_version = None
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.filename, 'rb')
+        try:
+            header = self.f.read(HEADER_STRUCT.size)
+            if len(header) != HEADER_STRUCT.size:
+                raise ProjectFileError("Truncated project file.")
+            magic, self.format_version, self.compressor = HEADER_STRUCT.unpack(header)
+            if magic != MAGIC:
+                raise ProjectFileError("Not a binary project file.")
+            if self.format_version > FORMAT_VERSION:
+                raise ProjectFileError("The project was saved by a newer version of the application.")
+        except Exception:
+            # __exit__() is not called when __enter__() fails
+            self.f.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.f.close()
+        return False
+
+    def read_raw_chunk(self):
+        """
+        Read a chunk without decompressing it.
+
+        :return:    tuple (tag, payload, raw size, CRC32 of the raw data)
+        """
+        chunk_header = self.f.read(CHUNK_STRUCT.size)
+        if len(chunk_header) != CHUNK_STRUCT.size:
+            raise ProjectFileError("Truncated project file.")
+        tag, size, raw_size, crc = CHUNK_STRUCT.unpack(chunk_header)
+        payload = self.f.read(size)
+        if len(payload) != size:
+            raise ProjectFileError("Truncated project file.")
+        return tag, payload, raw_size, crc
+
+    def read_chunk(self):
+        """
+
+        :return:    tuple (tag, raw data)
+        """
+        tag, payload, raw_size, crc = self.read_raw_chunk()
+        # the trailer is not compressed
+        compressor = COMPRESSOR_NONE if tag == TAG_END else self.compressor
+        return tag, unpack_chunk(tag, payload, raw_size, crc, compressor)
+
+    def read_project(self, decode=True):
+        """
+        Read the whole project.
+
+        :param decode:  if False the objects are not decoded; they are returned as BinaryObjectData instances that
+                        can be decoded later, in parallel, with decode_objects()
+        :return:        dictionary with the same structure as the JSON project: 'objs', 'options' and 'version' keys
+        """
+        proj_dict = {
+            "objs": [],
+            "options": {},
+            "version": None
+        }
+
+        obj_chunk = None
+        while True:
+            tag, payload, raw_size, crc = self.read_raw_chunk()
+            if tag == TAG_END:
+                break
+            if tag == TAG_HEAD:
+                data = unpack_chunk(tag, payload, raw_size, crc, self.compressor)
+                head = json.loads(data.decode('utf-8'), object_hook=dict2obj)
+                proj_dict['options'] = head['options']
+                proj_dict['version'] = head['version']
+            elif tag == TAG_OBJECT:
+                obj_chunk = (tag, payload, raw_size, crc)
+            elif tag == TAG_GEOMETRY:
+                if obj_chunk is None:
+                    raise ProjectFileError("Geometry chunk without an object.")
+                obj_data = BinaryObjectData(obj_chunk, (tag, payload, raw_size, crc), self.compressor)
+                proj_dict['objs'].append(obj_data.decode() if decode else obj_data)
+                obj_chunk = None
+            # unknown chunks are skipped, so newer files with extra chunks can still be read
+
+        return proj_dict
+
+
+def unpack_chunk(tag, payload, raw_size, crc, compressor):
+    """
+    Decompress the payload of a chunk and check it.
+
+    :return:    the raw data of the chunk
+    """
+    data = decompress_data(payload, compressor)
+    if len(data) != raw_size or zlib.crc32(data) != crc:
+        raise ProjectFileError("Corrupted chunk %s in the project file." % tag.decode('ascii'))
+    return data
+
+
+class BinaryObjectData:
+    """
+    The not yet decoded chunks of an object from a binary project.
+    """
+
+    __slots__ = ('obj_chunk', 'geo_chunk', 'compressor')
+
+    def __init__(self, obj_chunk, geo_chunk, compressor):
+        self.obj_chunk = obj_chunk
+        self.geo_chunk = geo_chunk
+        self.compressor = compressor
+
+    def decode(self):
+        """
+
+        :return:    dictionary with the object attributes
+        """
+        obj_json = unpack_chunk(*self.obj_chunk, self.compressor)
+        geo_data = unpack_chunk(*self.geo_chunk, self.compressor)
+        return deserialize_object(obj_json, geo_data)
+
+    def decode_metadata(self):
+        """
+        Decode only the object attributes, without the geometry chunk. The geometry references are left as None.
+
+        :return:    dictionary with the object attributes
+        """
+        obj_json = unpack_chunk(*self.obj_chunk, self.compressor)
+        return json.loads(obj_json.decode('utf-8'),
+                          object_hook=lambda d: None if d.get('__class__') == "ShplyRef" else d)
+
+
+class JsonObjectData:
+    """
+    An object from a JSON project, parsed without converting the WKT strings to geometry.
+    """
+
+    __slots__ = ('obj_dict', )
+
+    def __init__(self, obj_dict):
+        self.obj_dict = obj_dict
+
+    def decode(self):
+        """
+        Convert all the serialized geometry of the object. All the WKT strings are converted with a single
+        shapely.from_wkt() call, which releases the GIL. The parsed dictionary is not changed, so the object can be
+        decoded by more than one thread at the same time.
+
+        :return:    a new dictionary with the object attributes
+        """
+        return restore_json_object(self.obj_dict)
+
+    def decode_metadata(self):
+        """
+
+        :return:    dictionary with the object attributes, the geometry is still serialized as WKT
+        """
+        return self.obj_dict
+
+
+def restore_json_object(obj_dict):
+    """
+    Does what the dict2obj() object hook does while parsing a JSON project, but converts all the WKT strings with
+    one vectorized call. The containers are copied, the parsed dictionary is left unchanged.
+
+    :param obj_dict:    dictionary parsed from JSON without an object hook
+    :return:            a new dictionary, with the geometry and aperture macros restored
+    """
+    wkt_list = []
+    wkt_slots = []
+
+    def copy_container(container):
+        if isinstance(container, dict):
+            new_container = {}
+            keys = list(container.keys())
+        else:
+            new_container = [None] * len(container)
+            keys = range(len(container))
+
+        for key in keys:
+            item = container[key]
+            if isinstance(item, dict):
+                if '__class__' in item and '__inst__' in item:
+                    if item['__class__'] == "Shply":
+                        wkt_list.append(item['__inst__'])
+                        wkt_slots.append((new_container, key))
+                        item = None
+                    else:
+                        item = dict2obj(item)
+                else:
+                    item = copy_container(item)
+            elif isinstance(item, list):
+                item = copy_container(item)
+            new_container[key] = item
+        return new_container
+
+    new_obj_dict = copy_container(obj_dict)
+
+    if wkt_list:
+        geo_arr = shapely.from_wkt(np.asarray(wkt_list, dtype=object))
+        for (container, key), geo in zip(wkt_slots, geo_arr):
+            container[key] = geo
+
+    return new_obj_dict
+
+
+def decode_object(obj):
+    """
+
+    :param obj:     BinaryObjectData, JsonObjectData or an already decoded dictionary
+    :return:        dictionary with the object attributes
+    """
+    if isinstance(obj, (BinaryObjectData, JsonObjectData)):
+        return obj.decode()
+    return obj
+
+
+def decode_objects(objs, max_workers=None):
+    """
+    Decode the objects of a project in a pool of threads. Most of the decoding time is spent in decompression and
+    in the Shapely bulk constructors, which release the GIL.
+
+    :param objs:        list of BinaryObjectData, JsonObjectData or already decoded dictionaries
+    :param max_workers: number of threads; if None the ThreadPoolExecutor default is used
+    :return:            generator that yields the decoded objects dictionaries in the original order, each one as
+                        soon as it is available
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(decode_object, obj) if isinstance(obj, (BinaryObjectData, JsonObjectData)) else obj
+            for obj in objs
+        ]
+        try:
+            for fut in futures:
+                yield fut.result() if isinstance(fut, Future) else fut
+        finally:
+            for fut in futures:
+                if isinstance(fut, Future):
+                    fut.cancel()
+
+
+def verify_binary_project(filename):
+    """
+    Check a binary project file using its trailer. The file is only read and checksummed, the chunks are not
+    decompressed nor parsed.
+
+    :param filename:    path to the project file
+    :return:            True if the file is complete and not corrupted
+    """
+    end_size = CHUNK_STRUCT.size + TRAILER_STRUCT.size
+    try:
+        with open(filename, 'rb') as f:
+            f.seek(0, 2)
+            file_size = f.tell()
+            if file_size < HEADER_STRUCT.size + end_size:
+                return False
+            f.seek(file_size - end_size)
+            end_chunk = f.read(end_size)
+    except IOError:
+        return False
+
+    tag, __, __, __ = CHUNK_STRUCT.unpack_from(end_chunk, 0)
+    if tag != TAG_END:
+        return False
+    __, data_size, data_crc = TRAILER_STRUCT.unpack_from(end_chunk, CHUNK_STRUCT.size)
+    if data_size != file_size - end_size:
+        return False
+
+    return file_checksum(filename, data_size) == (data_size, data_crc)
+
+
+def save_binary_project(filename, objs, options, version, compressor=None, level=3):
+    """
+
+    :param filename:    path to the project file
+    :param objs:        iterable of the objects dictionaries as returned by FlatCAMObj.to_dict(); it can be a
+                        generator, so the objects are serialized one at a time
+    :param options:     the project options
+    :param version:     the application version
+    :param compressor:  compressor id; if None the best available compressor is used
+    :param level:       compression level, in the range 0 ... 9
+    :return:            None
+    """
+    with ProjectWriter(filename, compressor=compressor, level=level) as writer:
+        writer.write_header(options, version)
+        for obj_dict in objs:
+            writer.write_object(obj_dict)
+
+
+def load_binary_project(filename, decode=True):
+    """
+
+    :param filename:    path to the project file
+    :param decode:      if False the objects are returned not decoded, see ProjectReader.read_project()
+    :return:            dictionary with the same structure as the JSON project
+    """
+    with ProjectReader(filename) as reader:
+        return reader.read_project(decode=decode)
+
+
+def save_json_project(filename, objs, options, version, compressed=True, level=3):
+    """
+    Write a project in the JSON format, one object at a time, directly to the file (through a LZMA compressor if
+    required) so the whole JSON document is never held in memory.
+
+    :param filename:    path to the project file
+    :param objs:        iterable of the objects dictionaries as returned by FlatCAMObj.to_dict()
+    :param options:     the project options
+    :param version:     the application version
+    :param compressed:  if True the file is LZMA compressed
+    :param level:       LZMA compression level, in the range 0 ... 9
+    :return:            tuple (size, CRC32) of the written file, to be checked with file_checksum()
+    """
+    raw_f, tmp_filename = open_temp_file(filename)
+    try:
+        with raw_f:
+            checked_f = ChecksumFile(raw_f)
+            out_f = lzma.LZMAFile(checked_f, 'wb', preset=int(level)) if compressed else checked_f
+
+            try:
+                out_f.write(b'{\n"objs": [\n')
+                for idx, obj_dict in enumerate(objs):
+                    if idx > 0:
+                        out_f.write(b',\n')
+                    out_f.write(json.dumps(obj_dict, default=to_dict, indent=2, sort_keys=True).encode('utf-8'))
+                out_f.write(b'\n],\n"options": ')
+                out_f.write(json.dumps(options, default=to_dict, indent=2, sort_keys=True).encode('utf-8'))
+                out_f.write(b',\n"version": ')
+                out_f.write(json.dumps(version).encode('utf-8'))
+                out_f.write(b'\n}\n')
+            finally:
+                if compressed:
+                    out_f.close()
+
+        # the target file is replaced only if what is on disk matches what was written
+        if file_checksum(tmp_filename) != (checked_f.size, checked_f.crc):
+            raise ProjectFileError("The written project file failed the verification.")
+        replace_file(tmp_filename, filename)
+    finally:
+        remove_temp_file(tmp_filename)
+
+    return checked_f.size, checked_f.crc
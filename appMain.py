@@ -1865,6 +1865,7 @@ class App(QtCore.QObject):
 
         self.ui.menufileopengerber.triggered.connect(lambda: self.f_handlers.on_file_open_gerber())
         self.ui.menufileopenexcellon.triggered.connect(lambda: self.f_handlers.on_file_open_excellon())
+        self.ui.menufileopenfolder.triggered.connect(lambda: self.f_handlers.on_file_open_folder())
         self.ui.menufileopengcode.triggered.connect(lambda: self.f_handlers.on_file_open_gcode())
         self.ui.menufileopenproject.triggered.connect(lambda: self.f_handlers.on_file_open_project())
         self.ui.menufileopenconfig.triggered.connect(lambda: self.f_handlers.on_file_open_config())
@@ -4564,7 +4565,7 @@ class App(QtCore.QObject):
 
         def worker_task(app_obj):
             with app_obj.proc_container.new(_("Setting Origin...")):
-                obj_list = app_obj.collection.get_list()
+                obj_list = app_obj.collection.get_list(hydrate=True)
 
                 for obj in obj_list:
                     obj.offset((x, y))
@@ -6899,6 +6900,7 @@ class App(QtCore.QObject):
                     # it's a line without area
                     if obj.obj_options['xmin'] == obj.obj_options['xmax'] or \
                             obj.obj_options['ymin'] == obj.obj_options['ymax']:
+                        obj.hydrate()
                         poly_obj = unary_union(obj.solid_geometry).buffer(0.001)
                     # it's a geometry with area
                     else:
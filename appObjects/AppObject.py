@@ -188,7 +188,8 @@ class AppObject(QtCore.QObject):
         # Check units and convert if necessary
         # This condition CAN be true because initialize() can change obj.units
         # ############################################################################################################
-        if self.app.options["units"].upper() != obj.units.upper():
+        # for the objects loaded from a project in lazy mode this is done when they are hydrated
+        if self.app.options["units"].upper() != obj.units.upper() and obj.lazy_data is None:
             self.app.inform.emit('%s: %s' % (_("Converting units to "), self.app.options["units"]))
             obj.convert_units(self.app.options["units"])
             t3 = time.time()
@@ -198,7 +199,8 @@ class AppObject(QtCore.QObject):
         # Create the bounding box for the object and then add the results to the obj.obj_options
         # But not for Scripts or for Documents
         # ############################################################################################################
-        if kind != 'document' and kind != 'script':
+        # The objects loaded from a project in lazy mode have the bounds stored in the options
+        if kind != 'document' and kind != 'script' and obj.lazy_data is None:
             try:
                 xmin, ymin, xmax, ymax = obj.bounds()
                 obj.obj_options['xmin'] = xmin
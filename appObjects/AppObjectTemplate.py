@@ -24,6 +24,7 @@ from copy import deepcopy, copy
 import sys
 import math
 import inspect
+import threading
 
 import gettext
 import appTranslation as fcTranslate
@@ -123,6 +124,10 @@ class FlatCAMObj(QtCore.QObject):
         # this is the treeWidget from the UI; it is updated when the add_properties_items() method is called
         self.treeWidget = None
 
+        # the not yet decoded project data when the object was loaded from a project in lazy mode
+        self.lazy_data = None
+        self.lazy_lock = threading.Lock()
+
         self.plot_single_object.connect(self.single_object_plot)
 
     def __del__(self):
@@ -157,6 +162,26 @@ class FlatCAMObj(QtCore.QObject):
                                        "have all attributes in the latest application version." % str(attr))
                     pass
 
+    def hydrate(self, obj_dict=None):
+        """
+        Restore the geometry of an object that was loaded from a project in lazy mode. It is called when the object
+        is plotted, selected or retrieved from the collection. Does nothing for an object that is already complete.
+
+        :param obj_dict:    the decoded project data of the object; if None it is decoded here
+        :return:            None
+        """
+        if self.lazy_data is None:
+            return
+
+        with self.lazy_lock:
+            # it may have been hydrated by another thread while waiting
+            if self.lazy_data is None:
+                return
+
+            self.app.log.debug("FlatCAMObj.hydrate() --> %s" % str(self.obj_options['name']))
+            self.app.f_handlers.hydrate_object(self, obj_dict)
+            self.lazy_data = None
+
     def on_options_change(self, key):
         # Update form on programmatically options change
         self.set_form_item(key)
@@ -180,6 +205,8 @@ class FlatCAMObj(QtCore.QObject):
         if self.deleted:
             return False
 
+        self.hydrate()
+
         self.clear()
         return True
 
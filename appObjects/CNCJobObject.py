@@ -16,7 +16,7 @@ from appEditors.AppTextEditor import AppTextEditor
 from appObjects.AppObjectTemplate import FlatCAMObj, ObjectDeleted
 from appGUI.GUIElements import FCFileSaveDialog, FCCheckBox
 from appGUI.ObjectUI import CNCObjectUI
-from camlib import CNCjob
+from camlib import CNCjob, GCodeEmitter
 
 import os
 import sys
@@ -1065,7 +1065,8 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                 # when self.tools is empty - old projects
                 include_header = self.app.preprocessors['default'].include_header
 
-        gcode = ''
+        # the G-code of the tools (or of the object) is not joined in one string; it is written chunk by chunk
+        body = []
 
         if include_header is False:
             # detect if using multi-tool and make the Gcode summation correctly for each case
@@ -1074,25 +1075,25 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                     if self.obj_options['type'].lower() == 'geometry':
                         for tooluid_key in self.tools:
                             for key, value in self.tools[tooluid_key].items():
-                                if key == 'gcode':
-                                    gcode += value
+                                if key == 'gcode' and value:
+                                    body.append(value)
                                     break
                 except TypeError:
                     pass
             else:
-                gcode += global_gcode
+                body.append(global_gcode)
 
             # g = sstart_code + '\n' + preamble + '\n' + gcode + '\n' + postamble
-            g = ''
             end_gcode = self.gcode_footer() if self.app.options['cncjob_footer'] is True else ''
-            if preamble != '' and postamble != '':
-                g = start_code + '\n' + preamble + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
-            if preamble == '':
-                g = start_code + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
-            if postamble == '':
-                g = start_code + '\n' + preamble + '\n' + gcode + '\n' + end_gcode
-            if preamble == '' and postamble == '':
-                g = start_code + '\n' + gcode + '\n' + end_gcode
+
+            # the parts of the file, each one a list of text chunks; the parts are separated by a new line
+            parts = [[start_code]]
+            if preamble != '':
+                parts.append([preamble])
+            parts.append(body)
+            if postamble != '':
+                parts.append([postamble])
+            parts.append([end_gcode])
         else:
             # detect if using multi-tool and make the Gcode summation correctly for each case
             if self.multitool is True:
@@ -1102,19 +1103,19 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                         for tooluid_key in self.tools:
                             for key, value in self.tools[tooluid_key].items():
                                 if key == 'gcode' and value:
-                                    gcode += value
+                                    body.append(value)
                                     break
                     else:
                         # it's made from a Geometry object
                         for tooluid_key in self.tools:
                             for key, value in self.tools[tooluid_key].items():
                                 if key == 'gcode' and value:
-                                    gcode += value
+                                    body.append(value)
                                     break
                 except TypeError:
                     pass
             else:
-                gcode += global_gcode
+                body.append(global_gcode)
 
             end_gcode = self.gcode_footer() if self.app.options['cncjob_footer'] is True else ''
 
@@ -1138,36 +1139,36 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                 hpgl = False
 
             if hpgl:
-                processed_body_gcode = ''
-                pa_re = re.compile(r"^PA\s*(-?\d+\.\d*),?\s*(-?\d+\.\d*)*;?$")
-
-                # process body gcode
-                for gline in gcode.splitlines():
-                    match = pa_re.search(gline)
-                    if match:
-                        x_int = int(float(match.group(1)))
-                        y_int = int(float(match.group(2)))
-                        new_line = 'PA%d,%d;\n' % (x_int, y_int)
-                        processed_body_gcode += new_line
-                    else:
-                        processed_body_gcode += gline + '\n'
-
-                gcode = processed_body_gcode
-                g = self.gc_header + '\n' + start_code + '\n' + preamble + '\n' + \
-                    gcode + '\n' + postamble + end_gcode
+                def hpgl_body_lines():
+                    pa_re = re.compile(r"^PA\s*(-?\d+\.\d*),?\s*(-?\d+\.\d*)*;?$")
+
+                    # process body gcode
+                    for gline in ''.join(body).splitlines():
+                        match = pa_re.search(gline)
+                        if match:
+                            x_int = int(float(match.group(1)))
+                            y_int = int(float(match.group(2)))
+                            yield 'PA%d,%d;\n' % (x_int, y_int)
+                        else:
+                            yield gline + '\n'
+
+                parts = [[self.gc_header], [start_code], [preamble], hpgl_body_lines(), [postamble, end_gcode]]
             else:
-                g = ''
-                if preamble != '' and postamble != '':
-                    g = self.gc_header + start_code + '\n' + preamble + '\n' + gcode + '\n' + \
-                        postamble + '\n' + end_gcode
-                if preamble == '':
-                    g = self.gc_header + start_code + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
-                if postamble == '':
-                    g = self.gc_header + start_code + '\n' + preamble + '\n' + gcode + '\n' + end_gcode
-                if preamble == '' and postamble == '':
-                    g = self.gc_header + start_code + '\n' + gcode + '\n' + end_gcode
-
-        lines = StringIO(g)
+                parts = [[self.gc_header, start_code]]
+                if preamble != '':
+                    parts.append([preamble])
+                parts.append(body)
+                if postamble != '':
+                    parts.append([postamble])
+                parts.append([end_gcode])
+
+        def write_parts(sink):
+            emitter = GCodeEmitter(sink)
+            for part_nr, part in enumerate(parts):
+                if part_nr:
+                    emitter.write('\n')
+                emitter.writelines(part)
+            emitter.flush()
 
         # Write
         if filename is not None:
@@ -1175,12 +1176,10 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                 force_windows_line_endings = self.app.options['cncjob_line_ending']
                 if force_windows_line_endings and sys.platform != 'win32':
                     with open(filename, 'w', newline='\r\n') as f:
-                        for line in lines:
-                            f.write(line)
+                        write_parts(f)
                 else:
                     with open(filename, 'w') as f:
-                        for line in lines:
-                            f.write(line)
+                        write_parts(f)
             except FileNotFoundError:
                 self.app.inform.emit('[WARNING_NOTCL] %s' % _("No such file or directory"))
                 return
@@ -1198,6 +1197,9 @@ class CNCJobObject(FlatCAMObj, CNCjob):
 
             self.app.inform.emit('[success] %s: %s' % (_("Saved to"), filename))
         else:
+            lines = StringIO()
+            write_parts(lines)
+            lines.seek(0)
             return lines
 
     def get_gcode(self, preamble='', postamble=''):
@@ -16,7 +16,7 @@ from appGUI.ObjectUI import GerberObjectUI
 from appParsers.ParseGerber import Gerber
 from appObjects.AppObjectTemplate import FlatCAMObj, ObjectDeleted, ValidationError
 
-from camlib import flatten_shapely_geometry
+from camlib import flatten_shapely_geometry, union_tiled
 
 from shapely import MultiLineString, LinearRing, MultiPolygon, Polygon, LineString, Point
 from shapely.ops import unary_union
@@ -1690,7 +1690,7 @@ class GerberObject(FlatCAMObj, Gerber):
 
             # Expand lists
             if type(grb) is list:
-                GerberObject.merge(grb_list=grb, grb_final=grb_final)
+                GerberObject.merge(grb_list=grb, grb_final=grb_final, app=app)
             else:   # If not list, just append
                 for option in grb.obj_options:
                     if option != 'name':
@@ -1720,7 +1720,10 @@ class GerberObject(FlatCAMObj, Gerber):
                         for k, v in grb.tools[ap].items():
                             grb_final.tools[max_ap][k] = deepcopy(v)
 
-        grb_final.solid_geometry = MultiPolygon(grb_final.solid_geometry)
+        # the geometry of the joined objects may overlap; the union is made on tiles, in the processes of the App.pool
+        union_pool = app.pool if app.options['gerber_parallel_union'] else None
+        union_geo = union_tiled(grb_final.solid_geometry, pool=union_pool)
+        grb_final.solid_geometry = MultiPolygon(flatten_shapely_geometry(union_geo))
         grb_final.follow_geometry = MultiPolygon(grb_final.follow_geometry)
 
     def mirror(self, axis, point):
@@ -203,29 +203,49 @@ class TreeItem(EventSensitiveListView):
         self.parent_item = parent_item
         self.item_data = data  # Columns string data
         self.icon = icon  # Decoration
-        self.obj = obj  # FlatCAMObj
+        # FlatCAMObj; an object loaded from a project in lazy mode may not be hydrated yet
+        self.stored_obj = obj
 
         self.child_items = []
 
         if parent_item:
             parent_item.append_child(self)
 
+    @property
+    def obj(self):
+        """
+        The FlatCAMObj of this item. An object loaded from a project in lazy mode is hydrated here, so everything
+        that gets the object from the collection model (e.g. the plugins) sees its geometry. Use stored_obj when
+        only the object options are needed.
+        """
+        if self.stored_obj is not None:
+            self.stored_obj.hydrate()
+        return self.stored_obj
+
+    @obj.setter
+    def obj(self, value):
+        self.stored_obj = value
+
+    @obj.deleter
+    def obj(self):
+        del self.stored_obj
+
     def append_child(self, item):
         self.child_items.append(item)
         item.set_parent_item(self)
 
     def remove_child(self, item):
         child = self.child_items.pop(self.child_items.index(item))
-        child.obj.clear(True)
-        child.obj.delete()
-        del child.obj
+        child.stored_obj.clear(True)
+        child.stored_obj.delete()
+        del child.stored_obj
         del child
 
     def remove_children(self):
         for child in self.child_items:
-            child.obj.clear()
-            child.obj.delete()
-            del child.obj
+            child.stored_obj.clear()
+            child.stored_obj.delete()
+            del child.stored_obj
             del child
 
         self.child_items = []
@@ -497,7 +517,7 @@ class ObjectCollection(QtCore.QAbstractItemModel):
             return None
 
         if role in [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole]:
-            obj = index.internalPointer().obj
+            obj = index.internalPointer().stored_obj
             if obj:
                 return obj.obj_options["name"]
             else:
@@ -514,7 +534,7 @@ class ObjectCollection(QtCore.QAbstractItemModel):
                 color = QColor(self.app.options['global_proj_item_color_light'][:-2])
                 color_disabled = QColor(self.app.options['global_proj_item_dis_color_light'][:-2])
 
-            obj = index.internalPointer().obj
+            obj = index.internalPointer().stored_obj
             if obj:
                 return QtGui.QBrush(color) if obj.obj_options["plot"] else QtGui.QBrush(color_disabled)
             else:
@@ -528,7 +548,7 @@ class ObjectCollection(QtCore.QAbstractItemModel):
                 return QtGui.QPixmap()
         elif role == Qt.ItemDataRole.ToolTipRole:
             try:
-                obj = index.internalPointer().obj
+                obj = index.internalPointer().stored_obj
             except AttributeError:
                 return None
 
@@ -543,7 +563,7 @@ class ObjectCollection(QtCore.QAbstractItemModel):
 
     def setData(self, index, data, role=None):
         if index.isValid():
-            obj = index.internalPointer().obj
+            obj = index.internalPointer().stored_obj
 
             if obj:
                 old_name = deepcopy(obj.obj_options['name'])
@@ -583,7 +603,7 @@ class ObjectCollection(QtCore.QAbstractItemModel):
 
         # Prevent groups from selection
         try:
-            if not index.internalPointer().obj:
+            if not index.internalPointer().stored_obj:
                 return Qt.ItemFlag.ItemIsEnabled
             else:
                 return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEditable | \
@@ -689,7 +709,7 @@ class ObjectCollection(QtCore.QAbstractItemModel):
         ymax = -Inf
 
         # for obj in self.object_list:
-        for obj in self.get_list():
+        for obj in self.get_list(hydrate=True):
             try:
                 gxmin, gymin, gxmax, gymax = obj.bounds()
                 xmin = min([xmin, gxmin])
@@ -713,13 +733,16 @@ class ObjectCollection(QtCore.QAbstractItemModel):
         """
         # log.debug(str(inspect.stack()[1][3]) + "--> OC.get_by_name()")
 
+        # the objects loaded from a project in lazy mode are hydrated when they are requested
         if isCaseSensitive is None or isCaseSensitive is True:
             for obj in self.get_list():
                 if obj.obj_options['name'] == name:
+                    obj.hydrate()
                     return obj
         else:
             for obj in self.get_list():
                 if obj.obj_options['name'].lower() == name.lower():
+                    obj.hydrate()
                     return obj
         return None
 
@@ -737,13 +760,13 @@ class ObjectCollection(QtCore.QAbstractItemModel):
         # some objects add a Tab on creation, close it here
         for idx in range(self.app.ui.plot_tab_area.count()):
             widget_name = self.app.ui.plot_tab_area.widget(idx).objectName()
-            if widget_name == active.obj.obj_options['name'] or \
-                    widget_name == (active.obj.obj_options['name'] + "_editor_tab"):
+            if widget_name == active.stored_obj.obj_options['name'] or \
+                    widget_name == (active.stored_obj.obj_options['name'] + "_editor_tab"):
                 self.app.ui.plot_tab_area.removeTab(idx)
                 break
 
         # update the SHELL auto-completer model data
-        name = active.obj.obj_options['name']
+        name = active.stored_obj.obj_options['name']
         try:
             self.app.regFK.remove_keyword(name)
             # this is not needed any more because now the code editor is created on demand
@@ -752,7 +775,7 @@ class ObjectCollection(QtCore.QAbstractItemModel):
             self.app.log.error(
                 "delete_active() --> Could not remove the old object name from auto-completer model list. %s" % str(e))
 
-        self.app.object_status_changed.emit(active.obj, 'delete', name)
+        self.app.object_status_changed.emit(active.stored_obj, 'delete', name)
 
         # ############ OBJECT DELETION FROM MODEL STARTS HERE ####################
         self.beginRemoveRows(self.index(group.row(), 0, QtCore.QModelIndex()), active.row(), active.row())
@@ -791,13 +814,13 @@ class ObjectCollection(QtCore.QAbstractItemModel):
         # some objects add a Tab on creation, close it here
         for idx in range(self.app.ui.plot_tab_area.count()):
             wdg_name = self.app.ui.plot_tab_area.widget(idx).objectName()
-            if wdg_name == deleted.obj.obj_options['name'] or \
-                    wdg_name == (deleted.obj.obj_options['name'] + "_editor_tab"):
+            if wdg_name == deleted.stored_obj.obj_options['name'] or \
+                    wdg_name == (deleted.stored_obj.obj_options['name'] + "_editor_tab"):
                 self.app.ui.plot_tab_area.removeTab(idx)
                 break
 
         # update the SHELL auto-completer model data
-        name = deleted.obj.obj_options['name']
+        name = deleted.stored_obj.obj_options['name']
         try:
             self.app.regFK.remove_keyword(name)
             # this is not needed any more because now the code editor is created on demand
@@ -806,7 +829,7 @@ class ObjectCollection(QtCore.QAbstractItemModel):
             self.app.log.error(
                 "delete_by_name() --> Could not remove the old object name from auto-completer model list. %s" % str(e))
 
-        self.app.object_status_changed.emit(deleted.obj, 'delete', name)
+        self.app.object_status_changed.emit(deleted.stored_obj, 'delete', name)
 
         # ############ OBJECT DELETION FROM MODEL STARTS HERE ####################
         self.beginRemoveRows(self.index(group.row(), 0, QtCore.QModelIndex()), deleted.row(), deleted.row())
@@ -1066,16 +1089,18 @@ class ObjectCollection(QtCore.QAbstractItemModel):
         except Exception as e:
             self.app.inform.emit('[ERROR] %s: %s' % (_("Cause of error"), str(e)))
 
-    def get_list(self):
+    def get_list(self, hydrate=False):
         """
         Will return a list of all objects currently opened. Except FlatCAMScript and FlatCAMDocuments
 
+        :param hydrate: if True, the objects loaded from a project in lazy mode are hydrated before being returned.
+                        Needed only by the callers that use the geometry of all the objects
         :return:
         """
         obj_list = []
         for group in self.root_item.child_items:
             for item in group.child_items:
-                obj_list.append(item.obj)
+                obj_list.append(item.obj if hydrate else item.stored_obj)
 
         return obj_list
 
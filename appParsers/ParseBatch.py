@@ -0,0 +1,250 @@
+# ##########################################################
+# FlatCAM Evo: 2D Post-processing for Manufacturing        #
+# MIT Licence                                              #
+# ##########################################################
+
+# ##########################################################
+# Batch import of the fabrication files (Gerber and Excellon) in the processes of the App.pool.
+#
+# Each file is parsed in a worker process by parse_file_task() with a headless stand-in of the application. The
+# parsed attributes (the ones in the parser 'ser_attrs') are sent back to the application with all the Shapely
+# geometry packed as WKB in a single block, so the result is cheap to pickle. The application then creates the
+# objects with AppObject.new_object() and unpack_attributes().
+# ##########################################################
+
+from camlib import Geometry, ParseError
+from appParsers.ParseGerber import Gerber
+from appParsers.ParseExcellon import Excellon
+from appHandlers.AppProjectFile import encode_geometry, decode_geometry
+
+from shapely import LinearRing
+from shapely.geometry.base import BaseGeometry
+
+import os
+import logging
+import traceback
+
+import gettext
+import builtins
+
+if '_' not in builtins.__dict__:
+    _ = gettext.gettext
+
+log = logging.getLogger('base')
+
+GERBER_EXTENSIONS = (
+    '.gbr', '.ger', '.gtl', '.gbl', '.gts', '.gbs', '.gtp', '.gbp', '.gto', '.gbo', '.gm1', '.gml', '.gm3', '.gko',
+    '.cmp', '.sol', '.stc', '.sts', '.plc', '.pls', '.crc', '.crs', '.tsm', '.bsm', '.ly2', '.ly15', '.dim', '.mil',
+    '.grb', '.top', '.bot', '.smt', '.smb', '.sst', '.ssb', '.spt', '.spb', '.pho', '.gdo', '.art', '.gbd', '.outline'
+)
+EXCELLON_EXTENSIONS = ('.drl', '.txt', '.xln', '.drd', '.tap', '.exc', '.ncd')
+
+
+def file_kind(filename):
+    """
+    Find the kind of fabrication file from the file extension.
+
+    :param filename:    path to the file
+    :return:            'gerber', 'excellon' or None if the extension is not known
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in GERBER_EXTENSIONS:
+        return 'gerber'
+    if ext in EXCELLON_EXTENSIONS:
+        return 'excellon'
+    return None
+
+
+def list_fab_files(folder):
+    """
+    List the Gerber and Excellon files of a fabrication output folder (not recursive).
+
+    :param folder:  path to the folder
+    :return:        list of tuples (kind, filename) sorted by the file name
+    """
+    files = []
+    for entry in sorted(os.listdir(folder)):
+        filename = os.path.join(folder, entry)
+        kind = file_kind(filename)
+        if kind is not None and os.path.isfile(filename):
+            files.append((kind, filename))
+    return files
+
+
+class GeometryRef:
+    """
+    Placeholder for a Shapely geometry in the packed attributes. It holds the index of the geometry in the WKB block.
+    """
+
+    __slots__ = ('index', 'ring')
+
+    def __init__(self, index, ring=False):
+        self.index = index
+        # WKB has no LinearRing type, so it would be read back as a LineString
+        self.ring = ring
+
+    def __getstate__(self):
+        return self.index, self.ring
+
+    def __setstate__(self, state):
+        self.index, self.ring = state
+
+
+def pack_attributes(attributes):
+    """
+    Replace every Shapely geometry in the attributes with a GeometryRef and encode the geometries in a WKB block.
+    The dictionaries keep their keys (e.g. the integer tool numbers) because the result is pickled, not converted
+    to JSON.
+
+    :param attributes:  dictionary with the parsed attributes
+    :return:            tuple (packed attributes, geometry bytes)
+    """
+    geo_list = []
+
+    def pack(item):
+        if isinstance(item, BaseGeometry):
+            geo_list.append(item)
+            return GeometryRef(len(geo_list) - 1, ring=isinstance(item, LinearRing))
+        if isinstance(item, dict):
+            return {key: pack(val) for key, val in item.items()}
+        if isinstance(item, list):
+            return [pack(val) for val in item]
+        if isinstance(item, tuple):
+            return tuple(pack(val) for val in item)
+        return item
+
+    packed = pack(attributes)
+    return packed, encode_geometry(geo_list)
+
+
+def unpack_attributes(packed, geo_data):
+    """
+    Reverse of pack_attributes().
+
+    :param packed:      attributes as returned by pack_attributes()
+    :param geo_data:    geometry bytes as returned by pack_attributes()
+    :return:            dictionary with the attributes
+    """
+    geo_arr = decode_geometry(geo_data)
+
+    def unpack(item):
+        if isinstance(item, GeometryRef):
+            geo = geo_arr[item.index]
+            return LinearRing(geo.coords) if item.ring else geo
+        if isinstance(item, dict):
+            return {key: unpack(val) for key, val in item.items()}
+        if isinstance(item, list):
+            return [unpack(val) for val in item]
+        if isinstance(item, tuple):
+            return tuple(unpack(val) for val in item)
+        return item
+
+    return unpack(packed)
+
+
+class WorkerSignal:
+    """
+    Stand-in for the application signals. The emitted messages are kept so they can be shown by the application.
+    """
+
+    def __init__(self, messages=None):
+        self.messages = messages
+
+    def emit(self, *args):
+        if self.messages is not None and args:
+            self.messages.append(str(args[0]))
+
+
+class WorkerCanvas:
+    @staticmethod
+    def new_shape_collection(**kwargs):
+        return None
+
+
+class WorkerProcContainer:
+    def update_view_text(self, *args):
+        pass
+
+    def new_text(self, *args, **kwargs):
+        pass
+
+
+class WorkerApp:
+    """
+    The part of the application used by the parsers, for a worker process without GUI.
+    """
+
+    def __init__(self, options, app_units, decimals):
+        self.options = options
+        self.app_units = app_units
+        self.decimals = decimals
+        self.abort_flag = False
+
+        # the parsing is already done in a worker process of the App.pool
+        self.pool = None
+
+        # the temporary shapes are never used while parsing
+        self.use_3d_engine = True
+        self.plotcanvas = WorkerCanvas()
+        self.proc_container = WorkerProcContainer()
+
+        self.messages = []
+        self.inform = WorkerSignal(self.messages)
+        self.inform_shell = WorkerSignal()
+        self.inform_no_echo = WorkerSignal()
+        self.log = log
+
+
+def parse_file_task(kind, filename, options, app_units, decimals):
+    """
+    Parse a Gerber or an Excellon file. Runs in a worker process of the App.pool.
+
+    :param kind:        'gerber' or 'excellon'
+    :param filename:    path to the file
+    :param options:     dictionary with the application options
+    :param app_units:   the application units
+    :param decimals:    the application decimals
+    :return:            tuple (status, packed attributes, geometry bytes, messages). The status is None on success,
+                        'defective' for a partially parsed Gerber file and 'fail' otherwise; on failure the packed
+                        attributes and the geometry are None. The messages are the ones emitted by the parser.
+    """
+    worker_app = WorkerApp(options, app_units, decimals)
+    saved_apps = (getattr(Geometry, 'app', None), getattr(Gerber, 'app', None), getattr(Excellon, 'app', None))
+    Geometry.app = Gerber.app = Excellon.app = worker_app
+
+    def failed(msg):
+        worker_app.messages.append(msg)
+        return 'fail', None, None, worker_app.messages
+
+    try:
+        if kind == 'gerber':
+            parser = Gerber(steps_per_circle=int(options["gerber_circle_steps"]))
+            status = parser.parse_file(filename)
+            if parser.is_empty():
+                return failed('[ERROR_NOTCL] %s: %s' %
+                              (_("Object is not Gerber file or empty. Aborting object creation."), filename))
+        elif kind == 'excellon':
+            parser = Excellon(excellon_circle_steps=int(options["excellon_circle_steps"]))
+            if parser.parse_file(filename=filename) == 'fail':
+                return failed('[ERROR_NOTCL] %s: %s' % (_("This is not Excellon file."), filename))
+            # like the ExcellonObject in open_excellon(), the tools have no data yet when the geometry is created
+            parser.default_data = {}
+            if parser.create_geometry() == 'fail':
+                return failed('[ERROR_NOTCL] %s: %s' % (_("No geometry found in file"), filename))
+            if not any(tool['solid_geometry'] for tool in parser.tools.values()):
+                return failed('[ERROR_NOTCL] %s: %s' % (_("No geometry found in file"), filename))
+            status = None
+        else:
+            return failed('[ERROR_NOTCL] %s: %s' % (_("Not supported"), filename))
+
+        packed, geo_data = pack_attributes({attr: getattr(parser, attr) for attr in parser.ser_attrs})
+        return status, packed, geo_data, worker_app.messages
+    except IOError:
+        return failed('[ERROR_NOTCL] %s: %s' % (_("Failed to open file"), filename))
+    except ParseError as parse_err:
+        return failed('[ERROR_NOTCL] %s: %s. %s' % (_("Failed to parse file"), filename, str(parse_err)))
+    except Exception as err:
+        log.error("ParseBatch.parse_file_task() --> %s" % str(err))
+        return failed('[ERROR_NOTCL] %s: %s\n%s' % (_("Failed to parse file"), filename, traceback.format_exc()))
+    finally:
+        Geometry.app, Gerber.app, Excellon.app = saved_apps
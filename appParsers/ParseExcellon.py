@@ -279,6 +279,9 @@ class Excellon(Geometry):
 
         line_units = ''
 
+        # the source lines, joined in self.source_file when the parsing ends
+        source_lines = []
+
         # ## Parsing starts here ## ##
         line_num = 0  # Line number
         eline = ""
@@ -291,7 +294,7 @@ class Excellon(Geometry):
                 line_num += 1
                 # self.app.log.debug("%3d %s" % (line_num, str(eline)))
 
-                self.source_file += eline
+                source_lines.append(eline)
 
                 # Cleanup lines
                 eline = eline.strip(' \r\n')
@@ -1003,6 +1006,8 @@ class Excellon(Geometry):
             self.app.inform.emit(msg)
 
             return "fail"
+        finally:
+            self.source_file += ''.join(source_lines)
 
     def parse_number(self, number_str):
         """
@@ -1,6 +1,6 @@
 
 from PyQt6 import QtWidgets
-from camlib import Geometry, arc, arc_angle, ApertureMacro, grace, flatten_shapely_geometry
+from camlib import Geometry, arc, arc_angle, ApertureMacro, grace, flatten_shapely_geometry, union_tiled
 
 from appParsers.ParseDXF import getdxfgeo
 from appParsers.ParseSVG import svgparselength, getsvggeo, svgparse_viewbox
@@ -12,6 +12,9 @@ from copy import deepcopy
 from shapely.ops import unary_union, linemerge
 import shapely.affinity as affinity
 from shapely import box as shply_box
+from shapely import transform as shply_transform, get_num_coordinates
+from shapely import STRtree, get_parts, get_type_id, is_empty as shply_is_empty
+from shapely import difference as shply_difference, intersection as shply_intersection
 from shapely import LinearRing, MultiLineString, LineString, Polygon, MultiPolygon, Point, prepare, is_prepared
 
 from lxml import etree as ET
@@ -19,6 +22,8 @@ import ezdxf
 import logging
 import re
 import sys
+import os
+import mmap
 
 import gettext
 import builtins
@@ -149,6 +154,9 @@ class Gerber(Geometry):
         # ################################# Parser patterns ###########################################################
         # #############################################################################################################
 
+        # splits the source in statements and finds the statement kind so only the patterns that can match are tried
+        self.lexer = GerberLexer()
+
         # Detect Gerber x2 format
         self.gx2_re = re.compile(r'%TF\.FileFunction.*')
 
@@ -241,6 +249,13 @@ class Gerber(Geometry):
         # Flag to detect if an aperture is used without definition
         self.defective_aperture_detected = False
 
+        # Flash templates: the geometry of a flash made at origin, once for each aperture (and its parameters),
+        # to be translated in the flash location. Used by create_flash_geometry()
+        self.flash_templates = {}
+
+        # accumulates the polarity runs while parsing, see GerberLayerStack
+        self.layer_stack_class = GerberLayerStack
+
         self.use_buffer_for_union = self.app.options["gerber_use_buffer_for_union"]
 
         # Attributes to be included in serialization
@@ -248,6 +263,17 @@ class Gerber(Geometry):
         # from Geometry.
         self.ser_attrs += ['tools', 'int_digits', 'frac_digits', 'aperture_macros', 'solid_geometry', 'source_file']
 
+    def union_progress(self, percentage):
+        """
+        Progress callback for the unions made with camlib.union_tiled() while parsing.
+
+        :param percentage:  the progress of the union
+        :return:            None
+        """
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+
     def aperture_parse(self, apertureId, apertureType, apParameters):
         """
         Parse gerber aperture definition into dictionary of apertures.
@@ -326,85 +352,57 @@ class Gerber(Geometry):
         self.app.log.warning("Aperture not implemented: %s" % str(apertureType))
         return None
 
-    def parse_file(self, filename, follow=False):
+    def parse_file(self, filename, follow=False, streaming=False):
         """
-        Calls Gerber.parse_lines() with generator of lines
+        Calls Gerber.parse_lines() with generator of statements
         read from the given file. Will split the lines if multiple
-        statements are found in a single original line.
-
-        The following line is split into two::
-
-            G54D11*G36*
-
-        First is ``G54D11*`` and seconds is ``G36*``.
+        statements are found in a single original line (see GerberLexer.statements()).
 
         :param filename:        Gerber file to parse.
         :type filename:         str
         :param follow:          If true, will not create polygons, just lines
                                 following the gerber path.
         :type follow:           bool
+        :param streaming:       If True, the file is memory mapped and parsed one line at a time and the source is not
+                                kept in self.source_file, so the memory used does not depend on the file size.
+                                For very large files.
+        :type streaming:        bool
         :return:                None
         """
 
-        with open(filename, 'r') as gfile:
-
-            read_gfile = gfile.read()
-
-            # clean KiCAD files of garbage
-            if '%TF.' in read_gfile or '%TO.' in read_gfile or '%TD' in read_gfile or '%TA' in read_gfile:
-                new_gfile = ""
-                for line in read_gfile.splitlines():
-                    if '%TF.' in line or '%TO.' in line or '%TD' in line or '%TA' in line:
-                        continue
-                    new_gfile += '%s\n' % line
-                split_lines = new_gfile.splitlines()
-            else:
-                split_lines = read_gfile.splitlines()
-
-            def line_generator():
-                for line in split_lines:
-                    line = line.strip(' \r\n')
-                    while len(line) > 0:
-
-                        # If ends with '%' leave as is.
-                        if line[-1] == '%':
-                            yield line
-                            break
-
-                        # Split after '*' if any.
-                        starpos = line.find('*')
-                        if starpos > -1:
-                            cleanline = line[:starpos + 1]
-                            yield cleanline
-                            line = line[starpos + 1:]
-
-                        # Otherwise leave as is.
-                        else:
-                            # yield clean line
-                            yield line
-                            break
-
-            processed_lines = list(line_generator())
-            ret_val = self.parse_lines(processed_lines)
+        if streaming and os.path.getsize(filename) > 0:
+            with open(filename, 'rb') as gfile, mmap.mmap(gfile.fileno(), 0, access=mmap.ACCESS_READ) as gmap:
+                # splitlines() handles the files with other line endings than '\n'
+                glines = (
+                    split_line
+                    for line in iter(gmap.readline, b'') for split_line in line.decode('utf-8').splitlines()
+                )
+                ret_val = self.parse_lines(self.lexer.statements(glines, skip_attributes=True), keep_source=False)
+        else:
+            with open(filename, 'r') as gfile:
+                # the file is read and split in statements one line at a time, while parsing
+                ret_val = self.parse_lines(self.lexer.statements(gfile, skip_attributes=True))
 
-            if ret_val == 'fail':
-                return 'fail'
-            elif ret_val == "defective":
-                return "defective"
-            elif ret_val == 'drill':
-                return 'drill_gx2'
-            else:
-                return
+        if ret_val == 'fail':
+            return 'fail'
+        elif ret_val == "defective":
+            return "defective"
+        elif ret_val == 'drill':
+            return 'drill_gx2'
+        else:
+            return
 
     # @profile
-    def parse_lines(self, glines):
+    def parse_lines(self, glines, keep_source=True):
         """
         Main Gerber parser. Reads Gerber and populates ``self.paths``, ``self.tools``,
         ``self.flashes``, ``self.regions`` and ``self.units``.
 
-        :param glines: Gerber code as list of strings, each element being
-            one line of the source file.
+        :param glines: Gerber code as an iterable of strings (like a list or the generator
+            GerberLexer.statements()), each element being one statement of the source file.
         :type glines: list
+        :param keep_source: if True the statements are stored in self.source_file
+        :type keep_source: bool
         :return: only errors/warnings
         :rtype: str
         """
@@ -429,6 +427,12 @@ class Gerber(Geometry):
         # store here the follow geometry
         follow_buffer = []
 
+        # when the flashes are made in bulk, their locations are stored here, grouped by flash template, until there
+        # is a change in polarity or the end of file; then the geometry is made for all of them and added to
+        # poly_buffer
+        bulk_flashes = self.app.options['gerber_bulk_flashes']
+        deferred_flashes = {}
+
         last_path_aperture = None
         current_aperture = None
 
@@ -459,16 +463,30 @@ class Gerber(Geometry):
         # Indicates the current polarity: D-Dark, C-Clear
         current_polarity = 'D'
 
+        # the unions of the whole layer are made on tiles, in the processes of the App.pool
+        union_pool = self.app.pool if self.app.options['gerber_parallel_union'] else None
+
+        # the polygons of each polarity run are added here when the polarity changes and resolved into the solid
+        # geometry at the end of the file
+        layers = self.layer_stack_class(self.solid_geometry, pool=union_pool, callback=self.union_progress)
+
         # If a region is being defined
         making_region = False
 
+        # the source statements, joined in self.source_file when the parsing ends
+        source_lines = []
+
         # ### Parsing starts here ## ##
         line_num = 0
         gline = ""
 
         s_tol = float(self.app.options["gerber_simp_tolerance"])
 
-        self.app.inform.emit('%s %d %s.' % (_("Gerber processing. Parsing"), len(glines), _("Lines").lower()))
+        try:
+            self.app.inform.emit('%s %d %s.' % (_("Gerber processing. Parsing"), len(glines), _("Lines").lower()))
+        except TypeError:
+            # the statements are generated while parsing
+            self.app.inform.emit('%s ...' % _("Gerber processing. Parsing"))
         try:
             for gline in glines:
                 if self.app.abort_flag:
@@ -476,7 +494,8 @@ class Gerber(Geometry):
                     raise grace
 
                 line_num += 1
-                self.source_file += gline + '\n'
+                if keep_source:
+                    source_lines.append(gline)
 
                 # Cleanup #
                 gline = gline.strip(' \r\n')
@@ -486,14 +505,19 @@ class Gerber(Geometry):
                 # ################   Ignored lines   ############################
                 # ################     Comments      ############################
                 # ###############################################################
-                match = self.comm_re.search(gline)
-                if match:
+                # the statement kind (it is a comment when it matches self.comm_re)
+                kind = self.lexer.classify(gline)
+                if kind == GerberLexer.COMMENT:
                     continue
 
+                # only the patterns that can match the statement kind are tried; the content of the aperture macros
+                # goes through the whole cascade of patterns
+                full_cascade = kind is GerberLexer.OTHER or current_macro is not None
+
                 # ######################################################################################################
                 # ######## Detect GERBER X2 format #####################################################################
                 # ######################################################################################################
-                match = self.gx2_re.search(gline)
+                match = self.gx2_re.search(gline) if full_cascade else None
                 if match:
                     self.app.log.warning('Gerber X2 format detected !!!')
                     self.app.inform.emit(
@@ -512,7 +536,7 @@ class Gerber(Geometry):
                 # ########   If polarity changes, creates geometry from current #
                 # ########    buffer, then adds or subtracts accordingly.       #
                 # ###############################################################
-                match = self.lpol_re.search(gline)
+                match = self.lpol_re.search(gline) if full_cascade else None
                 if match:
                     new_polarity = match.group(1)
                     # self.app.log.info("Polarity CHANGE, LPC = %s, poly_buff = %s" % (self.is_lpc, poly_buffer))
@@ -555,6 +579,11 @@ class Gerber(Geometry):
 
                         path = [path[-1]]
 
+                    # make the flashes done with the previous polarity
+                    if deferred_flashes:
+                        flash_tol = s_tol if self.app.options['gerber_simplification'] else None
+                        poly_buffer += self.make_deferred_flashes(deferred_flashes, flash_tol)
+
                     # --- Apply buffer ---
                     # If added for testing of bug #83
                     # TODO: Remove when bug fixed
@@ -564,11 +593,7 @@ class Gerber(Geometry):
                         buff_length = 1
 
                     if buff_length > 0:
-                        if current_polarity == 'D':
-                            self.solid_geometry = self.solid_geometry.union(unary_union(poly_buffer))
-
-                        else:
-                            self.solid_geometry = self.solid_geometry.difference(unary_union(poly_buffer))
+                        layers.add(current_polarity, poly_buffer)
 
                         # follow_buffer = []
                         poly_buffer = []
@@ -581,7 +606,7 @@ class Gerber(Geometry):
                 # #####################  Example: %FSLAX24Y24*%  #################
                 # ################################################################
 
-                match = self.fmt_re.search(gline)
+                match = self.fmt_re.search(gline) if full_cascade else None
                 if match:
                     absolute = {'A': 'Absolute', 'I': 'Relative'}[match.group(2)]
                     if match.group(1) is not None:
@@ -600,7 +625,7 @@ class Gerber(Geometry):
                 # ######################## Mode (IN/MM)    #######################
                 # #####################    Example: %MOIN*%  #####################
                 # ################################################################
-                match = self.mode_re.search(gline)
+                match = self.mode_re.search(gline) if full_cascade else None
                 if match:
                     self.units = match.group(1)
                     self.app.log.debug("Gerber units found = %s" % self.units)
@@ -614,7 +639,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # Combined Number format and Mode --- Allegro does this ##########
                 # ################################################################
-                match = self.fmt_re_alt.search(gline)
+                match = self.fmt_re_alt.search(gline) if full_cascade else None
                 if match:
                     absolute = {'A': 'Absolute', 'I': 'Relative'}[match.group(2)]
                     if match.group(1) is not None:
@@ -639,7 +664,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # ####     Search for OrCAD way for having Number format  ########
                 # ################################################################
-                match = self.fmt_re_orcad.search(gline)
+                match = self.fmt_re_orcad.search(gline) if full_cascade else None
                 if match:
                     if match.group(1) is not None:
                         if match.group(1) == 'G74':
@@ -672,7 +697,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # ############     Units (G70/1) OBSOLETE   ######################
                 # ################################################################
-                match = self.units_re.search(gline)
+                match = self.units_re.search(gline) if full_cascade else None
                 if match:
                     obs_gerber_units = {'0': 'IN', '1': 'MM'}[match.group(1)]
                     self.units = obs_gerber_units
@@ -687,7 +712,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # #####   Absolute/relative coordinates G90/1 OBSOLETE ###########
                 # ################################################################
-                match = self.absrel_re.search(gline)
+                match = self.absrel_re.search(gline) if full_cascade else None
                 if match:
                     absolute = {'0': "Absolute", '1': "Relative"}[match.group(1)]
                     self.app.log.warning(
@@ -702,7 +727,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # ################################################################
                 if current_macro is None:  # No macro started yet
-                    match = self.am1_re.search(gline)
+                    match = self.am1_re.search(gline) if full_cascade else None
                     # Start macro if there is a match, else not an AM, carry on.
                     if match:
                         self.app.log.debug("Starting macro. Line %d: %s" % (line_num, gline))
@@ -730,7 +755,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # ##############   Aperture definitions %ADD...  #################
                 # ################################################################
-                match = self.ad_re.search(gline)
+                match = self.ad_re.search(gline) if full_cascade else None
                 if match:
                     # log.info("Found aperture definition. Line %d: %s" % (line_num, gline))
                     self.aperture_parse(match.group(1), match.group(2), match.group(3))
@@ -741,7 +766,7 @@ class Gerber(Geometry):
                 # ###########   Operation code alone, usually just D03 (Flash) ###
                 # self.opcode_re = re.compile(r'^D0?([123])\*$')
                 # ################################################################
-                match = self.opcode_re.search(gline)
+                match = self.opcode_re.search(gline) if kind != GerberLexer.COORD else None
                 if match and current_aperture != "failure":
                     current_operation_code = int(match.group(1))
                     current_d = current_operation_code
@@ -752,23 +777,30 @@ class Gerber(Geometry):
                         try:
                             # self.app.log.debug("Bare op-code %d." % current_operation_code)
                             geo_dict = {}
-                            flash = self.create_flash_geometry(
-                                Point(current_x, current_y), self.tools[current_aperture],
-                                self.steps_per_circle)
-
                             geo_dict['follow'] = Point([current_x, current_y])
 
-                            if not flash.is_empty:
-                                if self.app.options['gerber_simplification']:
-                                    flash = flash.simplify(s_tol)
+                            if bulk_flashes:
+                                # the flash geometry is made later, together with the other flashes of the aperture
+                                has_flash = self.defer_flash(
+                                    deferred_flashes, (current_x, current_y), self.tools[current_aperture], geo_dict)
+                            else:
+                                flash = self.create_flash_geometry(
+                                    Point(current_x, current_y), self.tools[current_aperture],
+                                    self.steps_per_circle)
 
-                                prepare(flash)
-                                poly_buffer.append(flash)
-                                if self.is_lpc is True:
-                                    geo_dict['clear'] = flash
-                                else:
-                                    geo_dict['solid'] = flash
+                                has_flash = not flash.is_empty
+                                if has_flash:
+                                    if self.app.options['gerber_simplification']:
+                                        flash = flash.simplify(s_tol)
 
+                                    prepare(flash)
+                                    poly_buffer.append(flash)
+                                    if self.is_lpc is True:
+                                        geo_dict['clear'] = flash
+                                    else:
+                                        geo_dict['solid'] = flash
+
+                            if has_flash:
                                 if current_aperture not in self.tools:
                                     self.tools[current_aperture] = {}
 
@@ -786,7 +818,7 @@ class Gerber(Geometry):
                 # ################  Example: D12*         ########################
                 # self.tool_re = re.compile(r'^(?:G54)?D(\d\d+)\*$')
                 # ################################################################
-                match = self.tool_re.search(gline)
+                match = self.tool_re.search(gline) if kind != GerberLexer.COORD else None
                 if match:
                     current_aperture = int(match.group(1))
 
@@ -851,7 +883,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # ################  G36* - Begin region   ########################
                 # ################################################################
-                if self.regionon_re.search(gline) and current_aperture != "failure":
+                if full_cascade and self.regionon_re.search(gline) and current_aperture != "failure":
                     try:
                         path_length = len(path)
                     except TypeError:
@@ -925,7 +957,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # ################  G37* - End region     ########################
                 # ################################################################
-                if self.regionoff_re.search(gline) and current_aperture != "failure":
+                if full_cascade and self.regionoff_re.search(gline) and current_aperture != "failure":
                     making_region = False
 
                     if 0 not in self.tools:
@@ -1059,7 +1091,7 @@ class Gerber(Geometry):
                 # ####  sometimes by itself (handled here).  #####################
                 # ####  Example: G01*                        #####################
                 # ################################################################
-                match = self.interp_re.search(gline)
+                match = self.interp_re.search(gline) if full_cascade else None
                 if match:
                     current_interpolation_mode = int(match.group(1))
                     continue
@@ -1069,7 +1101,7 @@ class Gerber(Geometry):
                 # ######### Operation code (D0x) missing is deprecated   #########
                 # REGEX: r'^(?:G0?(1))?(?:X(-?\d+))?(?:Y(-?\d+))?(?:D0([123]))?\*$'
                 # ################################################################
-                match = self.lin_re.search(gline)
+                match = self.lin_re.search(gline) if kind != GerberLexer.DCODE else None
                 if match and current_aperture != "failure":
                     # Dxx alone?
                     # if match.group(1) is None and match.group(2) is None and match.group(3) is None:
@@ -1123,22 +1155,26 @@ class Gerber(Geometry):
                                     geo_dict['follow'] = geo_flash
 
                                     # this treats the case when we are storing geometry as solids
-                                    flash = self.create_flash_geometry(
-                                        Point([current_x, current_y]),
-                                        self.tools[current_aperture],
-                                        self.steps_per_circle
-                                    )
-                                    if not flash.is_empty:
-                                        if self.app.options['gerber_simplification']:
-                                            flash = flash.simplify(s_tol)
+                                    if bulk_flashes:
+                                        self.defer_flash(deferred_flashes, (current_x, current_y),
+                                                         self.tools[current_aperture], geo_dict)
+                                    else:
+                                        flash = self.create_flash_geometry(
+                                            Point([current_x, current_y]),
+                                            self.tools[current_aperture],
+                                            self.steps_per_circle
+                                        )
+                                        if not flash.is_empty:
+                                            if self.app.options['gerber_simplification']:
+                                                flash = flash.simplify(s_tol)
 
-                                        prepare(flash)
-                                        poly_buffer.append(flash)
+                                            prepare(flash)
+                                            poly_buffer.append(flash)
 
-                                        if self.is_lpc is True:
-                                            geo_dict['clear'] = flash
-                                        else:
-                                            geo_dict['solid'] = flash
+                                            if self.is_lpc is True:
+                                                geo_dict['clear'] = flash
+                                            else:
+                                                geo_dict['solid'] = flash
 
                                     if current_aperture not in self.tools:
                                         self.tools[current_aperture] = {}
@@ -1379,23 +1415,27 @@ class Gerber(Geometry):
                         geo_dict['follow'] = geo_flash
 
                         # this treats the case when we are storing geometry as solids
-                        flash = self.create_flash_geometry(
-                            Point([linear_x, linear_y]),
-                            self.tools[current_aperture],
-                            self.steps_per_circle
-                        )
+                        if bulk_flashes:
+                            self.defer_flash(deferred_flashes, (linear_x, linear_y), self.tools[current_aperture],
+                                             geo_dict)
+                        else:
+                            flash = self.create_flash_geometry(
+                                Point([linear_x, linear_y]),
+                                self.tools[current_aperture],
+                                self.steps_per_circle
+                            )
 
-                        if not flash.is_empty:
-                            if self.app.options['gerber_simplification']:
-                                flash = flash.simplify(s_tol)
+                            if not flash.is_empty:
+                                if self.app.options['gerber_simplification']:
+                                    flash = flash.simplify(s_tol)
 
-                            prepare(flash)
-                            poly_buffer.append(flash)
+                                prepare(flash)
+                                poly_buffer.append(flash)
 
-                            if self.is_lpc is True:
-                                geo_dict['clear'] = flash
-                            else:
-                                geo_dict['solid'] = flash
+                                if self.is_lpc is True:
+                                    geo_dict['clear'] = flash
+                                else:
+                                    geo_dict['solid'] = flash
 
                         if current_aperture not in self.tools:
                             self.tools[current_aperture] = {}
@@ -1414,7 +1454,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # ######### G74/75* - Single or multiple quadrant arcs  ##########
                 # ################################################################
-                match = self.quad_re.search(gline)
+                match = self.quad_re.search(gline) if full_cascade else None
                 if match:
                     if match.group(1) == '4':
                         quadrant_mode = 'SINGLE'
@@ -1428,7 +1468,7 @@ class Gerber(Geometry):
                 # ######### Ex. format: G03 X0 Y50 I-50 J0 where the     #########
                 # ######### X, Y coords are the coords of the End Point  #########
                 # ################################################################
-                match = self.circ_re.search(gline)
+                match = self.circ_re.search(gline) if kind != GerberLexer.DCODE else None
                 if match and current_aperture != "failure":
                     arcdir = [None, None, "cw", "ccw"]
 
@@ -1619,7 +1659,7 @@ class Gerber(Geometry):
                 # ################################################################
                 # ######### EOF - END OF FILE ####################################
                 # ################################################################
-                match = self.eof_re.search(gline)
+                match = self.eof_re.search(gline) if full_cascade else None
                 if match:
                     continue
 
@@ -1681,7 +1721,14 @@ class Gerber(Geometry):
             # this treats the case when we are storing geometry as paths
             self.follow_geometry = flatten_shapely_geometry(follow_buffer)
 
+            # the dark and clear runs before the last polarity change
+            self.solid_geometry = layers.resolve()
+
             # this treats the case when we are storing geometry as solids
+            if deferred_flashes:
+                flash_tol = s_tol if self.app.options['gerber_simplification'] else None
+                poly_buffer += self.make_deferred_flashes(deferred_flashes, flash_tol)
+
             try:
                 buff_length = len(poly_buffer)
             except TypeError:
@@ -1708,16 +1755,19 @@ class Gerber(Geometry):
             if self.use_buffer_for_union:
                 self.app.log.debug("Union by buffer...")
 
-                new_poly = MultiPolygon(poly_buffer)
                 if self.app.options["gerber_buffering"] == 'full':
-                    new_poly = new_poly.buffer(0.00000001)
-                    new_poly = new_poly.buffer(-0.00000001)
+                    new_poly = union_tiled(poly_buffer, pool=union_pool, buffer_distance=0.00000001,
+                                           callback=self.union_progress)
                     self.app.log.warning("Union(buffer) done.")
+                else:
+                    new_poly = MultiPolygon(poly_buffer)
 
             else:
                 self.app.log.debug("Union by union()...")
-                new_poly = unary_union(poly_buffer)
-                new_poly = new_poly.buffer(0, int(self.steps_per_circle))
+                new_poly = union_tiled(poly_buffer, pool=union_pool, callback=self.union_progress)
+                # the union is valid, unless the source geometry is not
+                if not new_poly.is_valid:
+                    new_poly = new_poly.buffer(0, int(self.steps_per_circle))
                 self.app.log.warning("Union done.")
 
             # #########################################################################################################
@@ -1797,54 +1847,168 @@ class Gerber(Geometry):
             loc = '%s #%d %s: %s\n' % (_("Gerber Line"), line_num, _("Gerber Line Content"), gline) + repr(err)
             self.app.inform.emit('[ERROR] %s\n%s:' % (_("Gerber Parser ERROR"), loc))
             return 'fail'
+        finally:
+            if source_lines:
+                self.source_file += '\n'.join(source_lines) + '\n'
 
         if is_excellon_gx2 is True:
             return 'drill'
 
     def create_flash_geometry(self, location, aperture, steps_per_circle=None):
+        """
+        Makes the geometry of a flash by translating the aperture flash template in the flash location.
+
+        :param location:            flash location; a shapely Point or a (x, y) sequence
+        :param aperture:            the aperture dict from self.tools
+        :param steps_per_circle:    number of segments used to approximate a circle
+        :return:                    the flash geometry or None if the aperture type is unknown
+        """
 
         # self.app.log.debug('Flashing @%s, Aperture: %s' % (location, aperture))
 
-        if type(location) == list:
-            location = Point(location)
+        if isinstance(location, Point):
+            loc = location.coords[0]
+        else:
+            loc = (location[0], location[1])
+
+        flash_template = self.get_flash_template(aperture, steps_per_circle)
+        if flash_template is None:
+            return None
+
+        return shply_transform(flash_template, lambda coords: coords + loc)
+
+    def defer_flash(self, deferred_flashes, location, aperture, geo_dict):
+        """
+        Stores a flash to be made later by make_deferred_flashes(), in bulk with the other flashes of the aperture.
+
+        :param deferred_flashes:    dict where the deferred flashes are stored, grouped by flash template and polarity
+        :param location:            flash location as a (x, y) tuple
+        :param aperture:            the aperture dict from self.tools
+        :param geo_dict:            the geometry dict of the flash; the flash geometry will be stored in it
+        :return:                    True if the flash has geometry (the aperture flash is not empty), False otherwise
+        """
+        flash_template = self.get_flash_template(aperture, self.steps_per_circle)
+        if flash_template is None or flash_template.is_empty:
+            return False
+
+        storage_key = 'clear' if self.is_lpc is True else 'solid'
+        try:
+            deferred = deferred_flashes[(id(flash_template), storage_key)]
+        except KeyError:
+            deferred = {
+                'template': flash_template,
+                'key': storage_key,
+                'locations': [],
+                'geo_dicts': []
+            }
+            deferred_flashes[(id(flash_template), storage_key)] = deferred
+
+        deferred['locations'].append(location)
+        deferred['geo_dicts'].append(geo_dict)
+        return True
+
+    @staticmethod
+    def make_deferred_flashes(deferred_flashes, simplification_tolerance=None):
+        """
+        Makes the geometry of the flashes stored by defer_flash(). For each flash template, the geometry of all the
+        flashes is made with one vectorized call, by offsetting the repeated template coordinates with the flash
+        locations. The flash geometry is stored in the flash geometry dict and the deferred_flashes dict is emptied.
+
+        :param deferred_flashes:            dict with the deferred flashes, filled by defer_flash()
+        :param simplification_tolerance:    if not None, the flash templates are simplified with this tolerance
+        :return:                            list of flash geometries
+        """
+        flashes = []
+
+        for deferred in deferred_flashes.values():
+            flash_template = deferred['template']
+            if simplification_tolerance is not None:
+                flash_template = flash_template.simplify(simplification_tolerance)
+
+            offsets = np.array(deferred['locations'], dtype=float)
+            template_coords_nr = get_num_coordinates(flash_template)
+            flash_geos = np.full(len(offsets), flash_template, dtype=object)
+            flash_geos = shply_transform(
+                flash_geos, lambda coords: coords + np.repeat(offsets, template_coords_nr, axis=0))
+            prepare(flash_geos)
+
+            for geo_dict, flash in zip(deferred['geo_dicts'], flash_geos):
+                geo_dict[deferred['key']] = flash
+            flashes += flash_geos.tolist()
+
+        deferred_flashes.clear()
+        return flashes
+
+    def get_flash_template(self, aperture, steps_per_circle=None):
+        """
+        Returns the geometry of a flash of the aperture made in origin. It is made once for each aperture type and
+        parameters (and aperture macro modifiers) and then it is reused from the self.flash_templates cache.
+
+        :param aperture:            the aperture dict from self.tools
+        :param steps_per_circle:    number of segments used to approximate a circle
+        :return:                    the flash geometry in origin or None if the aperture type is unknown
+        """
+        ap_type = aperture['type']
+
+        if ap_type == 'C':
+            key = (ap_type, aperture['size'], steps_per_circle)
+        elif ap_type in ['R', 'O']:
+            key = (ap_type, aperture['width'], aperture['height'], steps_per_circle)
+        elif ap_type == 'P':
+            key = (ap_type, aperture['diam'], aperture['nVertices'], aperture.get('rotation'))
+        elif ap_type == 'AM':
+            key = (ap_type, aperture['macro'].name, tuple(aperture['modifiers'] or ()))
+        else:
+            key = (ap_type, )
+
+        try:
+            return self.flash_templates[key]
+        except KeyError:
+            pass
+
+        flash_template = self.make_flash_template(aperture, steps_per_circle)
+        self.flash_templates[key] = flash_template
+        return flash_template
+
+    def make_flash_template(self, aperture, steps_per_circle=None):
+        """
+        Makes the geometry of a flash of the aperture in origin.
+
+        :param aperture:            the aperture dict from self.tools
+        :param steps_per_circle:    number of segments used to approximate a circle
+        :return:                    the flash geometry in origin or None if the aperture type is unknown
+        """
 
         if aperture['type'] == 'C':  # Circles
-            return location.buffer(aperture['size'] / 2, int(steps_per_circle))
+            return Point(0, 0).buffer(aperture['size'] / 2, int(steps_per_circle))
 
         if aperture['type'] == 'R':  # Rectangles
-            loc = location.coords[0]
             width = aperture['width']
             height = aperture['height']
-            minx = loc[0] - width / 2
-            maxx = loc[0] + width / 2
-            miny = loc[1] - height / 2
-            maxy = loc[1] + height / 2
-            return shply_box(minx, miny, maxx, maxy).buffer(0.0000001)
+            return shply_box(-width / 2, -height / 2, width / 2, height / 2).buffer(0.0000001)
 
         if aperture['type'] == 'O':  # Obround
-            loc = location.coords[0]
             width = aperture['width']
             height = aperture['height']
             if width > height:
-                p1 = Point(loc[0] + 0.5 * (width - height), loc[1])
-                p2 = Point(loc[0] - 0.5 * (width - height), loc[1])
+                p1 = Point(0.5 * (width - height), 0)
+                p2 = Point(-0.5 * (width - height), 0)
                 c1 = p1.buffer(height * 0.5, int(steps_per_circle))
                 c2 = p2.buffer(height * 0.5, int(steps_per_circle))
             else:
-                p1 = Point(loc[0], loc[1] + 0.5 * (height - width))
-                p2 = Point(loc[0], loc[1] - 0.5 * (height - width))
+                p1 = Point(0, 0.5 * (height - width))
+                p2 = Point(0, -0.5 * (height - width))
                 c1 = p1.buffer(width * 0.5, int(steps_per_circle))
                 c2 = p2.buffer(width * 0.5, int(steps_per_circle))
             return unary_union([c1, c2]).convex_hull
 
         if aperture['type'] == 'P':  # Regular polygon
-            loc = location.coords[0]
             diam = aperture['diam']
             n_vertices = aperture['nVertices']
             points = []
             for i in range(0, n_vertices):
-                x = loc[0] + 0.5 * diam * (np.cos(2 * np.pi * i / n_vertices))
-                y = loc[1] + 0.5 * diam * (np.sin(2 * np.pi * i / n_vertices))
+                x = 0.5 * diam * (np.cos(2 * np.pi * i / n_vertices))
+                y = 0.5 * diam * (np.sin(2 * np.pi * i / n_vertices))
                 points.append((x, y))
             ply = Polygon(points)
             if 'rotation' in aperture:
@@ -1852,11 +2016,10 @@ class Gerber(Geometry):
             return ply
 
         if aperture['type'] == 'AM':  # Aperture Macro
-            loc = location.coords[0]
             flash_geo = aperture['macro'].make_geometry(aperture['modifiers'])
             if flash_geo.is_empty:
                 self.app.log.warning("Empty geometry for Aperture Macro: %s" % str(aperture['macro'].name))
-            return affinity.translate(flash_geo, xoff=loc[0], yoff=loc[1])
+            return flash_geo
 
         self.app.log.warning("Unknown aperture type: %s" % aperture['type'])
         return None
@@ -2723,6 +2886,245 @@ class Gerber(Geometry):
         self.app.proc_container.new_text = ''
 
 
+class GerberLexer:
+    """
+    Splits the Gerber source in statements and classifies each statement with a single combined pattern that looks
+    only at the leading command characters. It is used by Gerber.parse_lines() to try only the parser patterns that
+    can match a statement instead of the whole cascade of patterns.
+
+    The token kinds:
+
+    * ``COMMENT``: a G04 comment (it matches the same statements as ``Gerber.comm_re``)
+    * ``COORD``: a coordinates data block, with an optional G01/G02/G03 prefix, e.g. ``X100Y200D01*``
+    * ``DCODE``: an operation code alone or an aperture selection, e.g. ``D03*`` or ``G54D11*``
+    * ``OTHER``: any other statement (extended commands, G/M codes, aperture macro content etc.)
+
+    **USAGE**::
+
+        lexer = GerberLexer()
+        with open(filename, 'r') as gfile:
+            for kind, statement in lexer.tokens(gfile):
+                ...
+    """
+
+    COMMENT = 'comment'
+    COORD = 'coord'
+    DCODE = 'dcode'
+    OTHER = None
+
+    # the alternatives are tried in order and the name of the matched group is the token kind
+    token_re = re.compile(r'(?P<comment>G0?4)|(?P<coord>(?:G0?[123])?[XYIJ])|(?P<dcode>(?:G5[45])?D)')
+
+    # Gerber X2 attributes lines, they are not used by the parser
+    attribute_markers = ('%TF.', '%TO.', '%TD', '%TA')
+
+    def classify(self, statement):
+        """
+        Finds the token kind of a Gerber statement.
+
+        :param statement:   a Gerber statement, as yielded by statements()
+        :type statement:    str
+        :return:            one of the COMMENT, COORD, DCODE or OTHER token kinds
+        """
+        match = self.token_re.match(statement)
+        if match is None:
+            return self.OTHER
+
+        kind = match.lastgroup
+        # the statements with an extended command (like the OrCAD format specification following a G-code) are
+        # left for the whole cascade of parser patterns
+        if kind != self.COMMENT and '%' in statement:
+            return self.OTHER
+        return kind
+
+    def statements(self, lines, skip_attributes=False):
+        """
+        Generator of Gerber statements from an iterable of lines (like an open file), read one line at a time.
+        The lines are split after each '*' if multiple statements are found in a line, except the lines that end with
+        '%' (extended commands) which are yielded as they are.
+
+        The following line is split into two::
+
+            G54D11*G36*
+
+        First is ``G54D11*`` and second is ``G36*``.
+
+        :param lines:           iterable of Gerber source lines
+        :param skip_attributes: if True the lines with Gerber X2 attributes (generated by KiCAD) are dropped
+        :type skip_attributes:  bool
+        :return:                generator of statements
+        """
+        for line in lines:
+            if skip_attributes and any(marker in line for marker in self.attribute_markers):
+                continue
+
+            line = line.strip(' \r\n')
+            while len(line) > 0:
+
+                # If ends with '%' leave as is.
+                if line[-1] == '%':
+                    yield line
+                    break
+
+                # Split after '*' if any.
+                starpos = line.find('*')
+                if starpos > -1:
+                    yield line[:starpos + 1]
+                    line = line[starpos + 1:]
+
+                # Otherwise leave as is.
+                else:
+                    yield line
+                    break
+
+    def tokens(self, lines, skip_attributes=False):
+        """
+        Generator of typed tokens from an iterable of lines (like an open file).
+
+        :param lines:           iterable of Gerber source lines
+        :param skip_attributes: if True the lines with Gerber X2 attributes (generated by KiCAD) are dropped
+        :type skip_attributes:  bool
+        :return:                generator of (kind, statement) tuples
+        """
+        for statement in self.statements(lines, skip_attributes=skip_attributes):
+            yield self.classify(statement), statement
+
+
+class GerberLayerStack:
+    """
+    Accumulates the dark (LPD) and clear (LPC) runs of a Gerber file, in the file order, and resolves them into the
+    solid geometry only once, at the end of the parsing.
+
+    The accumulated geometry is kept as a list of polygons (tiles) that may overlap each other, instead of a single
+    geometry that grows with each run:
+
+    * a dark run is added as it is: its polygons are joined with the others only once, in resolve()
+    * a clear run is subtracted only from the tiles that intersect one of its polygons (found with a STRtree query),
+      each tile with the union of its own intersecting clear polygons; the other tiles are not touched
+    * the tiles with more than MAX_TILE_VERTICES vertices are split on a grid, so a large poured plane with many
+      knockouts is cut in pieces and each clear run works only on the pieces around it
+
+    The difference is distributive over the union, so the union of the tiles made in resolve() is the same geometry
+    that the union/difference of each run with the whole accumulated geometry makes, without the work growing with
+    the number of polarity changes.
+
+    **USAGE**::
+
+        layers = GerberLayerStack(gerber.solid_geometry)
+        layers.add('D', dark_polygons)
+        layers.add('C', clear_polygons)
+        solid_geometry = layers.resolve()
+    """
+
+    MAX_TILE_VERTICES = 2000
+
+    def __init__(self, geometry=None, pool=None, callback=None):
+        """
+
+        :param geometry:    the starting geometry (Shapely geometry or None)
+        :param pool:        a multiprocessing Pool used for the union in resolve(); see camlib.union_tiled()
+        :param callback:    progress callback for the union in resolve(); see camlib.union_tiled()
+        """
+        self.pool = pool
+        self.callback = callback
+        self.tiles = []
+        if geometry is not None and not geometry.is_empty:
+            self.add('D', [geometry])
+
+    @staticmethod
+    def polygon_parts(geometry):
+        """
+
+        :param geometry:    a Shapely geometry or a list of Shapely geometries
+        :return:            numpy array with the non-empty polygons of the geometry. The lines and points (e.g. from
+                            an intersection with a grid cell that only touches a polygon) have no area, so they
+                            are dropped
+        """
+        parts = get_parts(np.asarray(flatten_shapely_geometry(geometry), dtype=object))
+        return parts[np.isin(get_type_id(parts), (3, 6)) & ~shply_is_empty(parts)]
+
+    def split_tiles(self, polygons):
+        """
+        Split the polygons with more than MAX_TILE_VERTICES vertices on a grid sized to leave about
+        MAX_TILE_VERTICES vertices in each tile.
+
+        :param polygons:    numpy array of polygons
+        :return:            numpy array of polygons
+        """
+        if polygons.size == 0:
+            return polygons
+
+        vertices = get_num_coordinates(polygons)
+        large = vertices > self.MAX_TILE_VERTICES
+        if not large.any():
+            return polygons
+
+        tiles = [polygons[~large]]
+        for poly, poly_vertices in zip(polygons[large], vertices[large]):
+            grid = int(np.ceil(np.sqrt(poly_vertices / self.MAX_TILE_VERTICES)))
+            minx, miny, maxx, maxy = poly.bounds
+            xs = np.linspace(minx, maxx, grid + 1)
+            ys = np.linspace(miny, maxy, grid + 1)
+            x0, y0 = np.meshgrid(xs[:-1], ys[:-1])
+            x1, y1 = np.meshgrid(xs[1:], ys[1:])
+            cells = shply_box(x0.ravel(), y0.ravel(), x1.ravel(), y1.ravel())
+            tiles.append(self.polygon_parts(list(shply_intersection(poly, cells))))
+        return np.concatenate(tiles)
+
+    def add(self, polarity, polygons):
+        """
+        Add a run of polygons with the same polarity.
+
+        :param polarity:    'D' for dark, 'C' for clear
+        :param polygons:    list of Shapely geometries
+        :return:            None
+        """
+        if not polygons:
+            return
+
+        if polarity == 'D':
+            self.tiles.extend(self.split_tiles(self.polygon_parts(polygons)))
+            return
+
+        if not self.tiles:
+            # nothing to clear
+            return
+
+        clear = self.polygon_parts(polygons)
+        if clear.size == 0:
+            return
+
+        tiles = np.asarray(self.tiles, dtype=object)
+        clear_idx, tile_idx = STRtree(tiles).query(clear, predicate='intersects')
+        if tile_idx.size == 0:
+            return
+
+        # group the clear polygons by the tile they intersect
+        order = np.argsort(tile_idx, kind='stable')
+        tile_idx = tile_idx[order]
+        clear_idx = clear_idx[order]
+        affected, starts = np.unique(tile_idx, return_index=True)
+        groups = np.split(clear_idx, starts[1:])
+        clear_geo = np.empty(len(affected), dtype=object)
+        for pos, group in enumerate(groups):
+            clear_geo[pos] = clear[group[0]] if len(group) == 1 else unary_union(clear[group])
+
+        cleared = self.split_tiles(self.polygon_parts(list(shply_difference(tiles[affected], clear_geo))))
+
+        untouched = np.ones(len(tiles), dtype=bool)
+        untouched[affected] = False
+        self.tiles = list(tiles[untouched]) + list(cleared)
+
+    def resolve(self):
+        """
+
+        :return:    the union of all the tiles, as a Shapely geometry
+        """
+        if not self.tiles:
+            return Polygon()
+        return union_tiled(self.tiles, pool=self.pool, callback=self.callback)
+
+
 def parse_gerber_number(strnumber, int_digits, frac_digits, zeros):
     """
     Parse a single number of Gerber coordinates.
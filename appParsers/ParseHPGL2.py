@@ -192,6 +192,9 @@ class HPGL2:
         # store the current tool here
         current_tool = None
 
+        # the source lines, joined in self.source_file when the parsing ends
+        source_lines = []
+
         # ### Parsing starts here ## ##
         line_num = 0
         gline = ""
@@ -204,7 +207,7 @@ class HPGL2:
                     raise grace
 
                 line_num += 1
-                self.source_file += gline + '\n'
+                source_lines.append(gline)
 
                 # Cleanup #
                 gline = gline.strip(' \r\n')
@@ -430,6 +433,9 @@ class HPGL2:
 
             loc = '%s #%d %s: %s\n' % (_("HPGL2 Line"), line_num, _("HPGL2 Line Content"), gline) + repr(err)
             self.app.inform.emit('[ERROR] %s\n%s:' % (_("HPGL2 Parser ERROR"), loc))
+        finally:
+            if source_lines:
+                self.source_file += '\n'.join(source_lines) + '\n'
 
 
 def parse_number(strnumber):
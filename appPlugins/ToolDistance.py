@@ -490,7 +490,7 @@ class Distance(AppTool):
                 pos = (clicked_pads[0].x, clicked_pads[0].y)
 
         elif self.original_call_source == 'app':
-            loaded_obj_list = self.app.collection.get_list()
+            loaded_obj_list = self.app.collection.get_list(hydrate=True)
             snapable_obj_list = [o for o in loaded_obj_list if o.kind == 'excellon' or o.kind == 'gerber']
             if not snapable_obj_list:
                 return pos
@@ -548,7 +548,7 @@ class ToolLevelling(AppTool, CNCjob):
 
         fused_geometries = [
             exc_geo
-            for obj_in_collection in self.app.collection.get_list()
+            for obj_in_collection in self.app.collection.get_list(hydrate=True)
             if obj_in_collection.kind == 'excellon' and obj_in_collection.obj_options['plot']
             for exc_geo in MultiPolygon(obj_in_collection.solid_geometry).geoms
             if isinstance(exc_geo, Polygon) and pol.intersects(exc_geo)
@@ -953,7 +953,7 @@ class ToolLevelling(AppTool, CNCjob):
 
             # check if chosen point is within an Excellon drill hole geometry
             if check_for_exc_hole is True:
-                for obj_in_collection in self.app.collection.get_list():
+                for obj_in_collection in self.app.collection.get_list(hydrate=True):
                     if obj_in_collection.kind == 'excellon' and obj_in_collection.obj_options['plot'] is True:
                         exc_solid_geometry = MultiPolygon(obj_in_collection.solid_geometry)
                         for exc_geo in exc_solid_geometry.geoms:
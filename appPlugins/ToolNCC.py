@@ -27,7 +27,7 @@ import appTranslation as fcTranslate
 import builtins
 
 from appParsers.ParseGerber import Gerber
-from camlib import grace, flatten_shapely_geometry
+from camlib import grace, flatten_shapely_geometry, clear_polygons_task
 from matplotlib.backend_bases import KeyEvent as mpl_key_event
 
 fcTranslate.apply_language('strings')
@@ -2236,6 +2236,70 @@ class NonCopperClear(AppTool, Gerber):
             self.app.inform_shell.emit('%s %s' % (_('Polygon could not be cleared. Location:'), str(coords)))
             return None
 
+    def clear_polygons_parallel(self, polygons, tooldia, ncc_method, ncc_overlap, ncc_connect, ncc_contour,
+                                simplify_tol=0.0, run_threaded=True):
+        """
+        Clear a list of polygons in the processes of the App.pool. The polygons are sent in batches and the
+        results are merged in the order of the polygons, so the result does not depend on which process finished first.
+
+        :param polygons:        list of Shapely Polygons to be cleared
+        :param tooldia:         the diameter of the tool used for clearing
+        :param ncc_method:      the clearing method: 0 = standard, 1 = seed, 2 = lines, 3 = combo
+        :param ncc_overlap:     the overlap of the tool passes, as a fraction
+        :param ncc_connect:     if True, connect the toolpaths to minimize the tool lifts
+        :param ncc_contour:     if True, cut around the inside edge of the polygons
+        :param simplify_tol:    if non-zero then simplify the resulting toolpaths
+        :param run_threaded:    if False, process the GUI events while waiting (TclShell usage)
+        :return:                a tuple (list of toolpaths, number of polygons that could not be cleared)
+        :rtype:                 tuple
+        """
+        if not polygons:
+            return [], 0
+
+        # more batches than processes so the progress is reported more often and the load is balanced
+        batches_nr = min(len(polygons), 4 * int(self.app.options["global_process_number"]))
+        batch_size = int(np.ceil(len(polygons) / batches_nr))
+
+        pending = []
+        for start in range(0, len(polygons), batch_size):
+            batch = polygons[start:start + batch_size]
+            res = self.app.pool.apply_async(clear_polygons_task,
+                                            args=(batch, tooldia, ncc_method, self.circle_steps, ncc_overlap,
+                                                  ncc_connect, ncc_contour, simplify_tol))
+            pending.append((batch, res))
+
+        cleared_geo = []
+        poly_failed = 0
+        pol_nr = 0
+        old_disp_number = 0
+        for batch, res in pending:
+            while not res.ready():
+                if self.app.abort_flag:
+                    # graceful abort requested by the user
+                    raise grace
+
+                # provide the app with a way to process the GUI events when in a blocking loop
+                if not run_threaded:
+                    QtWidgets.QApplication.processEvents()
+                res.wait(0.1)
+
+            for pol, pol_geo in zip(batch, res.get()):
+                if pol_geo:
+                    cleared_geo += pol_geo
+                else:
+                    poly_failed += 1
+                    pt = pol.representative_point()
+                    coords = (pt.x, pt.y)
+                    self.app.inform_shell.emit('%s %s' % (_('Polygon could not be cleared. Location:'), str(coords)))
+
+            pol_nr += len(batch)
+            disp_number = int(np.interp(pol_nr, [0, len(polygons)], [0, 100]))
+            if old_disp_number < disp_number <= 100:
+                self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                old_disp_number = disp_number
+
+        return cleared_geo, poly_failed
+
     def ncc_handler(self, ncc_obj, ncctd_list, isotd_list, sel_obj=None, outname=None, order=None,
                     tools_storage=None, run_threaded=True):
         """
@@ -2284,6 +2348,8 @@ class NonCopperClear(AppTool, Gerber):
 
         # determine if to use the progressive plotting
         prog_plot = True if self.app.options["tools_ncc_plotting"] == 'progressive' else False
+        # the progressive plotting is done as the polygons are cleared, therefore only in the serial mode
+        ncc_parallel = self.app.options["tools_ncc_parallel"] and not prog_plot
 
         tools_storage = tools_storage if tools_storage is not None else self.ncc_tools
         sorted_clear_tools = ncctd_list
@@ -2405,56 +2471,79 @@ class NonCopperClear(AppTool, Gerber):
 
                 # ----------------------------------------------------
                 # Copper-clear the Polygons in the non-copper-area
-                # Iterate over them
                 # ----------------------------------------------------
-                pol_nr = 0
-                for p in tool_empty_area:
-                    # provide the app with a way to process the GUI events when in a blocking loop
-                    if not run_threaded:
-                        QtWidgets.QApplication.processEvents()
+                if ncc_parallel:
+                    # the polygons are independent so they are cleared in the processes of the App.pool
+                    clear_list = []
+                    for p in tool_empty_area:
+                        # attempt to fix possible problems with the polygon
+                        p = p.buffer(0.0000001)
+                        for pol in flatten_shapely_geometry(p, simplify_tolerance=simplification_value):
+                            if pol is not None and pol.is_valid and isinstance(pol, Polygon):
+                                clear_list.append(pol)
+                            else:
+                                self.app.log.warning(
+                                    "Expected geo is a Polygon. Instead got a %s" % str(type(pol)))
+
+                    cleared_geo, poly_failed = self.clear_polygons_parallel(clear_list, tooldia=tool,
+                                                                            ncc_method=ncc_method,
+                                                                            ncc_overlap=ncc_overlap,
+                                                                            ncc_connect=ncc_connect,
+                                                                            ncc_contour=ncc_contour,
+                                                                            simplify_tol=simplification_value,
+                                                                            run_threaded=run_threaded)
+                    if poly_failed > 0:
+                        app_obj.poly_not_cleared = True
+                else:
+                    # Iterate over them
+                    pol_nr = 0
+                    for p in tool_empty_area:
+                        # provide the app with a way to process the GUI events when in a blocking loop
+                        if not run_threaded:
+                            QtWidgets.QApplication.processEvents()
 
-                    if self.app.abort_flag:
-                        # graceful abort requested by the user
-                        raise grace
+                        if self.app.abort_flag:
+                            # graceful abort requested by the user
+                            raise grace
 
-                    # ----------------------------------------------------
-                    # attempt to fix possible problems with the polygon
-                    # ----------------------------------------------------
-                    p = p.buffer(0.0000001)
-                    p = flatten_shapely_geometry(p, simplify_tolerance=simplification_value)
+                        # ----------------------------------------------------
+                        # attempt to fix possible problems with the polygon
+                        # ----------------------------------------------------
+                        p = p.buffer(0.0000001)
+                        p = flatten_shapely_geometry(p, simplify_tolerance=simplification_value)
 
-                    poly_failed = 0
-                    for pol in p:
-                        # provide the app with a way to process the GUI events when in a blocking loop
-                        QtWidgets.QApplication.processEvents()
-
-                        if pol is not None and pol.is_valid and isinstance(pol, Polygon):
-                            # ----------------------------------------------------
-                            # This is where copper clearing is happening
-                            # ----------------------------------------------------
-                            res = self.clear_polygon_worker(pol=pol, tooldia=tool,
-                                                            ncc_method=ncc_method,
-                                                            ncc_overlap=ncc_overlap,
-                                                            ncc_connect=ncc_connect,
-                                                            ncc_contour=ncc_contour,
-                                                            simplify_tol=simplification_value,
-                                                            prog_plot=prog_plot)
-                            if res is not None:
-                                cleared_geo += res
+                        poly_failed = 0
+                        for pol in p:
+                            # provide the app with a way to process the GUI events when in a blocking loop
+                            QtWidgets.QApplication.processEvents()
+
+                            if pol is not None and pol.is_valid and isinstance(pol, Polygon):
+                                # ----------------------------------------------------
+                                # This is where copper clearing is happening
+                                # ----------------------------------------------------
+                                res = self.clear_polygon_worker(pol=pol, tooldia=tool,
+                                                                ncc_method=ncc_method,
+                                                                ncc_overlap=ncc_overlap,
+                                                                ncc_connect=ncc_connect,
+                                                                ncc_contour=ncc_contour,
+                                                                simplify_tol=simplification_value,
+                                                                prog_plot=prog_plot)
+                                if res is not None:
+                                    cleared_geo += res
+                                else:
+                                    poly_failed += 1
                             else:
-                                poly_failed += 1
-                        else:
-                            self.app.log.warning(
-                                "Expected geo is a Polygon. Instead got a %s" % str(type(pol)))
+                                self.app.log.warning(
+                                    "Expected geo is a Polygon. Instead got a %s" % str(type(pol)))
 
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                        if old_disp_number < disp_number <= 100:
-                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
+                            pol_nr += 1
+                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
+                            if old_disp_number < disp_number <= 100:
+                                self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                                old_disp_number = disp_number
 
-                    if poly_failed > 0:
-                        app_obj.poly_not_cleared = True
+                        if poly_failed > 0:
+                            app_obj.poly_not_cleared = True
 
                 # ---------------------------------------------------------
                 # Debug message regarding how many points are in the result
@@ -9,13 +9,11 @@ from PyQt6 import QtWidgets, QtCore, QtGui
 from appTool import AppTool
 from appGUI.GUIElements import VerticalScrollArea, FCLabel, FCButton, FCFrame, GLay, FCComboBox, FCCheckBox, \
     FCEntry, FCTextArea, FCSpinner, OptionalHideInputSection
-from camlib import grace, flatten_shapely_geometry
+from camlib import grace, flatten_shapely_geometry, find_nearest_pairs
 
 import logging
-import numpy as np
 
 from shapely import MultiPolygon
-from shapely.ops import nearest_points
 
 import gettext
 import appTranslation as fcTranslate
@@ -33,6 +31,10 @@ class ToolOptimal(AppTool):
     update_text = QtCore.pyqtSignal(list)
     update_sec_distances = QtCore.pyqtSignal(dict)
 
+    # how many of the closest pairs of copper features are searched for; the minimum distance and its Frequency are
+    # always complete but the secondary distances list is capped at about this number of pairs
+    nearest_pairs_nr = 100
+
     def __init__(self, app):
         AppTool.__init__(self, app)
 
@@ -232,7 +234,6 @@ class ToolOptimal(AppTool):
             app_obj.inform.emit(_("Optimal Tool. Started to search for the minimum distance between copper features."))
             try:
                 old_disp_number = 0
-                pol_nr = 0
                 app_obj.proc_container.update_view_text(' %d%%' % 0)
                 total_geo = []
 
@@ -262,42 +263,39 @@ class ToolOptimal(AppTool):
                                           "There are no distances between geometry elements to be found."))
                     return 'fail'
 
-                geo_len = (geo_len * (geo_len - 1)) / 2
-
                 app_obj.inform.emit(
-                    '%s: %s' % (_("Optimal Tool. Finding the distances between each two elements. Iterations"),
+                    '%s: %s' % (_("Optimal Tool. Finding the distances between the nearest elements. Polygons"),
                                 str(geo_len)))
 
+                def progress_callback(disp_number):
+                    nonlocal old_disp_number
+
+                    if app_obj.abort_flag:
+                        # graceful abort requested by the user
+                        raise grace
+
+                    if old_disp_number < disp_number <= 100:
+                        app_obj.proc_container.update_view_text(' %d%%' % disp_number)
+                        old_disp_number = disp_number
+
+                # the distances are rounded to the set decimals so all the pairs that can round to the same value
+                # as the k-th distance are returned, otherwise the Frequency of the minimum distance is undercounted
+                nearest_pairs = find_nearest_pairs(total_geo, k=plugin_instance.nearest_pairs_nr,
+                                                   tolerance=10 ** -plugin_instance.decimals,
+                                                   callback=progress_callback)
+
                 plugin_instance.min_dict = {}
-                idx = 1
-                for geo in total_geo:
-                    for s_geo in total_geo[idx:]:
-                        if app_obj.abort_flag:
-                            # graceful abort requested by the user
-                            raise grace
-
-                        # minimize the number of distances by not taking into considerations those that are too small
-                        dist = geo.distance(s_geo)
-                        dist = app_obj.dec_format(dist, plugin_instance.decimals)
-                        loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                        proc_loc = (
-                            (app_obj.dec_format(loc_1.x, self.decimals), app_obj.dec_format(loc_1.y, self.decimals)),
-                            (app_obj.dec_format(loc_2.x, self.decimals), app_obj.dec_format(loc_2.y, self.decimals))
-                        )
-
-                        if dist in plugin_instance.min_dict:
-                            plugin_instance.min_dict[dist].append(proc_loc)
-                        else:
-                            plugin_instance.min_dict[dist] = [proc_loc]
-
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-
-                        if old_disp_number < disp_number <= 100:
-                            app_obj.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
-                    idx += 1
+                for dist, loc_1, loc_2 in nearest_pairs:
+                    dist = app_obj.dec_format(dist, plugin_instance.decimals)
+                    proc_loc = (
+                        (app_obj.dec_format(loc_1[0], self.decimals), app_obj.dec_format(loc_1[1], self.decimals)),
+                        (app_obj.dec_format(loc_2[0], self.decimals), app_obj.dec_format(loc_2[1], self.decimals))
+                    )
+
+                    if dist in plugin_instance.min_dict:
+                        plugin_instance.min_dict[dist].append(proc_loc)
+                    else:
+                        plugin_instance.min_dict[dist] = [proc_loc]
 
                 app_obj.inform.emit(_("Optimal Tool. Finding the minimum distance."))
 
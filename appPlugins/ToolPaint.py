@@ -31,7 +31,8 @@ import appTranslation as fcTranslate
 import builtins
 
 from appParsers.ParseGerber import Gerber
-from camlib import Geometry, AppRTreeStorage, grace, flatten_shapely_geometry
+from camlib import Geometry, AppRTreeStorage, grace, flatten_shapely_geometry, clear_polygons_task, \
+    coords_to_paths
 
 fcTranslate.apply_language('strings')
 if '_' not in builtins.__dict__:
@@ -1850,6 +1851,66 @@ class ToolPaint(AppTool, Gerber):
             self.app.inform.emit('[ERROR_NOTCL] %s' % _('Geometry could not be painted completely'))
             return None
 
+    def paint_polygons_parallel(self, polygons, tooldiameter, paint_method, over, conn, cont, simplify_tol=0.0,
+                                progress_callback=None):
+        """
+        Paint a list of polygons in the processes of the App.pool. The processes do not use the GUI and return the
+        toolpaths as coordinate arrays; the results are returned in the order of the polygons.
+        The 'Laser_lines' method is not supported.
+
+        :param polygons:            list of Shapely Polygons to be painted
+        :param tooldiameter:        the diameter of the painting tool
+        :param paint_method:        the paint method: 0 = Standard, 1 = Seed, 2 = Lines, 4 = Combo
+        :param over:                the overlap of the tool passes, as a fraction
+        :param conn:                if True, connect the toolpaths to minimize the tool lifts
+        :param cont:                if True, paint around the edges of the polygons
+        :param simplify_tol:        if non-zero then simplify the resulting toolpaths
+        :param progress_callback:   function called with the number of polygons painted so far
+        :return:                    a list with the toolpaths (list of LineStrings) of each polygon; empty list for
+                                    the polygons that could not be painted
+        :rtype:                     list
+        """
+        if not polygons:
+            return []
+
+        # the 'Combo' method has the index 3 in the camlib clearing functions
+        task_method = 3 if int(paint_method) == 4 else int(paint_method)
+
+        # more batches than processes so the progress is reported more often and the load is balanced
+        batches_nr = min(len(polygons), 4 * int(self.app.options["global_process_number"]))
+        batch_size = int(np.ceil(len(polygons) / batches_nr))
+
+        pending = []
+        for start in range(0, len(polygons), batch_size):
+            batch = polygons[start:start + batch_size]
+            res = self.app.pool.apply_async(clear_polygons_task,
+                                            args=(batch, tooldiameter, task_method, self.circle_steps, over, conn,
+                                                  cont, simplify_tol, True))
+            pending.append((batch, res))
+
+        painted = []
+        failed = 0
+        for batch, res in pending:
+            while not res.ready():
+                if self.app.abort_flag:
+                    # graceful abort requested by the user
+                    raise grace
+                res.wait(0.1)
+
+            for pol_res in res.get():
+                if pol_res is None:
+                    failed += 1
+                    painted.append([])
+                else:
+                    painted.append(coords_to_paths(*pol_res))
+
+            if progress_callback is not None:
+                progress_callback(len(painted))
+
+        if failed:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _('Geometry could not be painted completely'))
+        return painted
+
     def paint_geo(self, obj, geometry, tooldia=None, order=None, method=None, outname=None,
                   tools_storage=None, plot=True, rest=None, run_threaded=True):
         """
@@ -1882,6 +1943,10 @@ class ToolPaint(AppTool, Gerber):
         # TODO this should be in preferences and in the UI
         simplification_value = 0.01
 
+        # the polygons are painted in the processes of the App.pool except when the progressive plotting is used
+        # (it needs the GUI) or the 'Laser_lines' method is used (it needs the source object)
+        paint_parallel = self.app.options["tools_paint_parallel"] and not prog_plot and int(paint_method) != 3
+
         sorted_tools = []
         if tooldia is not None:
             try:
@@ -1971,26 +2036,43 @@ class ToolPaint(AppTool, Gerber):
                 # -----------------------------
                 try:
                     cp_list = []
-                    for pp in poly_buf:
-                        # provide the app with a way to process the GUI events when in a blocking loop
-                        QtWidgets.QApplication.processEvents()
-                        if self.app.abort_flag:
-                            # graceful abort requested by the user
-                            raise grace
-                        geo_res = self.paint_polygon_worker(pp, tooldiameter=tool_dia, over=over, conn=conn,
-                                                            cont=cont, paint_method=paint_method, obj=obj,
-                                                            prog_plot=prog_plot)
-                        if geo_res:
-                            cp_list.append(geo_res)
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                        # log.debug("Polygons cleared: %d" % pol_nr)
-
-                        if old_disp_number < disp_number <= 100:
-                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
-
                     total_geometry = []
+                    if paint_parallel:
+                        def show_progress(painted_nr):
+                            nonlocal old_disp_number
+
+                            disp_nr = int(np.interp(painted_nr, [0, geo_len], [0, 100]))
+                            if old_disp_number < disp_nr <= 100:
+                                self.app.proc_container.update_view_text(' %d%%' % disp_nr)
+                                old_disp_number = disp_nr
+
+                        # the toolpaths are already simplified in the worker processes
+                        for pol_paths in self.paint_polygons_parallel(poly_buf, tooldiameter=tool_dia,
+                                                                      paint_method=paint_method, over=over,
+                                                                      conn=conn, cont=cont,
+                                                                      simplify_tol=simplification_value,
+                                                                      progress_callback=show_progress):
+                            total_geometry += pol_paths
+                    else:
+                        for pp in poly_buf:
+                            # provide the app with a way to process the GUI events when in a blocking loop
+                            QtWidgets.QApplication.processEvents()
+                            if self.app.abort_flag:
+                                # graceful abort requested by the user
+                                raise grace
+                            geo_res = self.paint_polygon_worker(pp, tooldiameter=tool_dia, over=over, conn=conn,
+                                                                cont=cont, paint_method=paint_method, obj=obj,
+                                                                prog_plot=prog_plot)
+                            if geo_res:
+                                cp_list.append(geo_res)
+                            pol_nr += 1
+                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
+                            # log.debug("Polygons cleared: %d" % pol_nr)
+
+                            if old_disp_number < disp_number <= 100:
+                                self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                                old_disp_number = disp_number
+
                     if cp_list:
                         for cp in cp_list:
                             if simplification_value > 0.0:
@@ -1998,8 +2080,8 @@ class ToolPaint(AppTool, Gerber):
                             else:
                                 total_geometry += [x for x in cp.get_objects()]
 
-                        # clean the geometry
-                        total_geometry = [g for g in total_geometry if g and not g.is_empty]
+                    # clean the geometry
+                    total_geometry = [g for g in total_geometry if g and not g.is_empty]
                 except grace:
                     return "fail"
                 except Exception as e:
@@ -2136,50 +2218,74 @@ class ToolPaint(AppTool, Gerber):
                 # -----------------------------
                 # effective polygon clearing job
                 # -----------------------------
+                def add_rest_geometry(painted_pol, painted_geo):
+                    # See if the polygon was completely cleared
+                    pp_cleared = unary_union(painted_geo).buffer(tool_dia / 2.0)
+                    rest_geo = painted_pol.difference(pp_cleared)
+                    if rest_geo:
+                        rest_geo = flatten_shapely_geometry(rest_geo)
+                        for r in rest_geo:
+                            if r.is_valid and not r.is_empty:
+                                rest_list.append(r)
+
+                def show_progress(painted_nr):
+                    nonlocal old_disp_number
+
+                    disp_nr = int(np.interp(painted_nr, [0, geo_len], [0, 100]))
+                    if old_disp_number < disp_nr <= 100:
+                        self.app.proc_container.update_view_text(' %d%%' % disp_nr)
+                        old_disp_number = disp_nr
+
                 try:
                     cleared_geo = []
-                    for pp in poly_buf:
-                        # provide the app with a way to process the GUI events when in a blocking loop
-                        QtWidgets.QApplication.processEvents()
-                        if self.app.abort_flag:
-                            # graceful abort requested by the user
-                            raise grace
-
+                    if paint_parallel:
                         # speedup the clearing by not trying to clear polygons that is clear they can't be
                         # cleared with the current tool. this tremendously reduce the clearing time
-                        check_dist = -tool_dia / 2.0
-                        check_buff = pp.buffer(check_dist)
-                        if not check_buff or check_buff.is_empty:
-                            continue
+                        paint_list = []
+                        for pp in poly_buf:
+                            check_buff = pp.buffer(-tool_dia / 2.0)
+                            if check_buff and not check_buff.is_empty:
+                                paint_list.append(pp)
+
+                        # the toolpaths are already simplified in the worker processes
+                        painted = self.paint_polygons_parallel(paint_list, tooldiameter=tool_dia,
+                                                               paint_method=paint_method, over=over, conn=conn,
+                                                               cont=cont, simplify_tol=simplification_value,
+                                                               progress_callback=show_progress)
+                        for pp, geo_elems in zip(paint_list, painted):
+                            add_rest_geometry(pp, geo_elems)
+                            cleared_geo += geo_elems
+                    else:
+                        for pp in poly_buf:
+                            # provide the app with a way to process the GUI events when in a blocking loop
+                            QtWidgets.QApplication.processEvents()
+                            if self.app.abort_flag:
+                                # graceful abort requested by the user
+                                raise grace
+
+                            # speedup the clearing by not trying to clear polygons that is clear they can't be
+                            # cleared with the current tool. this tremendously reduce the clearing time
+                            check_dist = -tool_dia / 2.0
+                            check_buff = pp.buffer(check_dist)
+                            if not check_buff or check_buff.is_empty:
+                                continue
+
+                            geo_res = self.paint_polygon_worker(pp, tooldiameter=tool_dia, over=over, conn=conn,
+                                                                cont=cont, paint_method=paint_method, obj=obj,
+                                                                prog_plot=prog_plot)
 
-                        geo_res = self.paint_polygon_worker(pp, tooldiameter=tool_dia, over=over, conn=conn,
-                                                            cont=cont, paint_method=paint_method, obj=obj,
-                                                            prog_plot=prog_plot)
+                            if simplification_value > 0.0:
+                                geo_elems = [x.simplify(simplification_value) for x in geo_res.get_objects()]
+                            else:
+                                geo_elems = [x for x in geo_res.get_objects()]
 
-                        if simplification_value > 0.0:
-                            geo_elems = [x.simplify(simplification_value) for x in geo_res.get_objects()]
-                        else:
-                            geo_elems = [x for x in geo_res.get_objects()]
-
-                        # See if the polygon was completely cleared
-                        pp_cleared = unary_union(geo_elems).buffer(tool_dia / 2.0)
-                        rest_geo = pp.difference(pp_cleared)
-                        if rest_geo:
-                            rest_geo = flatten_shapely_geometry(rest_geo)
-                            for r in rest_geo:
-                                if r.is_valid and not r.is_empty:
-                                    rest_list.append(r)
-
-                        if geo_res:
-                            cleared_geo += geo_elems
+                            add_rest_geometry(pp, geo_elems)
 
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                        # log.debug("Polygons cleared: %d" % pol_nr)
+                            if geo_res:
+                                cleared_geo += geo_elems
 
-                        if old_disp_number < disp_number <= 100:
-                            self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
+                            pol_nr += 1
+                            show_progress(pol_nr)
                 except grace:
                     return "fail"
                 except Exception as e:
@@ -10,12 +10,12 @@ from appTool import AppTool
 from appGUI.GUIElements import VerticalScrollArea, FCLabel, FCButton, FCFrame, GLay, FCComboBox, FCCheckBox, \
     FCDoubleSpinner, OptionalInputSection
 from appObjects import GerberObject
+from camlib import find_clearance_violations, flatten_shapely_geometry
 
 import logging
 from copy import deepcopy
 
 from shapely import Polygon, MultiPolygon
-from shapely.ops import nearest_points
 
 import gettext
 import appTranslation as fcTranslate
@@ -228,33 +228,11 @@ class RulesCheck(AppTool):
         if isinstance(total_geo, Polygon):
             obj_violations['points'] = ['Failed. Only one polygon.']
             return rule_title, [obj_violations]
-        else:
-            iterations = len(total_geo)
-            iterations = (iterations * (iterations - 1)) / 2
-        # log.debug("RulesCheck.check_gerber_clearance(). Iterations: %s" % str(iterations))
-
-        min_dict = {}
-        idx = 1
-        for geo in total_geo:
-            for s_geo in total_geo[idx:]:
-                # minimize the number of distances by not taking into considerations those that are too small
-                dist = geo.distance(s_geo)
-                if float(dist) < float(size):
-                    loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                    dx = loc_1.x - loc_2.x
-                    dy = loc_1.y - loc_2.y
-                    loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
-
-                    if dist in min_dict:
-                        min_dict[dist].append(loc)
-                    else:
-                        min_dict[dist] = [loc]
-            idx += 1
+        total_geo = flatten_shapely_geometry(total_geo)
+
         points_list = set()
-        for dist in min_dict.keys():
-            for location in min_dict[dist]:
-                points_list.add(location)
+        for __, __, __, location in find_clearance_violations(total_geo, size):
+            points_list.add(location)
 
         obj_violations['points'] = list(points_list)
         violations.append(deepcopy(obj_violations))
@@ -317,42 +295,12 @@ class RulesCheck(AppTool):
         total_geo_grb_3 = MultiPolygon(total_geo_grb_3)
         total_geo_grb_3 = total_geo_grb_3.buffer(0)
 
-        if isinstance(total_geo_grb_1, Polygon):
-            len_1 = 1
-            total_geo_grb_1 = [total_geo_grb_1]
-        else:
-            len_1 = len(total_geo_grb_1)
-
-        if isinstance(total_geo_grb_3, Polygon):
-            len_3 = 1
-            total_geo_grb_3 = [total_geo_grb_3]
-        else:
-            len_3 = len(total_geo_grb_3)
-
-        iterations = len_1 * len_3
-        # log.debug("RulesCheck.check_gerber_clearance(). Iterations: %s" % str(iterations))
-
-        min_dict = {}
-        for geo in total_geo_grb_1:
-            for s_geo in total_geo_grb_3:
-                # minimize the number of distances by not taking into considerations those that are too small
-                dist = geo.distance(s_geo)
-                if float(dist) < float(size):
-                    loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                    dx = loc_1.x - loc_2.x
-                    dy = loc_1.y - loc_2.y
-                    loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
-
-                    if dist in min_dict:
-                        min_dict[dist].append(loc)
-                    else:
-                        min_dict[dist] = [loc]
+        total_geo_grb_1 = flatten_shapely_geometry(total_geo_grb_1)
+        total_geo_grb_3 = flatten_shapely_geometry(total_geo_grb_3)
 
         points_list = set()
-        for dist in min_dict.keys():
-            for location in min_dict[dist]:
-                points_list.add(location)
+        for __, __, __, location in find_clearance_violations(total_geo_grb_1, size, total_geo_grb_3):
+            points_list.add(location)
 
         name_list = []
         if gerber_1:
@@ -415,30 +363,9 @@ class RulesCheck(AppTool):
                     for geo in geometry:
                         total_geo.append(geo)
 
-        min_dict = {}
-        idx = 1
-        for geo in total_geo:
-            for s_geo in total_geo[idx:]:
-
-                # minimize the number of distances by not taking into considerations those that are too small
-                dist = geo.distance(s_geo)
-                loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                dx = loc_1.x - loc_2.x
-                dy = loc_1.y - loc_2.y
-                loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
-
-                if dist in min_dict:
-                    min_dict[dist].append(loc)
-                else:
-                    min_dict[dist] = [loc]
-            idx += 1
-
         points_list = set()
-        for dist in min_dict.keys():
-            if float(dist) < size:
-                for location in min_dict[dist]:
-                    points_list.add(location)
+        for __, __, __, location in find_clearance_violations(total_geo, size):
+            points_list.add(location)
 
         name_list = []
         for elem in elements:
@@ -569,54 +496,17 @@ class RulesCheck(AppTool):
                     for geo in geometry:
                         total_geo_exc.append(geo)
 
-        if isinstance(total_geo_grb, Polygon):
-            len_1 = 1
-            total_geo_grb = [total_geo_grb]
-        else:
-            len_1 = len(total_geo_grb)
-
-        if isinstance(total_geo_exc, Polygon):
-            len_2 = 1
-            total_geo_exc = [total_geo_exc]
-        else:
-            len_2 = len(total_geo_exc)
-
-        iterations = len_1 * len_2
-        # log.debug("RulesCheck.check_gerber_annular_ring(). Iterations: %s" % str(iterations))
-
-        min_dict = {}
-        dist = None
-        for geo in total_geo_grb:
-            for s_geo in total_geo_exc:
-                try:
-                    # minimize the number of distances by not taking into considerations those that are too small
-                    dist = abs(geo.exterior.distance(s_geo))
-                except Exception:
-                    # log.error("RulesCheck.check_gerber_annular_ring() --> %s" % str(e))
-                    pass
-
-                if dist > 0:
-                    if float(dist) < float(size):
-                        loc_1, loc_2 = nearest_points(geo.exterior, s_geo)
-
-                        dx = loc_1.x - loc_2.x
-                        dy = loc_1.y - loc_2.y
-                        loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
-
-                        if dist in min_dict:
-                            min_dict[dist].append(loc)
-                        else:
-                            min_dict[dist] = [loc]
-                else:
-                    if dist in min_dict:
-                        min_dict[dist].append(s_geo.representative_point())
-                    else:
-                        min_dict[dist] = [s_geo.representative_point()]
+        total_geo_grb = flatten_shapely_geometry(total_geo_grb)
+        grb_exteriors = [geo.exterior for geo in total_geo_grb if isinstance(geo, Polygon)]
 
         points_list = []
-        for dist in min_dict.keys():
-            for location in min_dict[dist]:
+        for __, exc_idx, dist, location in find_clearance_violations(grb_exteriors, size, total_geo_exc):
+            if dist > 0:
                 points_list.append(location)
+            else:
+                # the hole is cutting the pad edge
+                rep_pt = total_geo_exc[exc_idx].representative_point()
+                points_list.append((rep_pt.x, rep_pt.y))
 
         name_list = []
         try:
@@ -25,7 +25,7 @@ import builtins
 
 from appCommon.Common import LoudDict
 
-from camlib import distance
+from camlib import distance, toolpath_geometries
 from appEditors.AppTextEditor import AppTextEditor
 
 from io import StringIO
@@ -1076,7 +1076,7 @@ class SolderPaste(AppTool):
                 tool_cnc_dict['gcode_parsed'] = new_obj.gcode_parse(tool_data=tool_cnc_dict['data'])
 
                 # TODO this serve for bounding box creation only; should be optimized. Using recursive bounds()?
-                tool_cnc_dict['solid_geometry'] = unary_union([geo['geom'] for geo in tool_cnc_dict['gcode_parsed']])
+                tool_cnc_dict['solid_geometry'] = unary_union(toolpath_geometries(tool_cnc_dict['gcode_parsed']))
 
                 # tell gcode_parse from which point to start drawing the lines depending on what kind of
                 # object is the source of gcode
@@ -10,6 +10,8 @@ from importlib.machinery import SourceFileLoader
 import os
 from abc import ABCMeta, abstractmethod
 
+import numpy as np
+
 # module-root dictionary of preprocessors
 
 import logging
@@ -74,6 +76,54 @@ class PreProc(object, metaclass=ABCPreProcRegister):
     def spindle_stop_code(self, p):
         pass
 
+    def linear_block(self, coords, p):
+        """
+        Optional fast path of linear_code(): the linear moves to all the vertices of a path, formatted at once.
+        The preprocessors that do not implement it return None and then linear_code() is used for each vertex.
+
+        :param coords:  numpy array (n, 2) with the X, Y coordinates of the vertices
+        :param p:       the parameters, like for linear_code()
+        :return:        the G-code lines, each one ending with a new line; None if not implemented
+        """
+        return None
+
+    def position_block(self, owner, prefix, suffix, coords, p):
+        """
+        Formats the lines ``prefix + position_code(p) + suffix`` for all the vertices in coords with one string
+        formatting operation. The bed offset and skew of position_code() are applied on the coordinates arrays.
+
+        :param owner:   the preprocessor class implementing linear_block(); when the class of this preprocessor is
+                        derived from it and redefines linear_code() or position_code(), None is returned so that
+                        linear_code() is used for each vertex
+        :param prefix:  the text before the coordinates, like 'G01 '
+        :param suffix:  the text after the coordinates, the same for all the lines
+        :param coords:  numpy array (n, 2) with the X, Y coordinates of the vertices
+        :param p:       the parameters, like for position_code()
+        :return:        the G-code lines, each one ending with a new line; or None
+        """
+        if type(self).linear_code is not owner.linear_code or type(self).position_code is not owner.position_code:
+            return None
+
+        x = coords[:, 0]
+        y = coords[:, 1]
+        if p._bed_skew_x == 0:
+            x_pos = x + p._bed_offset_x
+        else:
+            x_pos = (x + p._bed_offset_x) + ((y / p._bed_limit_y) * p._bed_skew_x)
+
+        if p._bed_skew_y == 0:
+            y_pos = y + p._bed_offset_y
+        else:
+            y_pos = (y + p._bed_offset_y) + ((x / p._bed_limit_x) * p._bed_skew_y)
+
+        values = np.empty(2 * len(coords))
+        values[0::2] = x_pos
+        values[1::2] = y_pos
+
+        coord_format = self.coordinate_format.replace('*', str(int(p.coords_decimals)))
+        line = prefix.replace('%', '%%') + 'X' + coord_format + ' Y' + coord_format + suffix.replace('%', '%%') + '\n'
+        return (line * len(coords)) % tuple(values.tolist())
+
 
 class AppPreProcTools(object, metaclass=ABCPreProcRegister):
     @abstractmethod
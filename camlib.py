@@ -31,6 +31,7 @@ from io import StringIO
 import ezdxf
 
 import math
+import base64
 
 # See: http://toblerity.org/shapely/manual.html
 from shapely import Polygon, Point, LinearRing, MultiPoint, MultiLineString, MultiPolygon, LineString
@@ -103,6 +104,15 @@ class ApertureMacro:
     am_comm_re = re.compile(r'^0(.*)')
     am_prim_re = re.compile(r'^[1-9].*')
     am_var_re = re.compile(r'^\$([0-9a-zA-z]+)=(.*)')
+    am_ref_re = re.compile(r'\$([0-9]+)')
+    am_expr_re = re.compile(r'^[0-9.+\-*/xX() ]*$')
+
+    # The compiled macros (see compile()) and the geometry made for each set of modifiers (see make_geometry()),
+    # keyed by the macro content. They are shared by all the macros of the session, so a macro used by many Gerber
+    # objects (or defined again in each file by the same CAD program) is compiled and evaluated only once.
+    compiled_cache = {}
+    geometry_cache = {}
+    geometry_cache_size = 10000
 
     def __init__(self, name=None):
         self.name = name
@@ -208,6 +218,88 @@ class ApertureMacro:
 
             log.warning("Unknown syntax of aperture macro part: %s" % str(part))
 
+    @staticmethod
+    def compile_expression(expressions):
+        """
+        Compiles a list of arithmetic expressions of the macro into a function that takes the dictionary of the
+        variables values and returns the list of the expressions values. The variables that are not defined are 0,
+        like in parse_content().
+
+        :param expressions: list of strings, each one an arithmetic expression with $n variables
+        :type expressions:  list
+        :return:            function
+        """
+        py_expressions = []
+        for expr in expressions:
+            # only numbers, variables and the arithmetic operators are allowed
+            if not ApertureMacro.am_expr_re.match(ApertureMacro.am_ref_re.sub('', expr)):
+                raise ValueError("Unknown syntax of aperture macro expression: %s" % str(expr))
+            # Sometimes the 'X' char is used instead of * for multiplication
+            expr = re.sub(r'[xX]', "*", expr)
+            py_expressions.append(ApertureMacro.am_ref_re.sub(lambda m: "v.get('%s', 0)" % m.group(1), expr))
+
+        return eval("lambda v: [%s]" % ", ".join(py_expressions), {'__builtins__': {}})
+
+    def compile(self):
+        """
+        Compiles the macro content (in ``self.raw``) into a program, once for each macro content in the session.
+        The program is a list of steps (variable name, function) for the variable definitions and
+        (None, function) for the primitives, the function being made by compile_expression().
+
+        :return:    The program, or None if the macro can not be compiled (then parse_content() is used)
+        :rtype:     list
+        """
+        raw = self.raw.replace('\n', '').replace('\r', '').strip(" *")
+        try:
+            return ApertureMacro.compiled_cache[raw]
+        except KeyError:
+            pass
+
+        program = []
+        try:
+            for part in raw.split('*'):
+                # ## Comments. Ignored.
+                if ApertureMacro.am_comm_re.search(part):
+                    continue
+
+                # ## Variables
+                match = ApertureMacro.am_var_re.search(part)
+                if match:
+                    program.append((match.group(1), ApertureMacro.compile_expression([match.group(2)])))
+                    continue
+
+                # ## Primitives
+                if ApertureMacro.am_prim_re.search(part):
+                    program.append((None, ApertureMacro.compile_expression(part.split(","))))
+                    continue
+
+                log.warning("Unknown syntax of aperture macro part: %s" % str(part))
+        except (ValueError, SyntaxError) as err:
+            log.debug("ApertureMacro.compile() --> %s. The macro %s is parsed for each aperture." % (err, self.name))
+            program = None
+
+        ApertureMacro.compiled_cache[raw] = program
+        return program
+
+    @staticmethod
+    def run_program(program, modifiers):
+        """
+        Evaluates a compiled macro for the given modifiers.
+
+        :param program:     as returned by compile()
+        :param modifiers:   the modifiers, as floats
+        :return:            numerical lists for all the primitives, like ``self.primitives``
+        :rtype:             list
+        """
+        variables = {str(i + 1): mod for i, mod in enumerate(modifiers)}
+        primitives = []
+        for var, func in program:
+            if var is None:
+                primitives.append(func(variables))
+            else:
+                variables[var] = func(variables)[0]
+        return primitives
+
     def append(self, data):
         """
         Appends a string to the raw macro.
@@ -475,7 +567,9 @@ class ApertureMacro:
     def make_geometry(self, modifiers: list):
         """
         Runs the macro for the given modifiers and generates
-        the corresponding geometry.
+        the corresponding geometry. The macro is compiled once and the
+        geometry is made once for each set of modifiers, then it is
+        taken from ApertureMacro.geometry_cache.
 
         :param modifiers: Modifiers (parameters) for this macro
         :type modifiers: list
@@ -483,6 +577,43 @@ class ApertureMacro:
         :rtype: shapely.geometry.polygon
         """
 
+        modifiers = tuple(float(m) for m in modifiers or [])
+        program = self.compile()
+
+        key = (self.raw.replace('\n', '').replace('\r', '').strip(" *"), modifiers)
+        try:
+            self.geometry = ApertureMacro.geometry_cache[key]
+            return self.geometry
+        except KeyError:
+            pass
+
+        if program is None:
+            # ## Store modifiers as local variables
+            self.loc_vars = {}
+            for i in range(0, len(modifiers)):
+                self.loc_vars[str(i + 1)] = modifiers[i]
+
+            # ## Parse
+            self.primitives = []  # Cleanup
+            self.parse_content()
+        else:
+            self.primitives = self.run_program(program, modifiers)
+
+        self.geometry = self.make_primitives_geometry()
+
+        if len(ApertureMacro.geometry_cache) >= ApertureMacro.geometry_cache_size:
+            ApertureMacro.geometry_cache.clear()
+        ApertureMacro.geometry_cache[key] = self.geometry
+        return self.geometry
+
+    def make_primitives_geometry(self):
+        """
+        Generates the geometry of the primitives in ``self.primitives``.
+
+        :return: Shapely geometry
+        :rtype: shapely.geometry.polygon
+        """
+
         # ## Primitive makers
         makers = {
             "1": ApertureMacro.make_circle,
@@ -496,17 +627,7 @@ class ApertureMacro:
             "7": ApertureMacro.make_thermal
         }
 
-        # ## Store modifiers as local variables
-        modifiers = modifiers or []
-        modifiers = [float(m) for m in modifiers]
-        self.loc_vars = {}
-        for i in range(0, len(modifiers)):
-            self.loc_vars[str(i + 1)] = modifiers[i]
-
-        # ## Parse
-        self.primitives = []  # Cleanup
         self.geometry = Polygon()
-        self.parse_content()
 
         # ## Make the geometry
         for primitive in self.primitives:
@@ -1122,42 +1243,52 @@ class Geometry(object):
             # graceful abort requested by the user
             raise grace
 
-        geo_iso = []
-
         if geometry:
             working_geo = geometry
         else:
             working_geo = self.solid_geometry
 
         working_geo_shp = flatten_shapely_geometry(working_geo)
-        geo_len = len(working_geo_shp)
 
         old_disp_number = 0
-        pol_nr = 0
-        # yet, it can be done by issuing an unary_union in the end, thus getting rid of the overlapping geo
-        for pol in working_geo_shp:
+
+        def progress_callback(disp_number):
+            nonlocal old_disp_number
+
             if self.app.abort_flag:
                 # graceful abort requested by the user
                 raise grace
-            if offset == 0:
-                temp_geo = pol
-            else:
-                corner_type = 1 if corner is None else corner
-                temp_geo = pol.buffer(offset, int(self.geo_steps_per_circle), join_style=corner_type)
-
-            geo_iso.append(temp_geo)
-
-            pol_nr += 1
 
             # activity view update
-            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
             if old_disp_number < disp_number <= 100:
                 self.app.proc_container.update_view_text(' %s %d: %d%%' %
                                                          (_("Pass"), int(passes + 1), int(disp_number)))
                 old_disp_number = disp_number
 
+        # the geometry is buffered in batches, with one vectorized call for each batch
+        if offset == 0:
+            geo_iso = working_geo_shp
+        else:
+            corner_type = 1 if corner is None else corner
+            geo_iso = buffer_geometry_batched(working_geo_shp, offset, quad_segs=int(self.geo_steps_per_circle),
+                                              join_style=corner_type, callback=progress_callback)
+
+        # the overlapping geometry is removed by doing the union of the buffered geometry, in chunks
         self.app.proc_container.update_view_text(' %s' % _("Buffering"))
-        geo_iso = unary_union(geo_iso)
+        old_disp_number = 0
+
+        def union_callback(disp_number):
+            nonlocal old_disp_number
+
+            if self.app.abort_flag:
+                # graceful abort requested by the user
+                raise grace
+
+            if old_disp_number < disp_number <= 100:
+                self.app.proc_container.update_view_text(' %s: %d%%' % (_("Buffering"), int(disp_number)))
+                old_disp_number = disp_number
+
+        geo_iso = union_cascaded(geo_iso, callback=union_callback)
 
         self.app.proc_container.update_view_text('')
         # end of replaced block
@@ -1426,83 +1557,9 @@ class Geometry(object):
 
         # log.debug("camlib.clear_polygon_shrink()")
 
-        # The toolpaths
-        # Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        geoms = AppRTreeStorage()
-        geoms.get_points = get_pts
-
-        # Can only result in a Polygon or MultiPolygon
-        # NOTE: The resulting polygon can be "empty".
-        current = polygon.buffer((-tooldia / 2), int(steps_per_circle))
-        current = flatten_shapely_geometry(current)
-
-        for p in current:
-            geoms.insert(p.exterior)
-            for i in p.interiors:
-                geoms.insert(i)
-
-        for cl_pol in current:
-            while True:
-                if self.app.abort_flag:
-                    # graceful abort requested by the user
-                    raise grace
-                # provide the app with a way to process the GUI events when in a blocking loop
-                QtWidgets.QApplication.processEvents()
-
-                cl_pol = cl_pol.buffer(-tooldia * (1 - overlap), int(steps_per_circle))
-                cl_pol_list = flatten_shapely_geometry(cl_pol)
-
-                added_flag = False
-                for tiny_pol in cl_pol_list:
-                    if tiny_pol.area > 0:
-                        added_flag = True
-                        geoms.insert(tiny_pol.exterior)
-                        if prog_plot:
-                            self.plot_temp_shapes(tiny_pol.exterior)
-
-                        for i in tiny_pol.interiors:
-                            geoms.insert(i)
-                            if prog_plot:
-                                self.plot_temp_shapes(i)
-                if added_flag is False:
-                    break
-
-                cl_pol = unary_union(cl_pol_list)
-
-                # if isinstance(cl_pol, MultiPolygon):
-                #     cl_pol = flatten_shapely_geometry(cl_pol)
-                #
-                #     added_flag = False
-                #     for tiny_pol in cl_pol:
-                #         if tiny_pol.area > 0:
-                #             added_flag = True
-                #             geoms.insert(tiny_pol.exterior)
-                #             if prog_plot:
-                #                 self.plot_temp_shapes(tiny_pol.exterior)
-                #
-                #             for i in tiny_pol.interiors:
-                #                 geoms.insert(i)
-                #                 if prog_plot:
-                #                     self.plot_temp_shapes(i)
-                #     if added_flag is False:
-                #         break
-                #
-                #     cl_pol = MultiPolygon(cl_pol)
-                # else:
-                #     if cl_pol.area > 0:
-                #         geoms.insert(cl_pol.exterior)
-                #         if prog_plot:
-                #             self.plot_temp_shapes(cl_pol.exterior)
-                #
-                #         for i in cl_pol.interiors:
-                #             geoms.insert(i)
-                #             if prog_plot:
-                #                 self.plot_temp_shapes(i)
-                #     else:
-                #         break
+        geoms = clear_polygon_shrink_paths(polygon, tooldia, steps_per_circle, overlap=overlap,
+                                           loop_callback=self.check_abort_in_loop,
+                                           plot_callback=self.plot_temp_shapes if prog_plot else None)
 
         if not geoms.objects:
             self.app.log.debug("camlib.Geometry.clear_polygon_shrink() --> Current Area is zero")
@@ -1545,77 +1602,13 @@ class Geometry(object):
 
         # log.debug("camlib.clear_polygon_seed()")
 
-        # Current buffer radius
-        radius = tooldia / 2 * (1 - overlap)
-
-        # ## The toolpaths
-        # Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        geom_elems = AppRTreeStorage()
-        geom_elems.get_points = get_pts
-
-        # Path margin
-        path_margin = polygon_to_clear.buffer(-tooldia / 2, int(steps_per_circle))
-        path_margin = flatten_shapely_geometry(path_margin, simplify_tolerance=simplify_tol)
-        path_margin = MultiPolygon(path_margin)
-
-        if path_margin.is_empty or path_margin is None:
+        geom_elems = clear_polygon_seed_paths(polygon_to_clear, tooldia, steps_per_circle, seedpoint=seedpoint,
+                                              overlap=overlap, contour=contour, simplify_tol=simplify_tol,
+                                              loop_callback=self.check_abort_in_loop,
+                                              plot_callback=self.plot_temp_shapes_redraw if prog_plot else None)
+        if geom_elems is None:
             return None
 
-        # Estimate good seedpoint if not provided.
-        if seedpoint is None:
-            seedpoint = path_margin.representative_point()
-
-        # Grow from seed until outside the box. The polygons will
-        # never have an interior, so take the exterior LinearRing.
-        while True:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
-
-            # provide the app with a way to process the GUI events when in a blocking loop
-            QtWidgets.QApplication.processEvents()
-
-            path = Point(seedpoint).buffer(radius, int(steps_per_circle)).exterior
-            path = path.simplify(simplify_tol)
-            path = path.intersection(path_margin)
-
-            # Touches polygon?
-            if path.is_empty:
-                break
-
-            # path can be a collection of paths.
-            path_geometry = flatten_shapely_geometry(path, simplify_tolerance=simplify_tol)
-            for p in path_geometry:
-                geom_elems.insert(p)
-                if prog_plot:
-                    self.plot_temp_shapes(p)
-
-            if prog_plot:
-                self.temp_shapes.redraw()
-
-            radius += tooldia * (1 - overlap)
-
-        # Clean inside edges (contours) of the original polygon
-        if contour:
-            buffered_poly = autolist(polygon_to_clear.buffer(-tooldia / 2, int(steps_per_circle)))
-            buffered_poly = [x.simplify(simplify_tol) for x in buffered_poly]
-            outer_edges = [x.exterior for x in buffered_poly]
-
-            inner_edges = []
-            # Over resulting polygons
-            for x in buffered_poly:
-                for y in x.interiors:  # Over interiors of each polygon
-                    inner_edges.append(y)
-
-            for g in outer_edges + inner_edges:
-                if g and not g.is_empty:
-                    geom_elems.insert(g)
-                    if prog_plot:
-                        self.plot_temp_shapes(g)
-
         if prog_plot:
             self.temp_shapes.redraw()
 
@@ -1654,127 +1647,13 @@ class Geometry(object):
         """
 
         # log.debug("camlib.clear_polygon_lines()")
-        if not isinstance(polygon, Polygon):
-            self.app.log.debug("camlib.Geometry.clear_polygon_lines() --> Not a Polygon but %s" % str(type(polygon)))
-            return None
-
-        # The toolpaths
-        # Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
 
-        geoms = AppRTreeStorage()
-        geoms.get_points = get_pts
-
-        lines_trimmed = []
-
-        # Bounding box
-        left, bot, right, top = polygon.bounds
-
-        try:
-            margin_poly = polygon.buffer(-tooldia / 1.99999999, (int(steps_per_circle)))
-            margin_poly = margin_poly.simplify(simplify_tol)
-        except Exception:
-            self.app.log.debug("camlib.Geometry.clear_polygon_lines() --> Could not buffer the Polygon")
+        geoms = clear_polygon_lines_paths(polygon, tooldia, steps_per_circle, overlap=overlap, contour=contour,
+                                          simplify_tol=simplify_tol, loop_callback=self.check_abort_in_loop,
+                                          plot_callback=self.plot_temp_shapes_redraw if prog_plot else None)
+        if geoms is None:
             return None
 
-        # decide the direction of the lines
-        if abs(left - right) >= abs(top - bot):
-            # First line
-            try:
-                y = top - tooldia / 1.99999999
-                while y > bot + tooldia / 1.999999999:
-                    if self.app.abort_flag:
-                        # graceful abort requested by the user
-                        raise grace
-
-                    # provide the app with a way to process the GUI events when in a blocking loop
-                    QtWidgets.QApplication.processEvents()
-
-                    line = LineString([(left, y), (right, y)])
-                    line = line.intersection(margin_poly)
-                    line = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
-                    lines_trimmed += line
-                    y -= tooldia * (1 - overlap)
-                    if prog_plot:
-                        self.plot_temp_shapes(line)
-                        self.temp_shapes.redraw()
-
-                # Last line
-                y = bot + tooldia / 2
-                line = LineString([(left, y), (right, y)])
-                line = line.intersection(margin_poly)
-
-                lines_geometry = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
-                for ll in lines_geometry:
-                    lines_trimmed.append(ll)
-                    if prog_plot:
-                        self.plot_temp_shapes(ll)
-            except Exception as e:
-                self.app.log.error('camlib.Geometry.clear_polygon_lines() Processing poly --> %s' % str(e))
-                return None
-        else:
-            # First line
-            try:
-                x = left + tooldia / 1.99999999
-                while x < right - tooldia / 1.999999999:
-                    if self.app.abort_flag:
-                        # graceful abort requested by the user
-                        raise grace
-
-                    # provide the app with a way to process the GUI events when in a blocking loop
-                    QtWidgets.QApplication.processEvents()
-
-                    line = LineString([(x, top), (x, bot)])
-                    line = line.intersection(margin_poly)
-                    line = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
-                    lines_trimmed += line
-                    x += tooldia * (1 - overlap)
-                    if prog_plot:
-                        self.plot_temp_shapes(line)
-                        self.temp_shapes.redraw()
-
-                # Last line
-                x = right + tooldia / 2
-                line = LineString([(x, top), (x, bot)])
-                line = line.intersection(margin_poly)
-
-                lines_geometry = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
-                for ll in lines_geometry:
-                    lines_trimmed.append(ll)
-                    if prog_plot:
-                        self.plot_temp_shapes(ll)
-            except Exception as e:
-                self.app.log.error('camlib.Geometry.clear_polygon_lines() Processing poly --> %s' % str(e))
-                return None
-
-        if prog_plot:
-            self.temp_shapes.redraw()
-
-        lines_trimmed = unary_union(lines_trimmed)
-
-        # Add lines to storage
-        lines_t_geo = flatten_shapely_geometry(lines_trimmed, simplify_tolerance=simplify_tol)
-        for line in lines_t_geo:
-            if isinstance(line, LineString) or isinstance(line, LinearRing):
-                if not line.is_empty:
-                    geoms.insert(line)
-            else:
-                self.app.log.debug("camlib.Geometry.clear_polygon_lines(). Not a line: %s" % str(type(line)))
-
-        # Add margin (contour) to storage
-        if contour:
-            margin_poly_geo = flatten_shapely_geometry(margin_poly, simplify_tolerance=simplify_tol)
-            for poly in margin_poly_geo:
-                if isinstance(poly, Polygon) and not poly.is_empty:
-                    geoms.insert(poly.exterior)
-                    if prog_plot:
-                        self.plot_temp_shapes(poly.exterior)
-                    for ints in poly.interiors:
-                        geoms.insert(ints)
-                        if prog_plot:
-                            self.plot_temp_shapes(ints)
-
         if prog_plot:
             self.temp_shapes.redraw()
 
@@ -1789,6 +1668,24 @@ class Geometry(object):
 
         return geoms
 
+    def check_abort_in_loop(self):
+        """
+        Called in each iteration of the polygon clearing loops. Raise the grace exception if the user requested
+        an abort and let the app process the GUI events.
+
+        :return:    None
+        """
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+
+        # provide the app with a way to process the GUI events when in a blocking loop
+        QtWidgets.QApplication.processEvents()
+
+    def plot_temp_shapes_redraw(self, element, color='red'):
+        self.plot_temp_shapes(element, color=color)
+        self.temp_shapes.redraw()
+
     def fill_with_lines(self, line, aperture_size, tooldia, steps_per_circle, overlap=0.15, connect=True, contour=True,
                         prog_plot=False):
         """
@@ -2717,74 +2614,758 @@ class AttrDict(dict):
         self.__dict__ = self
 
 
-class CNCjob(Geometry):
+class GCodeTokenizer:
     """
-    Represents work to be done by a CNC machine.
+    Splits G-code lines in words for CNCjob.gcode_parse(). The G-code dialect is chosen once from the preprocessor
+    names and each dialect uses its own precompiled patterns.
 
-    *ATTRIBUTES*
+    The dialects:
 
-    * ``gcode_parsed`` (list): Each is a dictionary:
+    * ``ROLAND``: Roland RML moves ``Z x,y,z;`` (X, Y in steps of 0.01 mm and Z in steps of 0.025 mm)
+    * ``HPGL``: HPGL moves ``PA x,y;`` (in steps of 0.025 mm); the pen up/down and the pen selection are seen as Z
+    * ``LASER``: laser and solder paste dispensing G-code; the laser/fan/dispenser on and off codes are seen as Z
+    * ``PASTE``: other solder paste G-code, only the X, Y coordinates are used
+    * ``GENERIC``: any other G-code; the words at the start of the line, like ``G01 X1.0 Y2.0``
 
-    =====================  =========================================
-    Key                    Value
-    =====================  =========================================
-    geom                   (Shapely.LineString) Tool path (XY plane)
-    kind                   (string) "AB", A is "T" (travel) or
-                           "C" (cut). B is "F" (fast) or "S" (slow).
-    =====================  =========================================
+    **USAGE**::
+
+        tokenizer = GCodeTokenizer(pp_geometry_name, pp_excellon_name, pp_solderpaste_name)
+        codes = tokenizer.columns(gcode.splitlines())
+        for g, x, y, z, i, j, t in tokenizer.rows(codes):
+            ...
     """
 
-    defaults = {
-        "pp_geometry_name": 'default',
-        "pp_excellon_name": 'default',
-        "excellon_optimization_type": "B",
-    }
+    ROLAND = 'roland'
+    HPGL = 'hpgl'
+    LASER = 'laser'
+    PASTE = 'paste'
+    GENERIC = 'generic'
+
+    # the codes used by CNCjob.gcode_parse(), in the order of the columns
+    CODES = ('G', 'X', 'Y', 'Z', 'I', 'J', 'T')
+    code_index = {code: col for col, code in enumerate(CODES)}
+
+    # a word is a letter followed by a number; the spaces inside the number are ignored
+    word_re = re.compile(r'\s*([A-Z])\s*([+\-.\d\s]+)')
+    # the same words in a whole text of lines: a word (letter, number), the rest of a line after the words or a newline
+    text_re = re.compile(r'[^\S\n]*([A-Z])[^\S\n]*([+\-.\d][+\-.\d \t\r\f\v]*|[ \t\r\f\v]+)|[^\n]+|(\n)')
+
+    roland_re = re.compile(r"^Z(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$")
+
+    hpgl_pa_re = re.compile(r"^PA(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$")
+    hpgl_pen_re = re.compile(r"^(P[U|D])")
+    hpgl_toolchange_re = re.compile(r"^SP\d*")
+
+    laser_xy_re = re.compile(r"X([+-]?\d+.[+-]?\d+)\s*Y([+-]?\d+.[+-]?\d+)")
+    laser_pos_re = re.compile(r"^(M0?[3-5])")
+    laser_fan_re = re.compile(r"^(M10[6|7])")
+
+    def __init__(self, pp_geometry_name='default', pp_excellon_name='default', pp_solderpaste_name=None):
+        pp_geometry_name = pp_geometry_name or ''
+        pp_excellon_name = pp_excellon_name or ''
+
+        if 'Roland' in pp_excellon_name or 'Roland' in pp_geometry_name:
+            self.dialect = self.ROLAND
+        elif 'hpgl' in pp_excellon_name or 'hpgl' in pp_geometry_name:
+            self.dialect = self.HPGL
+        elif 'laser' in pp_excellon_name.lower() or 'laser' in pp_geometry_name.lower() or \
+                (pp_solderpaste_name is not None and 'paste' in pp_solderpaste_name.lower()):
+            self.dialect = self.LASER
+        elif pp_solderpaste_name is not None:
+            self.dialect = self.PASTE
+        else:
+            self.dialect = self.GENERIC
+
+        self.words = {
+            self.ROLAND:    self.roland_words,
+            self.HPGL:      self.hpgl_words,
+            self.LASER:     self.laser_words,
+            self.PASTE:     self.paste_words,
+            self.GENERIC:   self.generic_words,
+        }[self.dialect]
+
+    def generic_words(self, line):
+        """
+        The words at the start of a line. The line is scanned with a single pattern until the first character that is
+        not part of a word (like a comment).
+
+        :param line:    G-code line
+        :type line:     str
+        :return:        list of tuples (letter, value)
+        """
+        return [
+            (match.group(1), float(match.group(2).replace(" ", "")))
+            for match in iter(self.word_re.scanner(line).match, None)
+        ]
+
+    def roland_words(self, line):
+        match_z = self.roland_re.search(line)
+        if match_z:
+            return [
+                ('G', 0),
+                ('X', float(match_z.group(1).replace(" ", "")) * 0.01),
+                ('Y', float(match_z.group(2).replace(" ", "")) * 0.01),
+                ('Z', float(match_z.group(3).replace(" ", "")) * 0.025)
+            ]
+        return []
+
+    def hpgl_words(self, line):
+        words = []
+        match_pa = self.hpgl_pa_re.search(line)
+        if match_pa:
+            words += [
+                ('G', 0),
+                ('X', float(match_pa.group(1).replace(" ", "")) / 40),
+                ('Y', float(match_pa.group(2).replace(" ", "")) / 40)
+            ]
+        match_pen = self.hpgl_pen_re.search(line)
+        if match_pen:
+            # the value does not matter, only that it is positive so the gcode_parse() know it is > 0,
+            # therefore the move is of kind T (travel)
+            words.append(('Z', 1 if match_pen.group(1) == 'PU' else 0))
+        if self.hpgl_toolchange_re.search(line):
+            words.append(('Z', 1))
+        return words
+
+    def laser_words(self, line):
+        words = self.paste_words(line)
+
+        match_lsr_pos = self.laser_pos_re.search(line)
+        if match_lsr_pos:
+            # the value does not matter, only that it is positive so the gcode_parse() know it is > 0,
+            # therefore the move is of kind T (travel)
+            words.append(('Z', 1 if match_lsr_pos.group(1) in ('M05', 'M5') else 0))
+
+        match_lsr_pos_2 = self.laser_fan_re.search(line)
+        if match_lsr_pos_2:
+            words.append(('Z', 1 if match_lsr_pos_2.group(1) == 'M107' else 0))
+
+        if 'laser OFF' in line:
+            words.append(('Z', 1))
+        return words
+
+    def paste_words(self, line):
+        match_xy = self.laser_xy_re.search(line)
+        if match_xy:
+            return [('X', float(match_xy.group(1).replace(" ", ""))), ('Y', float(match_xy.group(2).replace(" ", "")))]
+        return []
+
+    def split(self, line):
+        """
+        Parses a line of G-Code such as "G01 X1234 Y987" into a dictionary: {'G': 1.0, 'X': 1234.0, 'Y': 987.0}
+
+        :param line:    G-code line
+        :type line:     str
+        :return:        dictionary with the parsed line
+        :rtype:         dict
+        """
+        return dict(self.words(line))
+
+    def columns(self, lines):
+        """
+        Parses the G-code lines into an array with a row for each line and a column for each of the CODES.
+
+        :param lines:   list of G-code lines
+        :type lines:    list
+        :return:        numpy array of shape (len(lines), len(CODES)); NaN where the line has no such code
+        :rtype:         numpy.ndarray
+        """
+        codes = np.full((len(lines), len(self.CODES)), np.nan)
+        code_index = self.code_index
+
+        if self.dialect == self.GENERIC:
+            # all the lines are scanned by a single findall() and the numbers are converted at the end
+            rows = []
+            cols = []
+            values = []
+            row = 0
+            for code, val, newline in self.text_re.findall('\n'.join(lines)):
+                if newline:
+                    row += 1
+                elif code:
+                    col = code_index.get(code)
+                    if col is not None:
+                        rows.append(row)
+                        cols.append(col)
+                        values.append(val)
+            codes[rows, cols] = [float(val.replace(" ", "")) for val in values]
+            return codes
+
+        words = self.words
+        for row, line in enumerate(lines):
+            for code, val in words(line):
+                col = code_index.get(code)
+                if col is not None:
+                    codes[row, col] = val
+        return codes
 
-    def __init__(self,
-                 units="in", kind="generic", tooldia=0.0,
-                 z_cut=-0.002, z_move=0.1,
-                 feedrate=3.0, feedrate_z=3.0, feedrate_rapid=3.0, feedrate_probe=3.0,
-                 pp_geometry_name='default', pp_excellon_name='default',
-                 depthpercut=0.1, z_p_depth=-0.02,
-                 spindlespeed=None, spindledir='CW', dwell=True, dwelltime=1000,
-                 toolchangez=0.787402, toolchange_xy='0.0,0.0',
-                 endz=2.0, endxy='',
-                 seg_x=None,
-                 seg_y=None,
-                 steps_per_circle=None):
+    @staticmethod
+    def rows(codes, chunk_size=65536):
+        """
+        Generator of the rows of the array made by columns(), as lists of Python floats. The rows without any of the
+        CODES are skipped.
 
-        self.decimals = self.app.decimals
+        :param codes:       array made by columns()
+        :param chunk_size:  the rows are converted to Python floats in chunks of this size
+        :return:            list [g, x, y, z, i, j, t] for each row; NaN where the line has no such code
+        """
+        codes = codes[~np.isnan(codes).all(axis=1)]
+        for start in range(0, len(codes), chunk_size):
+            yield from codes[start:start + chunk_size].tolist()
 
-        # Used when parsing G-code arcs
-        self.steps_per_circle = steps_per_circle if steps_per_circle is not None else \
-            int(self.app.options['cncjob_steps_per_circle'])
 
-        Geometry.__init__(self, geo_steps_per_circle=self.steps_per_circle)
+class ToolpathRun:
+    """
+    Lightweight view of one run of a Toolpath. It behaves like the dictionary {"geom": geometry, "kind": kind} that
+    was used for each parsed tool path before the Toolpath, so the code that uses ``run['geom']`` and ``run['kind']``
+    works with both. The geometry is made when requested and setting it writes the coordinates back in the Toolpath.
+    """
 
-        self.kind = kind
-        self.units = units
+    __slots__ = ('toolpath', 'index')
 
-        self.z_cut = z_cut
-        self.multidepth = False
-        self.z_depthpercut = depthpercut
-        self.z_move = z_move
+    def __init__(self, toolpath, index):
+        self.toolpath = toolpath
+        self.index = index
 
-        self.feedrate = feedrate
-        self.z_feedrate = feedrate_z
-        self.feedrate_rapid = feedrate_rapid
+    def __getitem__(self, key):
+        if key == 'geom':
+            return self.toolpath.geometry(self.index)
+        if key == 'kind':
+            return self.toolpath.kind(self.index)
+        raise KeyError(key)
 
-        self.tooldia = tooldia
-        self.toolC = tooldia
-        self.toolchange = False
-        self.z_toolchange = toolchangez
-        self.xy_toolchange = toolchange_xy
+    def __setitem__(self, key, value):
+        if key == 'geom':
+            self.toolpath.set_geometry(self.index, value)
+        elif key == 'kind':
+            self.toolpath.set_kind(self.index, value)
+        else:
+            raise KeyError(key)
 
-        self.startz = None
-        self.z_end = endz
-        self.xy_end = endxy
+    def __contains__(self, key):
+        return key in ('geom', 'kind')
 
-        self.extracut = False
-        self.extracut_length = None
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        return iter(('geom', 'kind'))
+
+    def keys(self):
+        return ['geom', 'kind']
+
+    def items(self):
+        return [('geom', self['geom']), ('kind', self['kind'])]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def coords(self):
+        """
+        :return:    numpy array (n, 2) with the run vertices; a view in the Toolpath storage
+        """
+        return self.toolpath.coords[self.toolpath.offsets[self.index]:self.toolpath.offsets[self.index + 1]]
+
+
+class Toolpath:
+    """
+    Parsed G-code: the tool paths as runs of vertices, each run made while the tool height did not change. It replaces
+    the list of dictionaries {"geom": LineString(path), "kind": kind} with a compact storage:
+
+    * ``coords``: numpy float64 array (n, 2), the XY vertices of all the runs, one after another
+    * ``offsets``: numpy int64 array (runs + 1), the run i has the vertices coords[offsets[i]:offsets[i + 1]]
+    * ``z``: numpy float64 array, the tool height of each run (NaN if it is not known)
+    * ``kinds``: numpy uint8 array, the kind of each run as the TRAVEL, SLOW and RING bit flags
+    * ``tools``: numpy int16 array, the tool number of each run (0 if it is not known)
+
+    The Shapely geometry is made only when requested (geometry(), geometries()) and the transformations are done on
+    the coordinates array. Iterating over a Toolpath yields ToolpathRun views, which behave like the former
+    dictionaries, therefore a Toolpath can be used where a list of such dictionaries was used.
+    """
+
+    # the kind bits; a run with no bits set is of kind ['C', 'F'] (cut, fast)
+    TRAVEL = 1
+    SLOW = 2
+    # the run is a closed ring (a drill hole) made as a LinearRing
+    RING = 4
+
+    def __init__(self, coords=None, offsets=None, z=None, kinds=None, tools=None):
+        self.coords = np.zeros((0, 2)) if coords is None else np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.offsets = np.zeros(1, dtype=np.int64) if offsets is None else np.asarray(offsets, dtype=np.int64)
+        runs_nr = len(self.offsets) - 1
+        self.z = np.full(runs_nr, np.nan) if z is None else np.asarray(z, dtype=np.float64)
+        self.kinds = np.zeros(runs_nr, dtype=np.uint8) if kinds is None else np.asarray(kinds, dtype=np.uint8)
+        self.tools = np.zeros(runs_nr, dtype=np.int16) if tools is None else np.asarray(tools, dtype=np.int16)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ToolpathRun(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.subset(np.arange(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Toolpath index out of range")
+        return ToolpathRun(self, index)
+
+    # there is no __radd__() on purpose: "a_list += toolpath" has to extend the list with the ToolpathRun views, so
+    # the list shares the storage of the Toolpath, like it shared the dictionaries before the Toolpath
+    def __add__(self, other):
+        return Toolpath.concatenate([self, Toolpath.from_parsed(other)])
+
+    @staticmethod
+    def kind_bits(kind):
+        """
+        :param kind:    the kind as a list, like ['T', 'F']
+        :return:        the kind as bit flags
+        """
+        return (Toolpath.TRAVEL if kind[0] == 'T' else 0) | (Toolpath.SLOW if kind[1] == 'S' else 0)
+
+    def kind(self, index):
+        """
+        :param index:   the run index
+        :return:        the kind of the run as a list, like ['T', 'F']: "T" (travel) or "C" (cut) then "F" (fast) or
+                        "S" (slow)
+        """
+        bits = self.kinds[index]
+        return ['T' if bits & self.TRAVEL else 'C', 'S' if bits & self.SLOW else 'F']
+
+    def set_kind(self, index, kind):
+        self.kinds[index] = (self.kinds[index] & self.RING) | self.kind_bits(kind)
+
+    @property
+    def travel(self):
+        """
+        :return:    boolean numpy array, True for the travel runs
+        """
+        return (self.kinds & self.TRAVEL) != 0
+
+    def geometry(self, index):
+        """
+        :param index:   the run index
+        :return:        the run as a Shapely LineString (or LinearRing for the closed rings)
+        """
+        coords = self.coords[self.offsets[index]:self.offsets[index + 1]]
+        return LinearRing(coords) if self.kinds[index] & self.RING else LineString(coords)
+
+    def set_geometry(self, index, geom):
+        """
+        Replaces the vertices of a run with the ones of a Shapely geometry.
+
+        :param index:   the run index
+        :param geom:    Shapely LineString or LinearRing
+        :return:        None
+        """
+        coords = shapely.get_coordinates(geom)
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        if len(coords) == stop - start:
+            self.coords[start:stop] = coords
+        else:
+            self.coords = np.concatenate([self.coords[:start], coords, self.coords[stop:]])
+            self.offsets[index + 1:] += len(coords) - (stop - start)
+        if isinstance(geom, LinearRing):
+            self.kinds[index] |= self.RING
+        else:
+            self.kinds[index] &= ~np.uint8(self.RING)
+
+    def geometries(self, mask=None):
+        """
+        Makes the Shapely geometry of all the runs (or of the selected runs) with one vectorized call.
+
+        :param mask:    boolean numpy array to select the runs; None for all
+        :return:        numpy array of Shapely LineString and LinearRing
+        """
+        selected = np.ones(len(self), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        counts = np.diff(self.offsets)
+        vertex_run = np.repeat(np.arange(len(self)), counts)
+        result = np.empty(int(selected.sum()), dtype=object)
+        ring = (self.kinds[selected] & self.RING) != 0
+
+        for is_ring, maker in ((False, shapely.linestrings), (True, shapely.linearrings)):
+            runs = np.zeros(len(self), dtype=bool)
+            runs[selected] = ring == is_ring
+            if not runs.any():
+                continue
+            vertices = runs[vertex_run]
+            # the geometry index of each vertex, counted among the runs of this type only
+            indices = (np.cumsum(runs) - 1)[vertex_run[vertices]]
+            result[ring == is_ring] = maker(self.coords[vertices], indices=indices)
+        return result
+
+    def bounds(self):
+        """
+        :return:    (xmin, ymin, xmax, ymax) of all the runs
+        """
+        if len(self.coords) == 0:
+            return np.inf, np.inf, -np.inf, -np.inf
+        xmin, ymin = self.coords.min(axis=0)
+        xmax, ymax = self.coords.max(axis=0)
+        return float(xmin), float(ymin), float(xmax), float(ymax)
+
+    def subset(self, indices):
+        """
+        :param indices:     the indices of the runs to keep
+        :return:            new Toolpath with the selected runs
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        counts = np.diff(self.offsets)[indices]
+        starts = self.offsets[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        vertices = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+        return Toolpath(self.coords[vertices], offsets, self.z[indices], self.kinds[indices], self.tools[indices])
+
+    @staticmethod
+    def concatenate(toolpaths):
+        """
+        :param toolpaths:   list of Toolpath
+        :return:            new Toolpath with the runs of all the toolpaths
+        """
+        toolpaths = [tp for tp in toolpaths if len(tp)]
+        if not toolpaths:
+            return Toolpath()
+        offsets = [np.zeros(1, dtype=np.int64)]
+        start = 0
+        for tp in toolpaths:
+            offsets.append(tp.offsets[1:] + start)
+            start += tp.offsets[-1]
+        return Toolpath(
+            np.concatenate([tp.coords for tp in toolpaths]),
+            np.concatenate(offsets),
+            np.concatenate([tp.z for tp in toolpaths]),
+            np.concatenate([tp.kinds for tp in toolpaths]),
+            np.concatenate([tp.tools for tp in toolpaths])
+        )
+
+    @staticmethod
+    def from_parsed(gcode_parsed):
+        """
+        Makes a Toolpath from parsed G-code in any of the forms: a Toolpath (returned as it is), a list of
+        dictionaries {"geom": geometry, "kind": kind} (like in the projects saved before the Toolpath) or a list of
+        ToolpathRun views (like the one made by adding Toolpaths to a list).
+
+        :param gcode_parsed:    the parsed G-code
+        :return:                Toolpath
+        """
+        if isinstance(gcode_parsed, Toolpath):
+            return gcode_parsed
+        if not gcode_parsed:
+            return Toolpath()
+
+        builder = ToolpathBuilder()
+        for item in gcode_parsed:
+            if not item:
+                continue
+            if isinstance(item, ToolpathRun):
+                tp = item.toolpath
+                builder.add_coords(item.coords(), tp.kinds[item.index], tp.z[item.index], tp.tools[item.index])
+            else:
+                geom = item['geom']
+                bits = Toolpath.kind_bits(item['kind']) | (Toolpath.RING if isinstance(geom, LinearRing) else 0)
+                builder.add_coords(shapely.get_coordinates(geom), bits)
+        return builder.toolpath()
+
+    def affine_transform(self, matrix):
+        """
+        Transforms the coordinates in place, like shapely.affinity.affine_transform() does for a geometry.
+
+        :param matrix:  the 2D affine transformation matrix [a, b, d, e, xoff, yoff]
+        :return:        None
+        """
+        a, b, d, e, xoff, yoff = matrix
+        x = self.coords[:, 0].copy()
+        y = self.coords[:, 1]
+        self.coords[:, 0] = a * x + b * y + xoff
+        self.coords[:, 1] = d * x + e * y + yoff
+
+    @staticmethod
+    def scale_matrix(xfact, yfact, origin):
+        x0, y0 = origin
+        return [xfact, 0.0, 0.0, yfact, x0 - x0 * xfact, y0 - y0 * yfact]
+
+    @staticmethod
+    def translate_matrix(xoff, yoff):
+        return [1.0, 0.0, 0.0, 1.0, xoff, yoff]
+
+    @staticmethod
+    def rotate_matrix(angle, origin):
+        """
+        :param angle:   rotation angle in degrees, counter-clockwise
+        :param origin:  (x, y) of the rotation origin
+        :return:        the matrix, computed as in shapely.affinity.rotate()
+        """
+        x0, y0 = origin
+        angle = np.radians(angle)
+        cosp = np.cos(angle)
+        sinp = np.sin(angle)
+        if abs(cosp) < 2.5e-16:
+            cosp = 0.0
+        if abs(sinp) < 2.5e-16:
+            sinp = 0.0
+        return [cosp, -sinp, sinp, cosp, x0 - x0 * cosp + y0 * sinp, y0 - x0 * sinp - y0 * cosp]
+
+    @staticmethod
+    def skew_matrix(xs, ys, origin):
+        """
+        :param xs:      the shear angle along the X axis, in degrees
+        :param ys:      the shear angle along the Y axis, in degrees
+        :param origin:  (x, y) of the skew origin
+        :return:        the matrix, computed as in shapely.affinity.skew()
+        """
+        x0, y0 = origin
+        tanx = np.tan(np.radians(xs))
+        tany = np.tan(np.radians(ys))
+        if abs(tanx) < 2.5e-16:
+            tanx = 0.0
+        if abs(tany) < 2.5e-16:
+            tany = 0.0
+        return [1.0, tanx, tany, 1.0, -y0 * tanx, -x0 * tany]
+
+    def to_dict(self):
+        """
+        :return:    JSON ready dictionary with the arrays encoded as base64 of their little endian bytes
+        """
+        def encode(arr, dtype):
+            return base64.b64encode(np.ascontiguousarray(arr, dtype=dtype).tobytes()).decode('ascii')
+
+        return {
+            'coords': encode(self.coords, '<f8'),
+            'offsets': encode(self.offsets, '<i8'),
+            'z': encode(self.z, '<f8'),
+            'kinds': encode(self.kinds, 'u1'),
+            'tools': encode(self.tools, '<i2')
+        }
+
+    @staticmethod
+    def from_dict(d):
+        """
+        Reverse of to_dict().
+
+        :param d:   dictionary made by to_dict()
+        :return:    Toolpath
+        """
+        def decode(key, dtype):
+            return np.frombuffer(base64.b64decode(d[key]), dtype=dtype).copy()
+
+        return Toolpath(decode('coords', '<f8'), decode('offsets', '<i8'), decode('z', '<f8'), decode('kinds', 'u1'),
+                        decode('tools', '<i2'))
+
+
+class ToolpathBuilder:
+    """
+    Collects the runs of a Toolpath while the G-code is parsed; the arrays are made once, in toolpath().
+    """
+
+    def __init__(self):
+        self.points = []
+        self.arrays = []
+        self.offsets = [0]
+        self.z = []
+        self.kinds = []
+        self.tools = []
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def add_path(self, path, kind, z=np.nan, tool=0, ring=False):
+        """
+        :param path:    list of (x, y) vertices
+        :param kind:    the kind of the run, like ['C', 'F']
+        :param z:       the tool height on this run
+        :param tool:    the tool number
+        :param ring:    True if the path is a closed ring
+        :return:        None
+        """
+        self.points += path
+        self.offsets.append(self.offsets[-1] + len(path))
+        self.z.append(z)
+        self.kinds.append(Toolpath.kind_bits(kind) | (Toolpath.RING if ring else 0))
+        self.tools.append(tool)
+
+    def add_coords(self, coords, bits, z=np.nan, tool=0):
+        """
+        :param coords:  numpy array (n, 2) of vertices
+        :param bits:    the kind of the run as Toolpath bit flags
+        :param z:       the tool height on this run
+        :param tool:    the tool number
+        :return:        None
+        """
+        if self.points:
+            self.arrays.append(np.asarray(self.points, dtype=np.float64).reshape(-1, 2))
+            self.points = []
+        self.arrays.append(np.asarray(coords, dtype=np.float64)[:, :2])
+        self.offsets.append(self.offsets[-1] + len(coords))
+        self.z.append(z)
+        self.kinds.append(bits)
+        self.tools.append(tool)
+
+    def toolpath(self):
+        """
+        :return:    the Toolpath with all the added runs
+        """
+        arrays = self.arrays + ([np.asarray(self.points, dtype=np.float64).reshape(-1, 2)] if self.points else [])
+        coords = np.concatenate(arrays) if arrays else np.zeros((0, 2))
+        return Toolpath(coords, self.offsets, self.z, self.kinds, self.tools)
+
+
+def toolpath_geometries(gcode_parsed, travel=None):
+    """
+    The Shapely geometry of parsed G-code, in any of the forms accepted by Toolpath.from_parsed().
+
+    :param gcode_parsed:    the parsed G-code
+    :param travel:          None for all the runs, True for the travel runs only, False for the cut runs only
+    :return:                list of Shapely geometry
+    """
+    toolpath = Toolpath.from_parsed(gcode_parsed)
+    if travel is None:
+        return list(toolpath.geometries())
+    return list(toolpath.geometries(toolpath.travel if travel else ~toolpath.travel))
+
+
+class GCodeEmitter:
+    """
+    Collects the G-code made by the preprocessors. The text chunks are kept in a list and joined once, when the G-code
+    is requested, instead of adding strings together, which copies all the G-code made so far at each addition.
+
+    When a sink is given (a text file or any object with a write() method) the chunks are written to it each time they
+    add up to buffer_size characters, so the memory used does not depend on the size of the G-code.
+
+    The "+=" operator does the same as write(), so the code written for strings works with an emitter too::
+
+        gcode = GCodeEmitter()
+        gcode += self.doformat(p.lift_code)
+        return gcode.getvalue()
+    """
+
+    def __init__(self, sink=None, buffer_size=1 << 20):
+        """
+        :param sink:            where the G-code is written; None to keep it in memory
+        :param buffer_size:     the chunks are written to the sink when they add up to this number of characters
+        """
+        self.sink = sink
+        self.buffer_size = buffer_size
+        self.chunks = []
+        self.buffered = 0
+        self.length = 0
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.buffered += len(text)
+        self.length += len(text)
+        if self.sink is not None and self.buffered >= self.buffer_size:
+            self.flush()
+
+    def writelines(self, chunks):
+        for text in chunks:
+            self.write(text)
+
+    def __iadd__(self, text):
+        self.write(text)
+        return self
+
+    def __len__(self):
+        """
+        :return:    the number of characters written so far
+        """
+        return self.length
+
+    def flush(self):
+        """
+        Writes the buffered chunks to the sink. Nothing is done when there is no sink.
+
+        :return:    None
+        """
+        if self.sink is not None and self.chunks:
+            self.sink.write(self.chunks[0] if len(self.chunks) == 1 else ''.join(self.chunks))
+            self.chunks = []
+            self.buffered = 0
+
+    def getvalue(self):
+        """
+        :return:    the G-code written so far, as a string. Only for an emitter without a sink.
+        """
+        if self.sink is not None:
+            raise ValueError("The G-code was written to the sink.")
+        if len(self.chunks) > 1:
+            self.chunks = [''.join(self.chunks)]
+        return self.chunks[0] if self.chunks else ''
+
+
+class CNCjob(Geometry):
+    """
+    Represents work to be done by a CNC machine.
+
+    *ATTRIBUTES*
+
+    * ``gcode_parsed`` (Toolpath): Each item is a view that behaves like a dictionary:
+
+    =====================  =========================================
+    Key                    Value
+    =====================  =========================================
+    geom                   (Shapely.LineString) Tool path (XY plane)
+    kind                   (string) "AB", A is "T" (travel) or
+                           "C" (cut). B is "F" (fast) or "S" (slow).
+    =====================  =========================================
+
+    The projects saved before the Toolpath have a list of such dictionaries.
+    """
+
+    defaults = {
+        "pp_geometry_name": 'default',
+        "pp_excellon_name": 'default',
+        "excellon_optimization_type": "B",
+    }
+
+    def __init__(self,
+                 units="in", kind="generic", tooldia=0.0,
+                 z_cut=-0.002, z_move=0.1,
+                 feedrate=3.0, feedrate_z=3.0, feedrate_rapid=3.0, feedrate_probe=3.0,
+                 pp_geometry_name='default', pp_excellon_name='default',
+                 depthpercut=0.1, z_p_depth=-0.02,
+                 spindlespeed=None, spindledir='CW', dwell=True, dwelltime=1000,
+                 toolchangez=0.787402, toolchange_xy='0.0,0.0',
+                 endz=2.0, endxy='',
+                 seg_x=None,
+                 seg_y=None,
+                 steps_per_circle=None):
+
+        self.decimals = self.app.decimals
+
+        # Used when parsing G-code arcs
+        self.steps_per_circle = steps_per_circle if steps_per_circle is not None else \
+            int(self.app.options['cncjob_steps_per_circle'])
+
+        Geometry.__init__(self, geo_steps_per_circle=self.steps_per_circle)
+
+        self.kind = kind
+        self.units = units
+
+        self.z_cut = z_cut
+        self.multidepth = False
+        self.z_depthpercut = depthpercut
+        self.z_move = z_move
+
+        self.feedrate = feedrate
+        self.z_feedrate = feedrate_z
+        self.feedrate_rapid = feedrate_rapid
+
+        self.tooldia = tooldia
+        self.toolC = tooldia
+        self.toolchange = False
+        self.z_toolchange = toolchangez
+        self.xy_toolchange = toolchange_xy
+
+        self.startz = None
+        self.z_end = endz
+        self.xy_end = endxy
+
+        self.extracut = False
+        self.extracut_length = None
 
         self.tolerance = self.drawing_tolerance
 
@@ -3323,7 +3904,7 @@ class CNCjob(Geometry):
         self.exc_tools = deepcopy(tools)
         self.tool = str(tool)
 
-        t_gcode = ''
+        t_gcode = GCodeEmitter()
 
         # holds the temporary coordinates of the processed drill point
         locx, locy = first_pt
@@ -3679,7 +4260,7 @@ class CNCjob(Geometry):
 
         self.app.inform.emit('%s %s' % (_("Finished G-Code generation for tool:"), str(tool)))
 
-        return t_gcode, (locx, locy), start_gcode
+        return t_gcode.getvalue(), (locx, locy), start_gcode
 
     # used in Geometry (and in Tool Milling)
     def geometry_tool_gcode_gen(self, tool, tools, first_pt, last_pt, tolerance, is_first=False, is_last=False,
@@ -3712,7 +4293,7 @@ class CNCjob(Geometry):
 
         self.app.log.debug("camlib.CNCJob.geometry_tool_gcode_gen() -> Generating GCode for tool: %s" % str(tool))
 
-        t_gcode = ''
+        t_gcode = GCodeEmitter()
         temp_solid_geometry = []
 
         # The Geometry from which we create GCode
@@ -4122,7 +4703,7 @@ class CNCjob(Geometry):
                 '%s... %s %s.' % (_("Finished G-Code generation"), str(path_count), _("paths traced"))
             )
 
-        self.gcode = t_gcode
+        self.gcode = t_gcode.getvalue()
         return self.gcode, start_gcode
 
     def tcl_gcode_from_excellon_by_tool(self, exobj, tools="all", order='fwd', is_first=False):
@@ -4308,7 +4889,7 @@ class CNCjob(Geometry):
         # Initialization
         # #############################################################################################################
         # #############################################################################################################
-        gcode = ''
+        gcode = GCodeEmitter()
         start_gcode = ''
         if is_first:
             start_gcode = self.doformat(p.start_code)
@@ -4380,7 +4961,7 @@ class CNCjob(Geometry):
         if self.toolchange is True:
             tool = tools[0]
             for tool in tools:
-                tool_gcode = ''
+                tool_gcode = GCodeEmitter()
 
                 # check if it has drills
                 if not self.exc_tools[tool]['drills']:
@@ -4601,8 +5182,8 @@ class CNCjob(Geometry):
                             old_disp_number = disp_number
 
                     self.tools[tool]['last_point'] = (locx, locy)
-                    self.tools[tool]['gcode'] = tool_gcode
-                    gcode += tool_gcode
+                    self.tools[tool]['gcode'] = tool_gcode.getvalue()
+                    gcode += self.tools[tool]['gcode']
                 else:
                     self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
                     return 'fail'
@@ -4839,10 +5420,10 @@ class CNCjob(Geometry):
                 return 'fail'
             self.z_cut = deepcopy(old_zcut)
             try:
-                self.tools[one_tool]['gcode'] = gcode
+                self.tools[one_tool]['gcode'] = gcode.getvalue()
             except KeyError:
                 # just a hack because I am lazy and I don't want to fix the Tcl command drillcncjob which needs this
-                self.tools[str(one_tool)]['gcode'] = gcode
+                self.tools[str(one_tool)]['gcode'] = gcode.getvalue()
 
             # add the end_gcode
             end_gcode = self.doformat(p.spindle_stop_code)
@@ -4890,10 +5471,10 @@ class CNCjob(Geometry):
         # #############################################################################################################
         # ############################# Store the GCODE for further usage ############################################
         # #############################################################################################################
-        self.gcode = gcode
+        self.gcode = gcode.getvalue()
 
         self.app.inform.emit('%s ...' % _("Finished G-Code generation"))
-        return gcode, start_gcode
+        return self.gcode, start_gcode
 
     # no longer used
     def generate_from_multitool_geometry(self, geometry, append=True, tooldia=None, offset=0.0, tolerance=0, z_cut=1.0,
@@ -5102,35 +5683,37 @@ class CNCjob(Geometry):
         self.pp_geometry = self.app.preprocessors[self.pp_geometry_name]
         p = self.pp_geometry
 
-        self.gcode = self.doformat(p.start_code)
+        # the G-code is collected in an emitter and stored in self.gcode when finished
+        gcode = GCodeEmitter()
+        gcode += self.doformat(p.start_code)
 
-        self.gcode += self.doformat(p.feedrate_code)  # sets the feed rate
+        gcode += self.doformat(p.feedrate_code)  # sets the feed rate
 
         if toolchange is False:
-            self.gcode += self.doformat(p.lift_code, x=0, y=0)  # Move (up) to travel height
-            self.gcode += self.doformat(p.startz_code, x=0, y=0)
+            gcode += self.doformat(p.lift_code, x=0, y=0)  # Move (up) to travel height
+            gcode += self.doformat(p.startz_code, x=0, y=0)
 
         if toolchange:
             # if "line_xyz" in self.pp_geometry_name:
-            #     self.gcode += self.doformat(p.toolchange_code, x=self.xy_toolchange[0], y=self.xy_toolchange[1])
+            #     gcode += self.doformat(p.toolchange_code, x=self.xy_toolchange[0], y=self.xy_toolchange[1])
             # else:
-            #     self.gcode += self.doformat(p.toolchange_code)
-            self.gcode += self.doformat(p.toolchange_code)
+            #     gcode += self.doformat(p.toolchange_code)
+            gcode += self.doformat(p.toolchange_code)
 
             if 'laser' not in self.pp_geometry_name:
-                self.gcode += self.doformat(p.spindle_code)  # Spindle start
+                gcode += self.doformat(p.spindle_code)  # Spindle start
             else:
                 # for laser this will disable the laser
-                self.gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+                gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
 
             if self.dwell is True:
-                self.gcode += self.doformat(p.dwell_code)  # Dwell time
+                gcode += self.doformat(p.dwell_code)  # Dwell time
         else:
             if 'laser' not in self.pp_geometry_name:
-                self.gcode += self.doformat(p.spindle_code)  # Spindle start
+                gcode += self.doformat(p.spindle_code)  # Spindle start
 
             if self.dwell is True:
-                self.gcode += self.doformat(p.dwell_code)  # Dwell time
+                gcode += self.doformat(p.dwell_code)  # Dwell time
 
         total_travel = 0.0
         total_cut = 0.0
@@ -5178,8 +5761,8 @@ class CNCjob(Geometry):
                     # calculate the cut distance
                     total_cut = total_cut + geo.length
 
-                    self.gcode += self.create_gcode_single_pass(geo, current_tooldia, extracut, extracut_length,
-                                                                tolerance, z_move=z_move, old_point=current_pt)
+                    gcode += self.create_gcode_single_pass(geo, current_tooldia, extracut, extracut_length,
+                                                           tolerance, z_move=z_move, old_point=current_pt)
 
                 # --------- Multi-pass ---------
                 else:
@@ -5196,7 +5779,7 @@ class CNCjob(Geometry):
                     gc, geo = self.create_gcode_multi_pass(geo, current_tooldia, extracut, extracut_length,
                                                            tolerance,  z_move=z_move, postproc=p,
                                                            old_point=current_pt)
-                    self.gcode += gc
+                    gcode += gc
 
                 # calculate the total distance
                 total_travel = total_travel + abs(distance(pt1=current_pt, pt2=pt))
@@ -5219,12 +5802,13 @@ class CNCjob(Geometry):
         self.routing_time += total_cut / self.feedrate
 
         # Finish
-        self.gcode += self.doformat(p.spindle_stop_code)
-        self.gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
-        self.gcode += self.doformat(p.end_code, x=0, y=0)
+        gcode += self.doformat(p.spindle_stop_code)
+        gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
+        gcode += self.doformat(p.end_code, x=0, y=0)
         self.app.inform.emit(
             '%s... %s %s.' % (_("Finished G-Code generation"), str(path_count), _("paths traced"))
         )
+        self.gcode = gcode.getvalue()
         return self.gcode
 
     def generate_from_geometry_2(self, geo_obj, append=True, tooldia=None, offset=0.0, tolerance=0, z_cut=None,
@@ -5518,8 +6102,10 @@ class CNCjob(Geometry):
             if geo_shape is not None:
                 storage.insert(geo_shape)
 
-        if not append:
-            self.gcode = ""
+        # the G-code is collected in an emitter and stored in self.gcode when finished
+        gcode = GCodeEmitter()
+        if append:
+            gcode += self.gcode
 
         # tell preprocessor the number of tool (for toolchange)
         self.tool = tool_no
@@ -5544,35 +6130,35 @@ class CNCjob(Geometry):
             start_gcode = self.doformat(p.start_code)
 
         # self.gcode = self.doformat(p.start_code)
-        self.gcode += self.doformat(p.feedrate_code)  # sets the feed rate
+        gcode += self.doformat(p.feedrate_code)  # sets the feed rate
 
         if toolchange is False:
             # all the x and y parameters in self.doformat() are used only by some preprocessors not by all
-            self.gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
-            self.gcode += self.doformat(p.startz_code, x=self.oldx, y=self.oldy)
+            gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+            gcode += self.doformat(p.startz_code, x=self.oldx, y=self.oldy)
 
         if toolchange:
             # if "line_xyz" in self.pp_geometry_name:
-            #     self.gcode += self.doformat(p.toolchange_code, x=self.xy_toolchange[0], y=self.xy_toolchange[1])
+            #     gcode += self.doformat(p.toolchange_code, x=self.xy_toolchange[0], y=self.xy_toolchange[1])
             # else:
-            #     self.gcode += self.doformat(p.toolchange_code)
-            self.gcode += self.doformat(p.toolchange_code)
+            #     gcode += self.doformat(p.toolchange_code)
+            gcode += self.doformat(p.toolchange_code)
 
             if 'laser' not in self.pp_geometry_name:
-                self.gcode += self.doformat(p.spindle_code)  # Spindle start
+                gcode += self.doformat(p.spindle_code)  # Spindle start
                 if self.dwell is True:
-                    self.gcode += self.doformat(p.dwell_code)  # Dwell time
+                    gcode += self.doformat(p.dwell_code)  # Dwell time
             else:
                 # for laser this will disable the laser
-                self.gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+                gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
         else:
             if 'laser' not in self.pp_geometry_name:
-                self.gcode += self.doformat(p.spindle_code)  # Spindle start
+                gcode += self.doformat(p.spindle_code)  # Spindle start
                 if self.dwell is True:
-                    self.gcode += self.doformat(p.dwell_code)  # Dwell time
+                    gcode += self.doformat(p.dwell_code)  # Dwell time
             else:
                 # for laser this will disable the laser
-                self.gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+                gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
 
         total_travel = 0.0
         total_cut = 0.0
@@ -5620,8 +6206,8 @@ class CNCjob(Geometry):
                 if not multidepth:
                     # calculate the cut distance
                     total_cut += geo.length
-                    self.gcode += self.create_gcode_single_pass(geo, current_tooldia, extracut, self.extracut_length,
-                                                                tolerance, z_move=z_move, old_point=current_pt)
+                    gcode += self.create_gcode_single_pass(geo, current_tooldia, extracut, self.extracut_length,
+                                                           tolerance, z_move=z_move, old_point=current_pt)
 
                 # --------- Multi-pass ---------
                 else:
@@ -5638,7 +6224,7 @@ class CNCjob(Geometry):
                     gc, geo = self.create_gcode_multi_pass(geo, current_tooldia, extracut, self.extracut_length,
                                                            tolerance, z_move=z_move, postproc=p,
                                                            old_point=current_pt)
-                    self.gcode += gc
+                    gcode += gc
 
                 # calculate the travel distance
                 total_travel += abs(distance(pt1=current_pt, pt2=pt))
@@ -5663,17 +6249,18 @@ class CNCjob(Geometry):
 
         # Finish
         if 'laser' not in self.pp_geometry_name:
-            self.gcode += self.doformat(p.spindle_stop_code)
-            self.gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
+            gcode += self.doformat(p.spindle_stop_code)
+            gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
         else:
-            self.gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
-            self.gcode += self.doformat(p.spindle_stop_code)
+            gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
+            gcode += self.doformat(p.spindle_stop_code)
 
-        self.gcode += self.doformat(p.end_code, x=0, y=0)
+        gcode += self.doformat(p.end_code, x=0, y=0)
         self.app.inform.emit(
             '%s... %s %s.' % (_("Finished G-Code generation"), str(path_count), _("paths traced"))
         )
 
+        self.gcode = gcode.getvalue()
         if self.gcode == '':
             return 'fail', start_gcode
 
@@ -5747,11 +6334,12 @@ class CNCjob(Geometry):
                 storage.insert(geo_shape)
 
         # Initial G-Code
-        self.gcode = ''
+        # the G-code is collected in an emitter and stored in self.gcode when finished
+        gcode = GCodeEmitter()
         if is_first:
-            self.gcode += self.doformat(p.start_code)
-        self.gcode += self.doformat(p.spindle_off_code)
-        self.gcode += self.doformat(p.toolchange_code)
+            gcode += self.doformat(p.start_code)
+        gcode += self.doformat(p.spindle_off_code)
+        gcode += self.doformat(p.toolchange_code)
 
         # ## Iterate over geometry paths getting the nearest each time.
         self.app.log.debug("Starting SolderPaste G-Code...")
@@ -5781,7 +6369,7 @@ class CNCjob(Geometry):
                     # geo.coords = list(geo.coords)[::-1] # Shapely 2.0
                     geo = LineString(list(geo.coords)[::-1])
 
-                self.gcode += self.create_soldepaste_gcode(geo, p=p, old_point=current_pt)
+                gcode += self.create_soldepaste_gcode(geo, p=p, old_point=current_pt)
                 current_pt = geo.coords[-1]
                 pt, geo = storage.nearest(current_pt)  # Next
 
@@ -5798,13 +6386,14 @@ class CNCjob(Geometry):
         )
 
         # Finish
-        self.gcode += self.doformat(p.lift_code)
-        self.gcode += self.doformat(p.end_code)
+        gcode += self.doformat(p.lift_code)
+        gcode += self.doformat(p.end_code)
 
+        self.gcode = gcode.getvalue()
         return self.gcode
 
     def create_soldepaste_gcode(self, geometry, p, old_point=(0, 0)):
-        gcode = ''
+        gcode = GCodeEmitter()
         path = geometry.coords
 
         self.coordinates_type = self.app.options["cncjob_coords_type"]
@@ -5870,7 +6459,7 @@ class CNCjob(Geometry):
             gcode += self.doformat(p.dwell_rev_code)
             gcode += self.doformat(p.z_feedrate_code)
             gcode += self.doformat(p.lift_code)
-        return gcode
+        return gcode.getvalue()
 
     def create_gcode_single_pass(self, geometry, cdia, extracut, extracut_length, tolerance, z_move, old_point=(0, 0)):
         """
@@ -5936,7 +6525,7 @@ class CNCjob(Geometry):
         """
         p = postproc
 
-        gcode_multi_pass = ''
+        gcode_multi_pass = GCodeEmitter()
 
         if isinstance(self.z_cut, Decimal):
             z_cut = self.z_cut
@@ -5989,7 +6578,14 @@ class CNCjob(Geometry):
 
         # Lift the tool
         gcode_multi_pass += self.doformat(p.lift_code, x=old_point[0], y=old_point[1])
-        return gcode_multi_pass, geometry
+        return gcode_multi_pass.getvalue(), geometry
+
+    def gcode_tokenizer(self):
+        """
+        :return:    a GCodeTokenizer for the G-code dialect of the preprocessors used by this object
+        :rtype:     GCodeTokenizer
+        """
+        return GCodeTokenizer(self.pp_geometry_name, self.pp_excellon_name, self.pp_solderpaste_name)
 
     def codes_split(self, gline):
         """
@@ -6002,103 +6598,62 @@ class CNCjob(Geometry):
         :rtype:             dict
         """
 
-        command = {}
-
-        if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-            match_z = re.search(r"^Z(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$", gline)
-            if match_z:
-                command['G'] = 0
-                command['X'] = float(match_z.group(1).replace(" ", "")) * 0.01
-                command['Y'] = float(match_z.group(2).replace(" ", "")) * 0.01
-                command['Z'] = float(match_z.group(3).replace(" ", "")) * 0.025
-
-        elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-            match_pa = re.search(r"^PA(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$", gline)
-            if match_pa:
-                command['G'] = 0
-                command['X'] = float(match_pa.group(1).replace(" ", "")) / 40
-                command['Y'] = float(match_pa.group(2).replace(" ", "")) / 40
-            match_pen = re.search(r"^(P[U|D])", gline)
-            if match_pen:
-                if match_pen.group(1) == 'PU':
-                    # the value does not matter, only that it is positive so the gcode_parse() know it is > 0,
-                    # therefore the move is of kind T (travel)
-                    command['Z'] = 1
-                else:
-                    command['Z'] = 0
-            match_toolchange = re.search(r"^SP\d*", gline)
-            if match_toolchange:
-                command['Z'] = 1
-
-        elif 'laser' in self.pp_excellon_name.lower() or 'laser' in self.pp_geometry_name.lower() or \
-                (self.pp_solderpaste_name is not None and 'paste' in self.pp_solderpaste_name.lower()):
-            match_lsr = re.search(r"X([+-]?\d+.[+-]?\d+)\s*Y([+-]?\d+.[+-]?\d+)", gline)
-            if match_lsr:
-                command['X'] = float(match_lsr.group(1).replace(" ", ""))
-                command['Y'] = float(match_lsr.group(2).replace(" ", ""))
-
-            match_lsr_pos = re.search(r"^(M0?[3-5])", gline)
-            if match_lsr_pos:
-                if 'M05' in match_lsr_pos.group(1) or 'M5' in match_lsr_pos.group(1):
-                    # the value does not matter, only that it is positive so the gcode_parse() know it is > 0,
-                    # therefore the move is of kind T (travel)
-                    command['Z'] = 1
-                else:
-                    command['Z'] = 0
+        return self.gcode_tokenizer().split(gline)
 
-            match_lsr_pos_2 = re.search(r"^(M10[6|7])", gline)
-            if match_lsr_pos_2:
-                if 'M107' in match_lsr_pos_2.group(1):
-                    command['Z'] = 1
-                else:
-                    command['Z'] = 0
+    def drill_diameters_index(self):
+        """
+        Index of the Excellon drills (self.exc_tools) made once per parsing, so the diameter of the drill made by a
+        plunge is found with one lookup instead of searching all the drills of all the tools.
+        When the same point is drilled by more than one tool, the first tool wins, like in the former search.
 
-            match_lsr_pos_3 = re.search(r"^.*(laser OFF).*", gline)
-            if match_lsr_pos_3:
-                if 'laser OFF' in match_lsr_pos_3.group(1):
-                    command['Z'] = 1
-                else:
-                    command['Z'] = 0
-
-        elif self.pp_solderpaste_name is not None:
-            if 'Paste' in self.pp_solderpaste_name:
-                match_paste = re.search(r"X([\+-]?\d+.[\+-]?\d+)\s*Y([\+-]?\d+.[\+-]?\d+)", gline)
-                if match_paste:
-                    command['X'] = float(match_paste.group(1).replace(" ", ""))
-                    command['Y'] = float(match_paste.group(2).replace(" ", ""))
-        else:
-            match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
-            while match:
-                command[match.group(1)] = float(match.group(2).replace(" ", ""))
-                gline = gline[match.end():]
-                match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
-        return command
+        :return:    dictionary {(x, y): tool diameter} where the drill coordinates are rounded to self.decimals
+        :rtype:     dict
+        """
+        index = {}
+        for tool_dict in self.exc_tools.values():
+            if not tool_dict.get('drills'):
+                continue
+            dia = tool_dict['tooldia']
+            for x, y in shapely.get_coordinates(tool_dict['drills']).tolist():
+                index.setdefault((round(x, self.decimals), round(y, self.decimals)), dia)
+        return index
+
+    @staticmethod
+    def hole_template(dia):
+        """
+        The outline of a drill hole centered in origin. The holes are made by offsetting it, which gives the same
+        vertices as buffering each drill point.
+
+        :param dia:     the drill diameter
+        :type dia:      float
+        :return:        numpy array (n, 2) with the vertices of the closed ring
+        """
+        return shapely.get_coordinates(Point(0, 0).buffer(dia / 2.0).exterior)
 
     def gcode_parse(self, force_parsing=None, tool_data=None):
         """
-        G-Code parser (from self.gcode). Generates dictionary with
-        single-segment LineString's and "kind" indicating cut or travel,
-        fast or feedrate speed.
+        G-Code parser (from self.gcode). Generates the tool paths as runs of vertices with the "kind" indicating cut
+        or travel, fast or feedrate speed, where kind can be either ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
 
-        Will return a list of dict in the format:
+        Will return a Toolpath; iterating it yields views that behave like the dictionaries:
         {
             "geom": LineString(path),
             "kind": kind
         }
-        where kind can be either ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
 
         :param force_parsing:
         :type force_parsing:
         :param tool_data:       when dealing with multi tool objects we need the tool data
         :type tool_data:        dict
         :return:
-        :rtype:                 list
+        :rtype:                 Toolpath
         """
 
         kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
 
         # Results go here
-        geometry = []
+        geometry = ToolpathBuilder()
+        tool = 0
 
         # Last known instruction
         current = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'G': 0}
@@ -6145,92 +6700,74 @@ class CNCjob(Geometry):
         path = [pos_xy]
         # path = [(0, 0)]
 
+        if force_parsing is False or force_parsing is None:
+            if '%' in self.gcode or 'MOIN' in self.gcode or 'MOMM' in self.gcode:
+                return "fail"
+
         gcode_lines_list = self.gcode.splitlines()
         self.app.inform.emit('%s: %d' % (_("Parsing GCode file. Number of lines"), len(gcode_lines_list)))
 
-        # Process every instruction
-        for line in gcode_lines_list:
-            if force_parsing is False or force_parsing is None:
-                if '%MO' in line or '%' in line or 'MOIN' in line or 'MOMM' in line:
-                    return "fail"
+        tokenizer = self.gcode_tokenizer()
+        codes = tokenizer.columns(gcode_lines_list)
+        del gcode_lines_list
 
-            gobj = self.codes_split(line)
+        # the Z changes together with X, Y moves are expected for the Line_xyz preprocessor and for the dialects
+        # where the Z is only the tool (pen, laser) state
+        check_orthogonal = tokenizer.dialect == GCodeTokenizer.GENERIC and \
+            self.pp_geometry_name != 'Line_xyz' and self.pp_excellon_name != 'Line_xyz'
+        arcdir = [None, None, "cw", "ccw"]
 
+        # the drill diameters by drill coordinates and the hole outlines by diameter, for the Excellon drill holes
+        is_excellon = self.obj_options['type'].lower() == 'excellon'
+        drill_dias = self.drill_diameters_index() if is_excellon else {}
+        hole_templates = {}
+
+        # Process every instruction. The missing codes are NaN and (val == val) is False only for NaN.
+        for g, x, y, z, i, j, t in tokenizer.rows(codes):
             # ## Units
-            if 'G' in gobj and (gobj['G'] == 20.0 or gobj['G'] == 21.0):
-                self.units = {20.0: "IN", 21.0: "MM"}[gobj['G']]
+            if g == 20.0 or g == 21.0:
+                self.units = {20.0: "IN", 21.0: "MM"}[g]
                 continue
 
-            # TODO take into consideration the tools and update the travel line thickness
-            if 'T' in gobj:
-                pass
+            if t == t:
+                tool = int(t)
 
             # ## Changing height
-            if 'Z' in gobj:
-                if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-                    pass
-                elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-                    pass
-                elif 'laser' in self.pp_excellon_name or 'laser' in self.pp_geometry_name:
-                    pass
-                elif ('X' in gobj or 'Y' in gobj) and gobj['Z'] != current['Z']:
-                    if self.pp_geometry_name == 'Line_xyz' or self.pp_excellon_name == 'Line_xyz':
-                        pass
-                    else:
-                        self.app.log.warning("Non-orthogonal motion: From %s" % str(current))
-                        self.app.log.warning("  To: %s" % str(gobj))
+            if z == z:
+                if check_orthogonal and (x == x or y == y) and z != current['Z']:
+                    self.app.log.warning("Non-orthogonal motion: From %s" % str(current))
+                    self.app.log.warning("  To: %s" % str(
+                        {code: val for code, val in zip(GCodeTokenizer.CODES, (g, x, y, z, i, j, t)) if val == val}))
 
-                current['Z'] = gobj['Z']
                 # Store the path into geometry and reset path
                 if len(path) > 1:
-                    geometry.append({"geom": LineString(path),
-                                     "kind": kind})
+                    geometry.add_path(path, kind, current['Z'], tool)
                     path = [path[-1]]  # Start with the last point of last path.
+                current['Z'] = z
 
                 # create the geometry for the holes created when drilling Excellon drills
-                if self.obj_options['type'].lower() == 'excellon':
-                    if current['Z'] < 0:
-                        current_drill_point_coords = (
-                            float('%.*f' % (self.decimals, current['X'])),
-                            float('%.*f' % (self.decimals, current['Y']))
-                        )
+                if is_excellon and current['Z'] < 0:
+                    current_drill_point_coords = (
+                        round(current['X'], self.decimals),
+                        round(current['Y'], self.decimals)
+                    )
 
-                        # find the drill diameter knowing the drill coordinates
-                        break_loop = False
-                        for tool, tool_dict in self.exc_tools.items():
-                            if 'drills' in tool_dict:
-                                for drill_pt in tool_dict['drills']:
-                                    point_in_dict_coords = (
-                                        float('%.*f' % (self.decimals, drill_pt.x)),
-                                        float('%.*f' % (self.decimals, drill_pt.y))
-                                    )
-                                    if point_in_dict_coords == current_drill_point_coords:
-                                        dia = self.exc_tools[tool]['tooldia']
-                                        kind = ['C', 'F']
-                                        geometry.append(
-                                            {
-                                                "geom": Point(current_drill_point_coords).buffer(dia / 2.0).exterior,
-                                                "kind": kind
-                                            }
-                                        )
-                                        break_loop = True
-                                        break
-                                if break_loop:
-                                    break
-
-            if 'G' in gobj:
-                current['G'] = int(gobj['G'])
-
-            if 'X' in gobj or 'Y' in gobj:
-                if 'X' in gobj:
-                    x = gobj['X']
-                    # current['X'] = x
-                else:
-                    x = current['X']
+                    # find the drill diameter knowing the drill coordinates
+                    dia = drill_dias.get(current_drill_point_coords)
+                    if dia is not None:
+                        kind = ['C', 'F']
+                        if dia not in hole_templates:
+                            hole_templates[dia] = self.hole_template(dia)
+                        geometry.add_coords(hole_templates[dia] + current_drill_point_coords, Toolpath.RING,
+                                            current['Z'], tool)
 
-                if 'Y' in gobj:
-                    y = gobj['Y']
-                else:
+            if g == g:
+                current['G'] = int(g)
+
+            if x == x or y == y:
+                if x != x:
+                    x = current['X']
+                if y != y:
                     y = current['Y']
 
                 kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
@@ -6243,48 +6780,39 @@ class CNCjob(Geometry):
                 if current['G'] in [0, 1]:  # line
                     path.append((x, y))
 
-                arcdir = [None, None, "cw", "ccw"]
                 if current['G'] in [2, 3]:  # arc
-                    center = [gobj['I'] + current['X'], gobj['J'] + current['Y']]
-                    radius = np.sqrt(gobj['I'] ** 2 + gobj['J'] ** 2)
-                    start = np.arctan2(-gobj['J'], -gobj['I'])
+                    i = i if i == i else 0.0
+                    j = j if j == j else 0.0
+                    center = [i + current['X'], j + current['Y']]
+                    radius = np.sqrt(i ** 2 + j ** 2)
+                    start = np.arctan2(-j, -i)
                     stop = np.arctan2(-center[1] + y, -center[0] + x)
                     path += arc(center, radius, start, stop, arcdir[current['G']], int(self.steps_per_circle))
 
                 current['X'] = x
                 current['Y'] = y
 
-            # Update current instruction
-            for code in gobj:
-                current[code] = gobj[code]
-
         self.app.inform.emit('%s...' % _("Creating Geometry from the parsed GCode file. "))
         # There might not be a change in height at the
         # end, therefore, see here too if there is
         # a final path.
         if len(path) > 1:
-            geometry.append(
-                {
-                    "geom": LineString(path),
-                    "kind": kind
-                }
-            )
+            geometry.add_path(path, kind, current['Z'], tool)
 
-        self.gcode_parsed = geometry
-        return geometry
+        self.gcode_parsed = geometry.toolpath()
+        return self.gcode_parsed
 
     def excellon_tool_gcode_parse(self, dia, gcode, start_pt=(0, 0), force_parsing=None):
         """
-        G-Code parser (from self.tools['tool_id']['gcode']). For Excellon. Generates dictionary with
-        single-segment LineString's and "kind" indicating cut or travel,
-        fast or feedrate speed.
+        G-Code parser (from self.tools['tool_id']['gcode']). For Excellon. Generates the tool paths as runs of
+        vertices with the "kind" indicating cut or travel, fast or feedrate speed, where kind can be either ["C", "F"]
+        # T=travel, C=cut, F=fast, S=slow
 
-        Will return the Geometry as a list of dict in the format:
+        Will return the Geometry as a Toolpath; iterating it yields views that behave like the dictionaries:
         {
             "geom": LineString(path),
             "kind": kind
         }
-        where kind can be either ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
 
         :param dia:             the dia is a tool diameter which is the key in self.tools dict attribute of Excellon
         :type dia:              float
@@ -6294,14 +6822,15 @@ class CNCjob(Geometry):
         :type start_pt:         tuple
         :param force_parsing:
         :type force_parsing:    bool
-        :return:                Geometry as a list of dictionaries
-        :rtype:                 list
+        :return:                Geometry as a Toolpath
+        :rtype:                 Toolpath
         """
 
         kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
 
         # Results go here
-        geometry = []
+        geometry = ToolpathBuilder()
+        tool = 0
 
         # Last known instruction
         current = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'G': 0}
@@ -6313,6 +6842,10 @@ class CNCjob(Geometry):
         path = [pos_xy]
         # path = [(0, 0)]
 
+        if force_parsing is False or force_parsing is None:
+            if '%' in gcode or 'MOIN' in gcode or 'MOMM' in gcode:
+                return "fail"
+
         gcode_lines_list = gcode.splitlines()
         self.app.inform.emit(
             '%s: %s. %s: %d' % (_("Parsing GCode file for tool diameter"),
@@ -6320,66 +6853,58 @@ class CNCjob(Geometry):
                                 len(gcode_lines_list))
         )
 
-        # Process every instruction
-        for line in gcode_lines_list:
-            if force_parsing is False or force_parsing is None:
-                if '%MO' in line or '%' in line or 'MOIN' in line or 'MOMM' in line:
-                    return "fail"
+        tokenizer = self.gcode_tokenizer()
+        codes = tokenizer.columns(gcode_lines_list)
+        del gcode_lines_list
 
-            gobj = self.codes_split(line)
+        check_orthogonal = tokenizer.dialect == GCodeTokenizer.GENERIC and \
+            self.pp_geometry_name != 'Line_xyz' and self.pp_excellon_name != 'Line_xyz'
+        arcdir = [None, None, "cw", "ccw"]
 
+        # the outline of the drill holes made by this tool
+        hole_template = self.hole_template(dia)
+
+        # Process every instruction. The missing codes are NaN and (val == val) is False only for NaN.
+        for g, x, y, z, i, j, t in tokenizer.rows(codes):
             # ## Units
-            if 'G' in gobj and (gobj['G'] == 20.0 or gobj['G'] == 21.0):
-                self.units = {20.0: "IN", 21.0: "MM"}[gobj['G']]
+            if g == 20.0 or g == 21.0:
+                self.units = {20.0: "IN", 21.0: "MM"}[g]
                 continue
 
-            # TODO take into consideration the tools and update the travel line thickness
-            if 'T' in gobj:
-                pass
+            if t == t:
+                tool = int(t)
 
             # ## Changing height
-            if 'Z' in gobj:
-                if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-                    pass
-                elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-                    pass
-                elif 'laser' in self.pp_excellon_name or 'laser' in self.pp_geometry_name:
-                    pass
-                elif ('X' in gobj or 'Y' in gobj) and gobj['Z'] != current['Z']:
-                    if self.pp_geometry_name == 'Line_xyz' or self.pp_excellon_name == 'Line_xyz':
-                        pass
-                    else:
-                        self.app.log.warning("Non-orthogonal motion: From %s" % str(current))
-                        self.app.log.warning("  To: %s" % str(gobj))
+            if z == z:
+                if check_orthogonal and (x == x or y == y) and z != current['Z']:
+                    self.app.log.warning("Non-orthogonal motion: From %s" % str(current))
+                    self.app.log.warning("  To: %s" % str(
+                        {code: val for code, val in zip(GCodeTokenizer.CODES, (g, x, y, z, i, j, t)) if val == val}))
 
-                current['Z'] = gobj['Z']
                 # Store the path into geometry and reset path
                 if len(path) > 1:
-                    geometry.append({"geom": LineString(path),
-                                     "kind": kind})
+                    geometry.add_path(path, kind, current['Z'], tool)
                     path = [path[-1]]  # Start with the last point of last path.
+                current['Z'] = z
 
                 # create the geometry for the holes created when drilling Excellon drills
                 if current['Z'] < 0:
                     current_drill_point_coords = (
-                        float('%.*f' % (self.decimals, current['X'])),
-                        float('%.*f' % (self.decimals, current['Y']))
+                        round(current['X'], self.decimals),
+                        round(current['Y'], self.decimals)
                     )
 
                     kind = ['C', 'F']
-                    geometry.append(
-                        {
-                            "geom": Point(current_drill_point_coords).buffer(dia/2.0).exterior,
-                            "kind": kind
-                        }
-                    )
+                    geometry.add_coords(hole_template + current_drill_point_coords, Toolpath.RING, current['Z'], tool)
 
-            if 'G' in gobj:
-                current['G'] = int(gobj['G'])
+            if g == g:
+                current['G'] = int(g)
 
-            if 'X' in gobj or 'Y' in gobj:
-                x = gobj['X'] if 'X' in gobj else current['X']
-                y = gobj['Y'] if 'Y' in gobj else current['Y']
+            if x == x or y == y:
+                if x != x:
+                    x = current['X']
+                if y != y:
+                    y = current['Y']
 
                 kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
 
@@ -6390,31 +6915,23 @@ class CNCjob(Geometry):
                 if current['G'] in [0, 1]:  # line
                     path.append((x, y))
 
-                arcdir = [None, None, "cw", "ccw"]
                 if current['G'] in [2, 3]:  # arc
-                    center = [gobj['I'] + current['X'], gobj['J'] + current['Y']]
-                    radius = np.sqrt(gobj['I'] ** 2 + gobj['J'] ** 2)
-                    start = np.arctan2(-gobj['J'], -gobj['I'])
+                    i = i if i == i else 0.0
+                    j = j if j == j else 0.0
+                    center = [i + current['X'], j + current['Y']]
+                    radius = np.sqrt(i ** 2 + j ** 2)
+                    start = np.arctan2(-j, -i)
                     stop = np.arctan2(-center[1] + y, -center[0] + x)
                     path += arc(center, radius, start, stop, arcdir[current['G']], int(self.steps_per_circle))
 
                 current['X'] = x
                 current['Y'] = y
 
-            # Update current instruction
-            for code in gobj:
-                current[code] = gobj[code]
-
         self.app.inform.emit('%s: %s' % (_("Creating Geometry from the parsed GCode file for tool diameter"), str(dia)))
         # There might not be a change in height at the end, therefore, see here too if there is a final path.
         if len(path) > 1:
-            geometry.append(
-                {
-                    "geom": LineString(path),
-                    "kind": kind
-                }
-            )
-        return geometry
+            geometry.add_path(path, kind, current['Z'], tool)
+        return geometry.toolpath()
 
     # def plot(self, tooldia=None, dpi=75, margin=0.1,
     #          color={"T": ["#F0E24D", "#B5AB3A"], "C": ["#5E6CFF", "#4650BD"]},
@@ -6488,6 +7005,9 @@ class CNCjob(Geometry):
             }
 
         gcode_parsed = gcode_parsed if gcode_parsed else self.gcode_parsed
+        toolpath = Toolpath.from_parsed(gcode_parsed)
+        if not len(toolpath):
+            return
 
         if tooldia is None:
             tooldia = self.tooldia
@@ -6496,83 +7016,70 @@ class CNCjob(Geometry):
         if isinstance(tooldia, list):
             tooldia = tooldia[0] if tooldia[0] is not None else self.tooldia
 
+        travel = toolpath.travel
+        if kind == 'travel':
+            plotted = travel
+        elif kind == 'cut':
+            plotted = ~travel
+        else:
+            plotted = np.ones(len(toolpath), dtype=bool)
+
         if tooldia == 0:
-            for geo in gcode_parsed:
-                if not geo:
-                    continue
-                if kind == 'all':
-                    obj.add_shape(shape=geo['geom'], color=color[geo['kind'][0]][1], visible=visible)
-                elif kind == 'travel':
-                    if geo['kind'][0] == 'T':
-                        obj.add_shape(shape=geo['geom'], color=color['T'][1], visible=visible)
-                elif kind == 'cut':
-                    if geo['kind'][0] == 'C':
-                        obj.add_shape(shape=geo['geom'], color=color['C'][1], visible=visible)
+            for geom, is_travel in zip(toolpath.geometries(plotted), travel[plotted]):
+                geo_kind = 'T' if is_travel else 'C'
+                obj.add_shape(shape=geom, color=color[geo_kind][1], visible=visible)
         else:
             path_num = 0
 
             self.coordinates_type = self.app.options["cncjob_coords_type"]
             if self.coordinates_type == "G90":
                 # For Absolute coordinates type G90
-                for geo in gcode_parsed:
-                    if not geo:
-                        continue
-
-                    if geo['kind'][0] == 'T':
-                        start_position = geo['geom'].coords[0]
-
-                        if tooldia not in obj.annotations_dict:
-                            obj.annotations_dict[tooldia] = {
-                                'pos': [],
-                                'text': []
-                            }
-                        if start_position not in obj.annotations_dict[tooldia]['pos']:
-                            path_num += 1
-                            obj.annotations_dict[tooldia]['pos'].append(start_position)
-                            obj.annotations_dict[tooldia]['text'].append(str(path_num))
-
-                        end_position = geo['geom'].coords[-1]
-
-                        if tooldia not in obj.annotations_dict:
-                            obj.annotations_dict[tooldia] = {
-                                'pos': [],
-                                'text': []
-                            }
-                        if end_position not in obj.annotations_dict[tooldia]['pos']:
+                if travel.any() and tooldia not in obj.annotations_dict:
+                    obj.annotations_dict[tooldia] = {
+                        'pos': [],
+                        'text': []
+                    }
+                annotations = obj.annotations_dict.get(tooldia, {'pos': []})
+                known_positions = set(annotations['pos'])
+
+                # the start and the end of the travel runs
+                coords = toolpath.coords
+                for index in np.flatnonzero(travel):
+                    for position in (tuple(coords[toolpath.offsets[index]].tolist()),
+                                     tuple(coords[toolpath.offsets[index + 1] - 1].tolist())):
+                        if position not in known_positions:
                             path_num += 1
-                            obj.annotations_dict[tooldia]['pos'].append(end_position)
-                            obj.annotations_dict[tooldia]['text'].append(str(path_num))
+                            known_positions.add(position)
+                            annotations['pos'].append(position)
+                            annotations['text'].append(str(path_num))
+
+                geometries = toolpath.geometries(plotted)
+                plotted_travel = travel[plotted]
+                is_excellon = self.obj_options['type'].lower() == 'excellon'
+
+                # buffer all the runs at once; the Excellon drill holes (the cuts) are plotted as polygons
+                buffered = plotted_travel.copy() if is_excellon else np.ones(len(geometries), dtype=bool)
+                polys = np.empty(len(geometries), dtype=object)
+                polys[buffered] = shapely.simplify(
+                    shapely.buffer(geometries[buffered], tooldia / 1.99999999, quad_segs=int(self.steps_per_circle)),
+                    tool_tolerance
+                )
 
-                    # plot the geometry of Excellon objects
-                    if self.obj_options['type'].lower() == 'excellon':
+                for idx, geom in enumerate(geometries):
+                    geo_kind = 'T' if plotted_travel[idx] else 'C'
+                    if buffered[idx]:
+                        poly = polys[idx]
+                    else:
+                        # plot the drill holes of Excellon objects
                         try:
-                            # if the geos are travel lines
-                            if geo['kind'][0] == 'T':
-                                poly = geo['geom'].buffer((tooldia / 1.99999999), self.steps_per_circle)
-                            else:
-                                poly = Polygon(geo['geom'])
-
-                            poly = poly.simplify(tool_tolerance)
+                            poly = Polygon(geom).simplify(tool_tolerance)
                         except Exception:
                             # deal here with unexpected plot errors due of LineStrings not valid
                             continue
-                    else:
-                        # plot the geometry of any objects other than Excellon
-                        poly = geo['geom'].buffer((tooldia / 1.99999999), self.steps_per_circle)
-                        poly = poly.simplify(tool_tolerance)
 
                     # Plotting the shapes
-                    if kind == 'all':
-                        obj.add_shape(shape=poly, color=color[geo['kind'][0]][1], face_color=color[geo['kind'][0]][0],
-                                      visible=visible, layer=1 if geo['kind'][0] == 'C' else 2)
-                    elif kind == 'travel':
-                        if geo['kind'][0] == 'T':
-                            obj.add_shape(shape=poly, color=color['T'][1], face_color=color['T'][0],
-                                          visible=visible, layer=2)
-                    elif kind == 'cut':
-                        if geo['kind'][0] == 'C':
-                            obj.add_shape(shape=poly, color=color['C'][1], face_color=color['C'][0],
-                                          visible=visible, layer=1)
+                    obj.add_shape(shape=poly, color=color[geo_kind][1], face_color=color[geo_kind][0],
+                                  visible=visible, layer=1 if geo_kind == 'C' else 2)
             else:
                 self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
                 return 'fail'
@@ -6652,7 +7159,7 @@ class CNCjob(Geometry):
         # self.solid_geometry = unary_union([geo['geom'] for geo in self.gcode_parsed])
 
         # This is much faster but not so nice to look at as you can see different segments of the geometry
-        self.solid_geometry = [geo['geom'] for geo in self.gcode_parsed]
+        self.solid_geometry = toolpath_geometries(self.gcode_parsed)
 
         return self.solid_geometry
 
@@ -6721,6 +7228,39 @@ class CNCjob(Geometry):
 
         return path
 
+    def linear_block(self, p, path, z_cut):
+        """
+        The linear motions to all the vertices of a path, formatted at once by the preprocessor when it implements
+        the linear_block() fast path (see appPreProcessor.PreProc.linear_block()).
+
+        :param p:       the preprocessor
+        :param path:    list of the vertices coordinates
+        :param z_cut:   the cut depth
+        :return:        the G-code, the same as doformat(p.linear_code, ...) for each vertex; None when the
+                        preprocessor can not do it and linear_code() has to be used for each vertex
+        :rtype:         str
+        """
+        if not path:
+            return None
+
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+
+        try:
+            coords = np.asarray(path, dtype=np.float64)[:, :2]
+        except (ValueError, IndexError):
+            return None
+
+        attributes = AttrDict()
+        attributes.update(self.postdata)
+        attributes.update(z_cut=z_cut)
+        try:
+            return p.linear_block(coords, attributes)
+        except Exception:
+            self.app.log.error('Exception occurred within a preprocessor: ' + traceback.format_exc())
+            return None
+
     def linear2gcode(self, linear, dia, tolerance=0, down=True, up=True, z_cut=None, z_move=None, zdownrate=None,
                      feedrate=None, feedrate_z=None, feedrate_rapid=None, cont=False, old_point=(0, 0)):
         """
@@ -6771,7 +7311,7 @@ class CNCjob(Geometry):
         else:
             target_linear = linear
 
-        gcode = ""
+        gcode = GCodeEmitter()
 
         # path = list(target_linear.coords)
         path = self.segment(target_linear.coords)
@@ -6838,31 +7378,38 @@ class CNCjob(Geometry):
         # Cutting...
         prev_x = first_x
         prev_y = first_y
-        for pt in path[1:]:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
+        # the preprocessor may format the linear motions to all the vertices at once
+        block = self.linear_block(p, path[1:], z_cut) if self.coordinates_type == "G90" else None
+        if block is not None:
+            gcode += block
+            prev_x = path[-1][0]
+            prev_y = path[-1][1]
+        else:
+            for pt in path[1:]:
+                if self.app.abort_flag:
+                    # graceful abort requested by the user
+                    raise grace
 
-            if self.coordinates_type == "G90":
-                # For Absolute coordinates type G90
-                next_x = pt[0]
-                next_y = pt[1]
-            else:
-                # For Incremental coordinates type G91
-                # next_x = pt[0] - prev_x
-                # next_y = pt[1] - prev_y
-                self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
-                next_x = pt[0]
-                next_y = pt[1]
+                if self.coordinates_type == "G90":
+                    # For Absolute coordinates type G90
+                    next_x = pt[0]
+                    next_y = pt[1]
+                else:
+                    # For Incremental coordinates type G91
+                    # next_x = pt[0] - prev_x
+                    # next_y = pt[1] - prev_y
+                    self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
+                    next_x = pt[0]
+                    next_y = pt[1]
 
-            gcode += self.doformat(p.linear_code, x=next_x, y=next_y, z_cut=z_cut)  # Linear motion to point
-            prev_x = pt[0]
-            prev_y = pt[1]
+                gcode += self.doformat(p.linear_code, x=next_x, y=next_y, z_cut=z_cut)  # Linear motion to point
+                prev_x = pt[0]
+                prev_y = pt[1]
 
         # Up to travelling height.
         if up:
             gcode += self.doformat(p.lift_code, x=prev_x, y=prev_y, z_move=z_move)  # Stop cutting
-        return gcode
+        return gcode.getvalue()
 
     def linear2gcode_extra(self, linear, dia, extracut_length, tolerance=0, down=True, up=True,
                            z_cut=None, z_move=None, zdownrate=None,
@@ -6917,7 +7464,7 @@ class CNCjob(Geometry):
         else:
             target_linear = linear
 
-        gcode = ""
+        gcode = GCodeEmitter()
 
         # path = list(target_linear.coords)
         path = self.segment(target_linear.coords)
@@ -6986,27 +7533,34 @@ class CNCjob(Geometry):
         # Cutting...
         prev_x = first_x
         prev_y = first_y
-        for pt in path[1:]:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
+        # the preprocessor may format the linear motions to all the vertices at once
+        block = self.linear_block(p, path[1:], z_cut) if self.coordinates_type == "G90" else None
+        if block is not None:
+            gcode += block
+            prev_x = path[-1][0]
+            prev_y = path[-1][1]
+        else:
+            for pt in path[1:]:
+                if self.app.abort_flag:
+                    # graceful abort requested by the user
+                    raise grace
 
-            if self.coordinates_type == "G90":
-                # For Absolute coordinates type G90
-                next_x = pt[0]
-                next_y = pt[1]
-            else:
-                # For Incremental coordinates type G91
-                # For Incremental coordinates type G91
-                # next_x = pt[0] - prev_x
-                # next_y = pt[1] - prev_y
-                self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
-                next_x = pt[0]
-                next_y = pt[1]
+                if self.coordinates_type == "G90":
+                    # For Absolute coordinates type G90
+                    next_x = pt[0]
+                    next_y = pt[1]
+                else:
+                    # For Incremental coordinates type G91
+                    # For Incremental coordinates type G91
+                    # next_x = pt[0] - prev_x
+                    # next_y = pt[1] - prev_y
+                    self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
+                    next_x = pt[0]
+                    next_y = pt[1]
 
-            gcode += self.doformat(p.linear_code, x=next_x, y=next_y, z_cut=z_cut)  # Linear motion to point
-            prev_x = next_x
-            prev_y = next_y
+                gcode += self.doformat(p.linear_code, x=next_x, y=next_y, z_cut=z_cut)  # Linear motion to point
+                prev_x = next_x
+                prev_y = next_y
 
         # this line is added to create an extra cut over the first point in patch
         # to make sure that we remove the copper leftovers
@@ -7110,7 +7664,7 @@ class CNCjob(Geometry):
         if up:
             gcode += self.doformat(p.lift_code, x=last_pt[0], y=last_pt[1], z_move=z_move)  # Stop cutting
 
-        return gcode
+        return gcode.getvalue()
 
     def point2gcode(self, point, dia, z_move=None, old_point=(0, 0)):
         """
@@ -7126,7 +7680,7 @@ class CNCjob(Geometry):
         :return:                    G-code to cut on the Point feature.
         :rtype:                     str
         """
-        gcode = ""
+        gcode = GCodeEmitter()
 
         if self.app.abort_flag:
             # graceful abort requested by the user
@@ -7194,7 +7748,7 @@ class CNCjob(Geometry):
             gcode += self.doformat(p.down_code, x=first_x, y=first_y, z_cut=self.z_cut)  # Start cutting
 
         gcode += self.doformat(p.lift_code, x=first_x, y=first_y)  # Stop cutting
-        return gcode
+        return gcode.getvalue()
 
     def export_svg(self, scale_stroke_factor=0.00,
                    scale_factor_x=None, scale_factor_y=None,
@@ -7233,46 +7787,39 @@ class CNCjob(Geometry):
 
         # Separate the list of cuts and travels into 2 distinct lists
         # This way we can add different formatting / colors to both
-        cuts = []
-        travels = []
         cutsgeom = ''
         travelsgeom = ''
 
-        for g in self.gcode_parsed:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
-
-            if g['kind'][0] == 'C':
-                cuts.append(g)
-            if g['kind'][0] == 'T':
-                travels.append(g)
+        toolpath = Toolpath.from_parsed(self.gcode_parsed)
+        geometries = toolpath.geometries()
+        travels = geometries[toolpath.travel]
+        cuts = geometries[~toolpath.travel]
 
         # Used to determine the overall board size
-        self.solid_geometry = unary_union([geo['geom'] for geo in self.gcode_parsed])
+        self.solid_geometry = unary_union(geometries)
 
         # Convert the cuts and travels into single geometry objects we can render as svg xml
-        if travels:
-            travelsgeom = unary_union([geo['geom'] for geo in travels])
+        if len(travels):
+            travelsgeom = unary_union(travels)
 
         if self.app.abort_flag:
             # graceful abort requested by the user
             raise grace
 
-        if cuts:
-            cutsgeom = unary_union([geo['geom'] for geo in cuts])
+        if len(cuts):
+            cutsgeom = unary_union(cuts)
 
         # Render the SVG Xml
         # The scale factor affects the size of the lines, and the stroke color adds different formatting for each set
         # It's better to have the travels sitting underneath the cuts for visicut
         svg_elem = ""
-        if travels:
+        if len(travels):
             svg_elem = travelsgeom.svg(scale_factor=scale_stroke_factor, stroke_color="#F0E24D")
-        if cuts:
+        if len(cuts):
             svg_elem += cutsgeom.svg(scale_factor=scale_stroke_factor, stroke_color="#5E6CFF")
 
         # if both are true then we need a root element <g>
-        if travels and cuts:
+        if len(travels) and len(cuts):
             svg_elem = "<g>" + svg_elem + "</g>"
 
         return svg_elem
@@ -7378,6 +7925,40 @@ class CNCjob(Geometry):
             bounds_coords = minx, miny, maxx, maxy
         return bounds_coords
 
+    def transform_gcode_parsed(self, gcode_parsed, matrix):
+        """
+        Applies an affine transformation to the parsed G-code, in place.
+
+        :param gcode_parsed:    a Toolpath or a list of dictionaries {"geom": geometry, "kind": kind} (or of their
+                                ToolpathRun views)
+        :param matrix:          the 2D affine transformation matrix [a, b, d, e, xoff, yoff]
+        :return:                None
+        """
+        if isinstance(gcode_parsed, Toolpath):
+            gcode_parsed.affine_transform(matrix)
+            return
+
+        # variables to display the percentage of work done
+        self.geo_len = 0
+        try:
+            self.geo_len = len(gcode_parsed)
+        except TypeError:
+            self.geo_len = 1
+        self.old_disp_number = 0
+        self.el_count = 0
+
+        for g in gcode_parsed:
+            try:
+                g['geom'] = affinity.affine_transform(g['geom'], matrix)
+            except AttributeError:
+                return
+
+            self.el_count += 1
+            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
+            if self.old_disp_number < disp_number <= 100:
+                self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                self.old_disp_number = disp_number
+
     # TODO This function should be replaced at some point with a "real" function. Until then it's an ugly hack ...
     def scale(self, xfactor, yfactor=None, point=None):
         """
@@ -7511,27 +8092,8 @@ class CNCjob(Geometry):
             # offset Gcode
             self.gcode = scale_g(self.gcode)
 
-            # variables to display the percentage of work done
-            self.geo_len = 0
-            try:
-                self.geo_len = len(self.gcode_parsed)
-            except TypeError:
-                self.geo_len = 1
-            self.old_disp_number = 0
-            self.el_count = 0
-
             # scale geometry
-            for g in self.gcode_parsed:
-                try:
-                    g['geom'] = affinity.scale(g['geom'], xfactor, yfactor, origin=(px, py))
-                except AttributeError:
-                    return g['geom']
-
-                self.el_count += 1
-                disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                if self.old_disp_number < disp_number <= 100:
-                    self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                    self.old_disp_number = disp_number
+            self.transform_gcode_parsed(self.gcode_parsed, Toolpath.scale_matrix(xfactor, yfactor, (px, py)))
 
             self.create_geometry()
         else:
@@ -7540,29 +8102,10 @@ class CNCjob(Geometry):
                 # scale Gcode
                 v['gcode'] = scale_g(v['gcode'])
 
-                # variables to display the percentage of work done
-                self.geo_len = 0
-                try:
-                    self.geo_len = len(v['gcode_parsed'])
-                except TypeError:
-                    self.geo_len = 1
-                self.old_disp_number = 0
-                self.el_count = 0
-
                 # scale gcode_parsed
-                for g in v['gcode_parsed']:
-                    try:
-                        g['geom'] = affinity.scale(g['geom'], xfactor, yfactor, origin=(px, py))
-                    except AttributeError:
-                        return g['geom']
-
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
+                self.transform_gcode_parsed(v['gcode_parsed'], Toolpath.scale_matrix(xfactor, yfactor, (px, py)))
 
-                v['solid_geometry'] = unary_union([geo['geom'] for geo in v['gcode_parsed']])
+                v['solid_geometry'] = unary_union(toolpath_geometries(v['gcode_parsed']))
         self.create_geometry()
         self.app.proc_container.new_text = ''
 
@@ -7620,27 +8163,8 @@ class CNCjob(Geometry):
             # offset Gcode
             self.gcode = offset_g(self.gcode)
 
-            # variables to display the percentage of work done
-            self.geo_len = 0
-            try:
-                self.geo_len = len(self.gcode_parsed)
-            except TypeError:
-                self.geo_len = 1
-            self.old_disp_number = 0
-            self.el_count = 0
-
             # offset geometry
-            for g in self.gcode_parsed:
-                try:
-                    g['geom'] = affinity.translate(g['geom'], xoff=dx, yoff=dy)
-                except AttributeError:
-                    return g['geom']
-
-                self.el_count += 1
-                disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                if self.old_disp_number < disp_number <= 100:
-                    self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                    self.old_disp_number = disp_number
+            self.transform_gcode_parsed(self.gcode_parsed, Toolpath.translate_matrix(dx, dy))
 
             self.create_geometry()
         else:
@@ -7649,30 +8173,11 @@ class CNCjob(Geometry):
                 # offset Gcode
                 v['gcode'] = offset_g(v['gcode'])
 
-                # variables to display the percentage of work done
-                self.geo_len = 0
-                try:
-                    self.geo_len = len(v['gcode_parsed'])
-                except TypeError:
-                    self.geo_len = 1
-                self.old_disp_number = 0
-                self.el_count = 0
-
                 # offset gcode_parsed
-                for g in v['gcode_parsed']:
-                    try:
-                        g['geom'] = affinity.translate(g['geom'], xoff=dx, yoff=dy)
-                    except AttributeError:
-                        return g['geom']
-
-                    self.el_count += 1
-                    disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-                    if self.old_disp_number < disp_number <= 100:
-                        self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                        self.old_disp_number = disp_number
+                self.transform_gcode_parsed(v['gcode_parsed'], Toolpath.translate_matrix(dx, dy))
 
                 # for the bounding box
-                v['solid_geometry'] = unary_union([geo['geom'] for geo in v['gcode_parsed']])
+                v['solid_geometry'] = unary_union(toolpath_geometries(v['gcode_parsed']))
 
         self.app.proc_container.new_text = ''
 
@@ -7689,26 +8194,7 @@ class CNCjob(Geometry):
         px, py = point
         xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
 
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.gcode_parsed)
-        except TypeError:
-            self.geo_len = 1
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        for g in self.gcode_parsed:
-            try:
-                g['geom'] = affinity.scale(g['geom'], xscale, yscale, origin=(px, py))
-            except AttributeError:
-                return g['geom']
-
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
+        self.transform_gcode_parsed(self.gcode_parsed, Toolpath.scale_matrix(xscale, yscale, (px, py)))
 
         self.create_geometry()
         self.app.proc_container.new_text = ''
@@ -7732,26 +8218,7 @@ class CNCjob(Geometry):
 
         px, py = point
 
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.gcode_parsed)
-        except TypeError:
-            self.geo_len = 1
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        for g in self.gcode_parsed:
-            try:
-                g['geom'] = affinity.skew(g['geom'], angle_x, angle_y, origin=(px, py))
-            except AttributeError:
-                return g['geom']
-
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
+        self.transform_gcode_parsed(self.gcode_parsed, Toolpath.skew_matrix(angle_x, angle_y, (px, py)))
 
         self.create_geometry()
         self.app.proc_container.new_text = ''
@@ -7768,26 +8235,7 @@ class CNCjob(Geometry):
 
         px, py = point
 
-        # variables to display the percentage of work done
-        self.geo_len = 0
-        try:
-            self.geo_len = len(self.gcode_parsed)
-        except TypeError:
-            self.geo_len = 1
-        self.old_disp_number = 0
-        self.el_count = 0
-
-        for g in self.gcode_parsed:
-            try:
-                g['geom'] = affinity.rotate(g['geom'], angle, origin=(px, py))
-            except AttributeError:
-                return g['geom']
-
-            self.el_count += 1
-            disp_number = int(np.interp(self.el_count, [0, self.geo_len], [0, 100]))
-            if self.old_disp_number < disp_number <= 100:
-                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                self.old_disp_number = disp_number
+        self.transform_gcode_parsed(self.gcode_parsed, Toolpath.rotate_matrix(angle, (px, py)))
 
         self.create_geometry()
         self.app.proc_container.new_text = ''
@@ -7844,6 +8292,716 @@ def get_bounds(geometry_list: list) -> list:
     return [xmin, ymin, xmax, ymax]
 
 
+def find_clearance_violations(geometry_list: list, clearance: float, other_list: list = None) -> list:
+    """
+    Find the pairs of geometries that are closer than the clearance value. A STRtree spatial index is queried with
+    the 'dwithin' predicate so only the candidate pairs located near each other are measured.
+
+    :param geometry_list:   List of Shapely geometries
+    :param clearance:       The minimum allowed distance between two geometries
+    :param other_list:      If given, the geometries in geometry_list are checked against the ones in this list.
+                            If None, the geometries in geometry_list are checked against each other
+    :return:                A list of tuples (index, other_index, distance, location) where location is the (x, y)
+                            middle point of the shortest line between the two geometries
+    """
+    geo_arr = np.asarray(geometry_list, dtype=object)
+    if other_list is None:
+        other_arr = geo_arr
+    else:
+        other_arr = np.asarray(other_list, dtype=object)
+
+    if geo_arr.size == 0 or other_arr.size == 0:
+        return []
+
+    tree = shapely.STRtree(other_arr)
+    idx_geo, idx_other = tree.query(geo_arr, predicate='dwithin', distance=float(clearance))
+
+    if other_list is None:
+        # each pair is reported once and a geometry is not checked against itself
+        mask = idx_geo < idx_other
+        idx_geo = idx_geo[mask]
+        idx_other = idx_other[mask]
+
+    dist_arr = shapely.distance(geo_arr[idx_geo], other_arr[idx_other])
+    mask = dist_arr < float(clearance)
+    idx_geo = idx_geo[mask]
+    idx_other = idx_other[mask]
+    dist_arr = dist_arr[mask]
+
+    if dist_arr.size == 0:
+        return []
+
+    lines = shapely.shortest_line(geo_arr[idx_geo], other_arr[idx_other])
+    coords = shapely.get_coordinates(lines).reshape(-1, 2, 2)
+    locations = (coords[:, 0, :] + coords[:, 1, :]) / 2.0
+
+    return [
+        (int(i_geo), int(i_other), float(dist), (float(loc[0]), float(loc[1])))
+        for i_geo, i_other, dist, loc in zip(idx_geo, idx_other, dist_arr, locations)
+    ]
+
+
+def find_nearest_pairs(geometry_list: list, k: int = 1, tolerance: float = 0.0, batch_size: int = 1000,
+                       callback=None) -> list:
+    """
+    Find the k pairs of geometries that are closest to each other. The nearest neighbour of each geometry is found
+    with a STRtree query, which gives an upper limit for the k-th smallest distance; only the pairs within that limit
+    are measured afterwards, with vectorized Shapely functions.
+
+    :param geometry_list:   List of Shapely geometries
+    :param k:               How many of the closest pairs to return. Pairs at the same distance as the k-th pair
+                            are also returned
+    :param tolerance:       The pairs that are farther than the k-th pair by at most this value are also returned,
+                            so no pair is lost when the distances are rounded afterwards
+    :param batch_size:      How many geometries are processed in one vectorized call
+    :param callback:        Function called after each batch with the progress percentage as parameter. It can
+                            raise an exception (e.g. grace) to abort the search
+    :return:                A list of tuples (distance, (x0, y0), (x1, y1)) sorted by distance, where (x0, y0) and
+                            (x1, y1) are the nearest points of the two geometries
+    """
+    geo_arr = np.asarray(geometry_list, dtype=object)
+    geo_len = len(geo_arr)
+    if geo_len < 2 or k < 1:
+        return []
+
+    tree = shapely.STRtree(geo_arr)
+    # the search is done in two passes over the geometries, each reporting half of the progress
+    total_steps = 2 * geo_len
+
+    nn_dist = np.full(geo_len, np.inf)
+    for start in range(0, geo_len, batch_size):
+        stop = min(start + batch_size, geo_len)
+        (idx_geo, __), dist_arr = tree.query_nearest(geo_arr[start:stop], return_distance=True, exclusive=True)
+        np.minimum.at(nn_dist, idx_geo + start, dist_arr)
+        if callback is not None:
+            callback(int(stop * 100 / total_steps))
+
+    # every pair shows up at most twice between the nearest neighbour distances so among the smallest 2 * k of
+    # them there are at least k distinct pairs
+    nn_dist = np.sort(nn_dist[np.isfinite(nn_dist)])
+    if nn_dist.size == 0:
+        return []
+    limit = nn_dist[min(2 * k, nn_dist.size) - 1] + tolerance
+
+    idx_geo_list = []
+    idx_other_list = []
+    dist_list = []
+    for start in range(0, geo_len, batch_size):
+        stop = min(start + batch_size, geo_len)
+        idx_geo, idx_other = tree.query(geo_arr[start:stop], predicate='dwithin', distance=limit)
+        idx_geo += start
+        mask = idx_geo < idx_other
+        idx_geo = idx_geo[mask]
+        idx_other = idx_other[mask]
+
+        idx_geo_list.append(idx_geo)
+        idx_other_list.append(idx_other)
+        dist_list.append(shapely.distance(geo_arr[idx_geo], geo_arr[idx_other]))
+        if callback is not None:
+            callback(int((geo_len + stop) * 100 / total_steps))
+
+    idx_geo = np.concatenate(idx_geo_list)
+    idx_other = np.concatenate(idx_other_list)
+    dist_arr = np.concatenate(dist_list)
+    if dist_arr.size == 0:
+        return []
+
+    order = np.argsort(dist_arr, kind='stable')
+    kth_dist = dist_arr[order[min(k, order.size) - 1]]
+    order = order[dist_arr[order] <= kth_dist + tolerance]
+
+    lines = shapely.shortest_line(geo_arr[idx_geo[order]], geo_arr[idx_other[order]])
+    coords = shapely.get_coordinates(lines).reshape(-1, 2, 2)
+
+    return [
+        (float(dist), (float(pts[0][0]), float(pts[0][1])), (float(pts[1][0]), float(pts[1][1])))
+        for dist, pts in zip(dist_arr[order], coords)
+    ]
+
+
+def buffer_geometry_batched(geometry_list: list, distance: float, quad_segs: int = 16, join_style=1,
+                            batch_size: int = 2000, callback=None) -> np.ndarray:
+    """
+    Buffer a list of geometries with vectorized Shapely calls, one call for each batch of geometries. The
+    shapely.buffer() function releases the GIL while it works on a batch.
+
+    :param geometry_list:   List of Shapely geometries
+    :param distance:        The buffer distance
+    :param quad_segs:       Number of segments used to approximate a quarter of circle
+    :param join_style:      The join style of the buffer (1 = round, 2 = mitre, 3 = bevel)
+    :param batch_size:      How many geometries are buffered in one vectorized call
+    :param callback:        Function called after each batch with the progress percentage as parameter. It can
+                            raise an exception (e.g. grace) to abort the buffering
+    :return:                A numpy array of the buffered geometries, in the order of the geometry_list
+    """
+    geo_arr = np.asarray(geometry_list, dtype=object)
+    geo_len = len(geo_arr)
+    if geo_len == 0:
+        return geo_arr
+
+    buffered_arr = np.empty(geo_len, dtype=object)
+    for start in range(0, geo_len, batch_size):
+        stop = min(start + batch_size, geo_len)
+        buffered_arr[start:stop] = shapely.buffer(geo_arr[start:stop], distance, quad_segs=int(quad_segs),
+                                                  join_style=join_style)
+        if callback is not None:
+            callback(int(stop * 100 / geo_len))
+
+    return buffered_arr
+
+
+def union_cascaded(geometry_list, chunk_size: int = 1000, callback=None):
+    """
+    Make the union of a list of geometries in chunks. The geometries are sorted by their location so each chunk holds
+    geometries that are near each other and the partial unions overlap only at the chunk borders; the partial unions
+    are joined in a last union call.
+
+    :param geometry_list:   List (or numpy array) of Shapely geometries
+    :param chunk_size:      How many geometries are joined in one union call
+    :param callback:        Function called after each chunk union with the progress percentage as parameter. It can
+                            raise an exception (e.g. grace) to abort the union
+    :return:                The union geometry
+    """
+    geo_arr = np.asarray(geometry_list, dtype=object)
+    if geo_arr.size:
+        geo_arr = geo_arr[~shapely.is_empty(geo_arr)]
+
+    if geo_arr.size <= chunk_size:
+        union_geo = unary_union(geo_arr.tolist())
+        if callback is not None:
+            callback(100)
+        return union_geo
+
+    chunks_nr = int(math.ceil(geo_arr.size / chunk_size))
+
+    # spatially coherent chunks: the bounding box centers are sorted in a grid of about chunks_nr tiles, column by
+    # column, going up and down alternatively, so consecutive geometries are near each other
+    bounds = shapely.bounds(geo_arr)
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2.0
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2.0
+    tiles_nr = int(math.ceil(math.sqrt(chunks_nr)))
+    tile_x = np.minimum(((cx - cx.min()) / (np.ptp(cx) or 1.0) * tiles_nr).astype(int), tiles_nr - 1)
+    tile_y = np.minimum(((cy - cy.min()) / (np.ptp(cy) or 1.0) * tiles_nr).astype(int), tiles_nr - 1)
+    tile_y = np.where(tile_x % 2 == 1, tiles_nr - 1 - tile_y, tile_y)
+    geo_arr = geo_arr[np.lexsort((cy, tile_y, tile_x))]
+
+    # the last union of the partial unions counts as one more step
+    total_steps = chunks_nr + 1
+
+    partial_list = []
+    for start in range(0, geo_arr.size, chunk_size):
+        partial_list.append(shapely.union_all(geo_arr[start:start + chunk_size]))
+        if callback is not None:
+            callback(int(len(partial_list) * 100 / total_steps))
+
+    union_geo = shapely.union_all(partial_list)
+    if callback is not None:
+        callback(100)
+    return union_geo
+
+
+def union_tile_task(geometries, buffer_distance=0.0):
+    """
+    Make the union of the geometries of one tile. Runs in a worker process of the App.pool.
+
+    :param geometries:      numpy array of Shapely geometries
+    :param buffer_distance: if non-zero the union is made by buffering out and in with this distance (which also
+                            closes the gaps narrower than twice the distance) instead of a union call
+    :return:                The union geometry
+    """
+    if buffer_distance:
+        return shapely.MultiPolygon(list(geometries)).buffer(buffer_distance).buffer(-buffer_distance)
+    return shapely.union_all(geometries)
+
+
+def union_tiled(geometry_list, pool=None, tile_size: int = 2000, buffer_distance: float = 0.0, callback=None):
+    """
+    Make the union of a list of geometries on a grid of tiles. Each geometry is assigned to the tile holding the
+    center of its bounding box, the union of each tile is made in the processes of the pool and then the tiles are
+    stitched: only the union parts that reach the border of their tile (and the parts of other tiles that they
+    intersect) are joined again, the parts inside their tile are kept as they are.
+
+    :param geometry_list:   List (or numpy array) of Shapely geometries
+    :param pool:            a multiprocessing Pool (the App.pool). If None, or if there are no more than tile_size
+                            geometries, the union is made here with one union call
+    :param tile_size:       the approximate number of geometries in a tile
+    :param buffer_distance: if non-zero the union of each tile is made by buffering; see union_tile_task()
+    :param callback:        Function called while waiting for the tiles with the progress percentage as parameter.
+                            It can raise an exception (e.g. grace) to abort the union
+    :return:                The union geometry
+    """
+    geo_arr = np.asarray(flatten_shapely_geometry(geometry_list), dtype=object)
+    if geo_arr.size:
+        geo_arr = geo_arr[~shapely.is_empty(geo_arr)]
+
+    if pool is None or geo_arr.size <= tile_size:
+        union_geo = union_tile_task(geo_arr, buffer_distance=buffer_distance)
+        if callback is not None:
+            callback(100)
+        return union_geo
+
+    # the grid covers the whole bounds, so the parts inside the outer tiles are not taken for seam parts
+    bounds = shapely.bounds(geo_arr)
+    minx, miny = bounds[:, 0].min(), bounds[:, 1].min()
+    maxx, maxy = bounds[:, 2].max(), bounds[:, 3].max()
+    tiles_nr = int(math.ceil(math.sqrt(geo_arr.size / tile_size)))
+    step_x = ((maxx - minx) / tiles_nr) or 1.0
+    step_y = ((maxy - miny) / tiles_nr) or 1.0
+    tile_x = np.minimum(((bounds[:, 0] + bounds[:, 2]) / 2.0 - minx) // step_x, tiles_nr - 1).astype(int)
+    tile_y = np.minimum(((bounds[:, 1] + bounds[:, 3]) / 2.0 - miny) // step_y, tiles_nr - 1).astype(int)
+    tile_idx = tile_x * tiles_nr + tile_y
+
+    pending = []
+    for tile in np.unique(tile_idx):
+        res = pool.apply_async(union_tile_task, args=(geo_arr[tile_idx == tile], buffer_distance))
+        pending.append((tile, res))
+
+    # the stitch counts as one more step
+    total_steps = len(pending) + 1
+
+    inner_parts = []
+    seam_parts = []
+    for done, (tile, res) in enumerate(pending, start=1):
+        while not res.ready():
+            if callback is not None:
+                callback(int((done - 1) * 100 / total_steps))
+            res.wait(0.1)
+
+        parts = shapely.get_parts(res.get())
+        if parts.size == 0:
+            continue
+
+        # the parts that reach the tile border may overlap the parts of the neighbouring tiles
+        tile_minx = minx + (tile // tiles_nr) * step_x
+        tile_miny = miny + (tile % tiles_nr) * step_y
+        part_bounds = shapely.bounds(parts)
+        inside = (part_bounds[:, 0] > tile_minx) & (part_bounds[:, 1] > tile_miny) & \
+                 (part_bounds[:, 2] < tile_minx + step_x) & (part_bounds[:, 3] < tile_miny + step_y)
+        inner_parts.append(parts[inside])
+        seam_parts.append(parts[~inside])
+
+    inner_arr = np.concatenate(inner_parts) if inner_parts else np.empty(0, dtype=object)
+    seam_arr = np.concatenate(seam_parts) if seam_parts else np.empty(0, dtype=object)
+
+    if seam_arr.size and inner_arr.size:
+        # the inner parts touched by a seam part of another tile are joined with the seam parts
+        __, touched_idx = shapely.STRtree(inner_arr).query(seam_arr, predicate='intersects')
+        touched = np.zeros(inner_arr.size, dtype=bool)
+        touched[touched_idx] = True
+        seam_arr = np.concatenate([seam_arr, inner_arr[touched]])
+        inner_arr = inner_arr[~touched]
+
+    stitched = shapely.get_parts(shapely.union_all(seam_arr)) if seam_arr.size else np.empty(0, dtype=object)
+
+    # the parts do not overlap anymore, so they are only collected, like union_all() does
+    parts = np.concatenate([inner_arr, stitched])
+    if parts.size == 1:
+        union_geo = parts[0]
+    elif (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON).all():
+        union_geo = shapely.multipolygons(parts)
+    else:
+        union_geo = shapely.GeometryCollection(list(parts))
+    if callback is not None:
+        callback(100)
+    return union_geo
+
+
+def clear_polygon_shrink_paths(polygon, tooldia, steps_per_circle, overlap=0.15, loop_callback=None,
+                               plot_callback=None):
+    """
+    Creates the toolpaths inside a polygon for a tool to cover the whole area, by shrinking the edges of the polygon
+    and taking the resulting edges as toolpaths. It does not use the GUI so it can run in a worker process.
+
+    :param polygon:             Polygon to clear.
+    :param tooldia:             Diameter of the tool.
+    :param steps_per_circle:    number of linear segments to be used to approximate a circle
+    :param overlap:             Overlap of toolpasses.
+    :param loop_callback:       Function without parameters called in each iteration. It can raise an exception
+                                (e.g. grace) to abort the clearing
+    :param plot_callback:       Function called with the list of toolpaths made in each iteration
+    :return:                    The toolpaths, not connected
+    :rtype:                     AppRTreeStorage
+    """
+
+    # The toolpaths
+    # Index first and last points in paths
+    def get_pts(o):
+        return [o.coords[0], o.coords[-1]]
+
+    geoms = AppRTreeStorage()
+    geoms.get_points = get_pts
+
+    # Can only result in a Polygon or MultiPolygon
+    # NOTE: The resulting polygon can be "empty".
+    current = polygon.buffer((-tooldia / 2), int(steps_per_circle))
+    current = flatten_shapely_geometry(current)
+
+    for p in current:
+        geoms.insert(p.exterior)
+        for i in p.interiors:
+            geoms.insert(i)
+
+    for cl_pol in current:
+        while True:
+            if loop_callback is not None:
+                loop_callback()
+
+            cl_pol = cl_pol.buffer(-tooldia * (1 - overlap), int(steps_per_circle))
+            cl_pol_list = flatten_shapely_geometry(cl_pol)
+
+            added_paths = []
+            for tiny_pol in cl_pol_list:
+                if tiny_pol.area > 0:
+                    added_paths.append(tiny_pol.exterior)
+                    added_paths += list(tiny_pol.interiors)
+            if not added_paths:
+                break
+
+            for path in added_paths:
+                geoms.insert(path)
+            if plot_callback is not None:
+                plot_callback(added_paths)
+
+            cl_pol = unary_union(cl_pol_list)
+
+    return geoms
+
+
+def clear_polygon_seed_paths(polygon_to_clear, tooldia, steps_per_circle, seedpoint=None, overlap=0.15,
+                             contour=True, simplify_tol=0.0, loop_callback=None, plot_callback=None):
+    """
+    Creates the toolpaths inside a polygon for a tool to cover the whole area, by starting with a seed point inside
+    the polygon and drawing circles around it. Arcs inside the polygons are valid cuts. Finalizes by cutting around
+    the inside edge of the polygon. It does not use the GUI so it can run in a worker process.
+
+    :param polygon_to_clear:    Shapely.geometry.Polygon
+    :param tooldia:             Diameter of the tool
+    :param steps_per_circle:    how many linear segments to use to approximate a circle
+    :param seedpoint:           Shapely.geometry.Point or None
+    :param overlap:             Tool fraction overlap between passes
+    :param contour:             Cut contour inside the polygon.
+    :param simplify_tol:        if non-zero then simplify the toolpaths
+    :param loop_callback:       Function without parameters called in each iteration. It can raise an exception
+                                (e.g. grace) to abort the clearing
+    :param plot_callback:       Function called with the list of toolpaths made in each iteration
+    :return:                    The toolpaths, not connected
+    :rtype:                     AppRTreeStorage | None
+    """
+
+    # Current buffer radius
+    radius = tooldia / 2 * (1 - overlap)
+
+    # ## The toolpaths
+    # Index first and last points in paths
+    def get_pts(o):
+        return [o.coords[0], o.coords[-1]]
+
+    geom_elems = AppRTreeStorage()
+    geom_elems.get_points = get_pts
+
+    # Path margin
+    path_margin = polygon_to_clear.buffer(-tooldia / 2, int(steps_per_circle))
+    path_margin = flatten_shapely_geometry(path_margin, simplify_tolerance=simplify_tol)
+    path_margin = MultiPolygon(path_margin)
+
+    if path_margin.is_empty or path_margin is None:
+        return None
+
+    # Estimate good seedpoint if not provided.
+    if seedpoint is None:
+        seedpoint = path_margin.representative_point()
+
+    # Grow from seed until outside the box. The polygons will
+    # never have an interior, so take the exterior LinearRing.
+    while True:
+        if loop_callback is not None:
+            loop_callback()
+
+        path = Point(seedpoint).buffer(radius, int(steps_per_circle)).exterior
+        path = path.simplify(simplify_tol)
+        path = path.intersection(path_margin)
+
+        # Touches polygon?
+        if path.is_empty:
+            break
+
+        # path can be a collection of paths.
+        path_geometry = flatten_shapely_geometry(path, simplify_tolerance=simplify_tol)
+        for p in path_geometry:
+            geom_elems.insert(p)
+        if plot_callback is not None:
+            plot_callback(path_geometry)
+
+        radius += tooldia * (1 - overlap)
+
+    # Clean inside edges (contours) of the original polygon
+    if contour:
+        buffered_poly = autolist(polygon_to_clear.buffer(-tooldia / 2, int(steps_per_circle)))
+        buffered_poly = [x.simplify(simplify_tol) for x in buffered_poly]
+        outer_edges = [x.exterior for x in buffered_poly]
+
+        inner_edges = []
+        # Over resulting polygons
+        for x in buffered_poly:
+            for y in x.interiors:  # Over interiors of each polygon
+                inner_edges.append(y)
+
+        contour_paths = [g for g in outer_edges + inner_edges if g and not g.is_empty]
+        for g in contour_paths:
+            geom_elems.insert(g)
+        if plot_callback is not None:
+            plot_callback(contour_paths)
+
+    return geom_elems
+
+
+def clear_polygon_lines_paths(polygon, tooldia, steps_per_circle, overlap=0.15, contour=True, simplify_tol=0.0,
+                              loop_callback=None, plot_callback=None):
+    """
+    Creates the toolpaths inside a polygon for a tool to cover the whole area, by drawing parallel lines inside the
+    polygon. It does not use the GUI so it can run in a worker process.
+
+    :param polygon:             The polygon being painted.
+    :type polygon:              shapely.geometry.Polygon
+    :param tooldia:             Tool diameter.
+    :param steps_per_circle:    how many linear segments to use to approximate a circle
+    :param overlap:             Tool path overlap percentage.
+    :param contour:             Paint around the edges.
+    :param simplify_tol:        if non-zero then simplify the toolpaths
+    :param loop_callback:       Function without parameters called in each iteration. It can raise an exception
+                                (e.g. grace) to abort the clearing
+    :param plot_callback:       Function called with the list of toolpaths made in each iteration
+    :return:                    The toolpaths, not connected
+    :rtype:                     AppRTreeStorage | None
+    """
+
+    if not isinstance(polygon, Polygon):
+        log.debug("camlib.clear_polygon_lines_paths() --> Not a Polygon but %s" % str(type(polygon)))
+        return None
+
+    # The toolpaths
+    # Index first and last points in paths
+    def get_pts(o):
+        return [o.coords[0], o.coords[-1]]
+
+    geoms = AppRTreeStorage()
+    geoms.get_points = get_pts
+
+    lines_trimmed = []
+
+    # Bounding box
+    left, bot, right, top = polygon.bounds
+
+    try:
+        margin_poly = polygon.buffer(-tooldia / 1.99999999, (int(steps_per_circle)))
+        margin_poly = margin_poly.simplify(simplify_tol)
+    except Exception:
+        log.debug("camlib.clear_polygon_lines_paths() --> Could not buffer the Polygon")
+        return None
+
+    # decide the direction of the lines
+    if abs(left - right) >= abs(top - bot):
+        # First line
+        try:
+            y = top - tooldia / 1.99999999
+            while y > bot + tooldia / 1.999999999:
+                if loop_callback is not None:
+                    loop_callback()
+
+                line = LineString([(left, y), (right, y)])
+                line = line.intersection(margin_poly)
+                line = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
+                lines_trimmed += line
+                y -= tooldia * (1 - overlap)
+                if plot_callback is not None:
+                    plot_callback(line)
+
+            # Last line
+            y = bot + tooldia / 2
+            line = LineString([(left, y), (right, y)])
+            line = line.intersection(margin_poly)
+
+            lines_geometry = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
+            lines_trimmed += lines_geometry
+            if plot_callback is not None:
+                plot_callback(lines_geometry)
+        except Exception as e:
+            log.error('camlib.clear_polygon_lines_paths() Processing poly --> %s' % str(e))
+            return None
+    else:
+        # First line
+        try:
+            x = left + tooldia / 1.99999999
+            while x < right - tooldia / 1.999999999:
+                if loop_callback is not None:
+                    loop_callback()
+
+                line = LineString([(x, top), (x, bot)])
+                line = line.intersection(margin_poly)
+                line = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
+                lines_trimmed += line
+                x += tooldia * (1 - overlap)
+                if plot_callback is not None:
+                    plot_callback(line)
+
+            # Last line
+            x = right + tooldia / 2
+            line = LineString([(x, top), (x, bot)])
+            line = line.intersection(margin_poly)
+
+            lines_geometry = flatten_shapely_geometry(line, simplify_tolerance=simplify_tol)
+            lines_trimmed += lines_geometry
+            if plot_callback is not None:
+                plot_callback(lines_geometry)
+        except Exception as e:
+            log.error('camlib.clear_polygon_lines_paths() Processing poly --> %s' % str(e))
+            return None
+
+    lines_trimmed = unary_union(lines_trimmed)
+
+    # Add lines to storage
+    lines_t_geo = flatten_shapely_geometry(lines_trimmed, simplify_tolerance=simplify_tol)
+    for line in lines_t_geo:
+        if isinstance(line, LineString) or isinstance(line, LinearRing):
+            if not line.is_empty:
+                geoms.insert(line)
+        else:
+            log.debug("camlib.clear_polygon_lines_paths(). Not a line: %s" % str(type(line)))
+
+    # Add margin (contour) to storage
+    if contour:
+        contour_paths = []
+        margin_poly_geo = flatten_shapely_geometry(margin_poly, simplify_tolerance=simplify_tol)
+        for poly in margin_poly_geo:
+            if isinstance(poly, Polygon) and not poly.is_empty:
+                contour_paths.append(poly.exterior)
+                contour_paths += list(poly.interiors)
+        for path in contour_paths:
+            geoms.insert(path)
+        if plot_callback is not None:
+            plot_callback(contour_paths)
+
+    return geoms
+
+
+def clear_polygon_task(polygon, tooldia, method, steps_per_circle, overlap=0.15, connect=True, contour=True,
+                       simplify_tol=0.0, as_coords=False):
+    """
+    Creates the toolpaths that clear a polygon. It does not use the GUI so it can be sent to a worker process of
+    the App.pool.
+
+    :param polygon:             Polygon to clear
+    :param tooldia:             Diameter of the tool
+    :param method:              Clearing method: 0 = standard (shrink), 1 = seed, 2 = lines,
+                                3 = combo (lines, if it fails then seed and then standard)
+    :param steps_per_circle:    how many linear segments to use to approximate a circle
+    :param overlap:             Tool fraction overlap between passes
+    :param connect:             Connect the toolpaths to minimize the tool lifts
+    :param contour:             Cut contour inside the polygon
+    :param simplify_tol:        if non-zero then simplify the resulting toolpaths
+    :param as_coords:           if True return the toolpaths as coordinate arrays, see paths_to_coords()
+    :return:                    List of toolpaths (LineString or LinearRing) or a tuple (coords, offsets) if as_coords
+                                is True. None if the polygon could not be cleared
+    :rtype:                     list | tuple | None
+    """
+
+    try:
+        if method == 0:
+            methods = [clear_polygon_shrink_paths]
+        elif method == 1:
+            methods = [clear_polygon_seed_paths]
+        elif method == 2:
+            methods = [clear_polygon_lines_paths]
+        else:
+            methods = [clear_polygon_lines_paths, clear_polygon_seed_paths, clear_polygon_shrink_paths]
+
+        geoms = None
+        for clear_method in methods:
+            if clear_method is clear_polygon_shrink_paths:
+                geoms = clear_method(polygon, tooldia, steps_per_circle, overlap=overlap)
+            else:
+                geoms = clear_method(polygon, tooldia, steps_per_circle, overlap=overlap, contour=contour)
+            if geoms and geoms.objects:
+                break
+
+        if not geoms or not geoms.objects:
+            return None
+
+        # Optimization: Reduce lifts
+        if connect:
+            geoms_conn = Geometry.paint_connect(geoms, polygon, tooldia, int(steps_per_circle))
+            if geoms_conn:
+                geoms = geoms_conn
+    except Exception as err:
+        log.error("camlib.clear_polygon_task() --> %s" % str(err))
+        return None
+
+    if simplify_tol > 0.0:
+        paths = [x.simplify(simplify_tol) for x in geoms.get_objects()]
+    else:
+        paths = list(geoms.get_objects())
+
+    if as_coords:
+        return paths_to_coords(paths)
+    return paths
+
+
+def clear_polygons_task(polygons, tooldia, method, steps_per_circle, overlap=0.15, connect=True, contour=True,
+                        simplify_tol=0.0, as_coords=False):
+    """
+    Creates the toolpaths that clear each polygon in a list of polygons. Used to send a batch of polygons to a
+    worker process of the App.pool. See clear_polygon_task() for the parameters.
+
+    :return:    A list with the clear_polygon_task() result for each polygon, in the order of the polygons
+    :rtype:     list
+    """
+    return [
+        clear_polygon_task(pol, tooldia, method, steps_per_circle, overlap=overlap, connect=connect,
+                           contour=contour, simplify_tol=simplify_tol, as_coords=as_coords)
+        for pol in polygons
+    ]
+
+
+def paths_to_coords(paths: list) -> tuple:
+    """
+    Pack a list of paths (LineString or LinearRing) into a coordinates array and an offsets array. This is much
+    cheaper to send between processes than the Shapely geometries.
+
+    :param paths:   List of LineString or LinearRing geometries
+    :return:        A tuple (coords, offsets) where coords is a (N, 2) float array with the coordinates of all the
+                    paths and offsets is an int array such that path i is coords[offsets[i]:offsets[i + 1]]
+    :rtype:         tuple
+    """
+    geo_arr = np.asarray([p for p in paths if p is not None], dtype=object)
+    if geo_arr.size:
+        # a path needs at least 2 points
+        geo_arr = geo_arr[shapely.get_num_coordinates(geo_arr) > 1]
+    if geo_arr.size == 0:
+        return np.empty((0, 2), dtype=float), np.zeros(1, dtype=np.int64)
+
+    coords = shapely.get_coordinates(geo_arr)
+    offsets = np.zeros(geo_arr.size + 1, dtype=np.int64)
+    np.cumsum(shapely.get_num_coordinates(geo_arr), out=offsets[1:])
+    return coords, offsets
+
+
+def coords_to_paths(coords, offsets) -> list:
+    """
+    Rebuild the paths packed by paths_to_coords(). The paths are made with one vectorized Shapely call.
+
+    :param coords:  (N, 2) float array with the coordinates of all the paths
+    :param offsets: int array such that path i is coords[offsets[i]:offsets[i + 1]]
+    :return:        List of LineString geometries
+    :rtype:         list
+    """
+    counts = np.diff(offsets)
+    if counts.size == 0:
+        return []
+
+    indices = np.repeat(np.arange(counts.size), counts)
+    return list(shapely.linestrings(coords, indices=indices))
+
+
 def arc(center, radius, start, stop, direction, steps_per_circ):
     """
     Creates a list of point along the specified arc.
@@ -7935,6 +9093,7 @@ def to_dict(obj):
 
     * ApertureMacro
     * BaseGeometry
+    * Toolpath and ToolpathRun
 
     :param obj:     Shapely geometry.
     :type obj:      BaseGeometry
@@ -7951,6 +9110,14 @@ def to_dict(obj):
             "__class__": "Shply",
             "__inst__": sdumps(obj)
         }
+    if isinstance(obj, Toolpath):
+        return {
+            "__class__": "Toolpath",
+            "__inst__": obj.to_dict()
+        }
+    if isinstance(obj, ToolpathRun):
+        # a view in a list of parsed G-code, saved as the dictionary it stands for
+        return {'geom': obj['geom'], 'kind': obj['kind']}
     return obj
 
 
@@ -7969,6 +9136,8 @@ def dict2obj(d):
             am = ApertureMacro()
             am.from_dict(d['__inst__'])
             return am
+        if d['__class__'] == "Toolpath":
+            return Toolpath.from_dict(d['__inst__'])
         return d
     else:
         return d
@@ -94,6 +94,8 @@ class AppDefaults:
         "global_process_number": int((os.cpu_count()) / 4) if os.cpu_count() > 4 else 1,
         "global_tolerance": 0.005,
 
+        "global_project_format": 'json',
+        "global_project_lazy_load": False,
         "global_save_compressed": True,
         "global_compression_level": 3,
         "global_autosave": False,
@@ -215,6 +217,8 @@ class AppDefaults:
         "gerber_delayed_buffering": True,
         "gerber_simplification": False,
         "gerber_simp_tolerance": 0.0005,
+        "gerber_bulk_flashes": True,
+        "gerber_parallel_union": True,
 
         # Gerber Export
         "gerber_exp_units": 'IN',
@@ -544,6 +548,7 @@ class AppDefaults:
         "tools_ncc_newdia": 0.1,
         "tools_ncc_plotting": 'normal',
         "tools_ncc_check_valid": True,
+        "tools_ncc_parallel": True,
 
         # Cutout Tool
         "tools_cutout_tooldia": 2.4,
@@ -575,6 +580,7 @@ class AppDefaults:
         "tools_paint_connect": True,
         "tools_paint_contour": True,
         "tools_paint_plotting": 'normal',
+        "tools_paint_parallel": True,
         "tools_paint_rest": False,
         "tools_paint_cutz": -0.05,
         "tools_paint_tipdia": 0.1,
@@ -236,6 +236,11 @@ G00 Z{z_toolchange}
         return ('G01 ' + self.position_code(p)).format(**p) + \
                ' F' + str(self.feedrate_format % (p.fr_decimals, p.feedrate))
 
+    def linear_block(self, coords, p):
+        # the linear_code() motions to all the vertices of a path, formatted at once
+        return self.position_block(GRBL_11, 'G01 ', ' F' + str(self.feedrate_format % (p.fr_decimals, p.feedrate)),
+                                   coords, p)
+
     def end_code(self, p):
         coords_xy = p['xy_end']
         gcode = ('G00 Z' + self.feedrate_format % (p.fr_decimals, p.z_end) + "\n")
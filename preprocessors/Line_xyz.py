@@ -226,6 +226,11 @@ M0""".format(x_toolchange=self.coordinate_format % (p.coords_decimals, x_toolcha
         g += ' Z' + self.coordinate_format % (p.coords_decimals, p.z_cut)
         return g
 
+    def linear_block(self, coords, p):
+        # the linear_code() motions to all the vertices of a path, formatted at once
+        return self.position_block(Line_xyz, 'G01 ', ' Z' + self.coordinate_format % (p.coords_decimals, p.z_cut),
+                                   coords, p)
+
     def end_code(self, p):
         coords_xy = p['xy_end']
         if coords_xy and coords_xy != '':
@@ -233,6 +233,10 @@ G0 Z{z_toolchange}
     def linear_code(self, p):
         return ('G1 ' + self.position_code(p)).format(**p) + " " + self.inline_feedrate_code(p)
 
+    def linear_block(self, coords, p):
+        # the linear_code() motions to all the vertices of a path, formatted at once
+        return self.position_block(Marlin, 'G1 ', " " + self.inline_feedrate_code(p), coords, p)
+
     def end_code(self, p):
         coords_xy = p['xy_end']
         gcode = ('G0 Z' + self.feedrate_format % (p.fr_decimals, p.z_end) + " " + self.feedrate_rapid_code(p) + "\n")
@@ -250,6 +250,10 @@ G00 Z{z_toolchange}
         # It is a horizontal move in the X-Y CNC plane.
         return ('G01 ' + self.position_code(p)).format(**p)
 
+    def linear_block(self, coords, p):
+        # the linear_code() motions to all the vertices of a path, formatted at once
+        return self.position_block(default, 'G01 ', '', coords, p)
+
     def end_code(self, p):
         # a final move at the end of the CNC job. First it moves to a safe parking Z height followed by an X-Y move
         # to the parking location.
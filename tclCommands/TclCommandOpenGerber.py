@@ -21,7 +21,8 @@ class TclCommandOpenGerber(TclCommandSignaled):
 
     # dictionary of types from Tcl command, needs to be ordered , this  is  for options  like -optionname value
     option_types = collections.OrderedDict([
-        ('outname', str)
+        ('outname', str),
+        ('streaming', str)
     ])
 
     # array of mandatory options for current Tcl command: required = {'name','outname'}
@@ -33,9 +34,12 @@ class TclCommandOpenGerber(TclCommandSignaled):
         'args': collections.OrderedDict([
             ('filename', 'Absolute path to file to open. Required.\n'
                          'WARNING: no spaces are allowed. If unsure enclose the entire path with quotes.'),
-            ('outname', 'Name of the resulting Gerber object.')
+            ('outname', 'Name of the resulting Gerber object.'),
+            ('streaming', 'Parse the file as a memory mapped stream, without keeping its source in the object.\n'
+                          'For very large files. True (1) or False (0). Default is False.')
         ]),
         'examples': ["open_gerber gerber_object_path -outname bla",
+                     "open_gerber gerber_object_path -streaming True",
                      'open_gerber "D:\\my_gerber_file with spaces in the name.GRB"']
     }
 
@@ -60,6 +64,13 @@ class TclCommandOpenGerber(TclCommandSignaled):
         else:
             outname = filename.split('/')[-1].split('\\')[-1]
 
+        if 'streaming' in args:
+            try:
+                par = args['streaming'].capitalize()
+            except AttributeError:
+                par = args['streaming']
+            args['streaming'] = bool(eval(str(par)))
+
         args['plot'] = False
         args['from_tcl'] = True
         self.app.f_handlers.open_gerber(filename, outname, **args)
@@ -76,7 +76,7 @@ class TclCommandSetOrigin(TclCommand):
         loc = []
         if 'auto' in args:
             if bool(args['auto']) is True:
-                objs = self.app.collection.get_list()
+                objs = self.app.collection.get_list(hydrate=True)
                 minx, miny, __, ___ = get_bounds(objs)
 
                 loc.append(0 - minx)
@@ -96,7 +96,7 @@ class TclCommandSetOrigin(TclCommand):
                 return 'fail'
 
             if 'obj_name' not in args:
-                objs = self.app.collection.get_list()
+                objs = self.app.collection.get_list(hydrate=True)
                 minx, miny, __, ___ = get_bounds(objs)
 
                 loc.append(location[0] - minx)